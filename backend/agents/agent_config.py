@@ -1,27 +1,146 @@
+import hashlib
 import json
 import os
+import threading
+import time
+from typing import Dict, List, Optional
+from langchain.schema import SystemMessage
+from config import Config
 
-def load_agent_config():
-    config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'agents.json')
-    with open(config_path, 'r') as f:
+AGENT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'agents.json')
+
+ROUTER_PROMPT_TEMPLATE = """{base_prompt}
+
+Available specialists with their IDs:
+{agents_list}
+
+IMPORTANT: You must end your response with 'ROUTE_TO: [specialist_id]' when you determine the appropriate specialist.
+The specialist_id must be one of: {agent_ids}
+
+Be conversational, empathetic, and keep your response to 2-4 sentences before routing."""
+
+def load_agent_config(path: str = AGENT_CONFIG_PATH):
+    with open(path, 'r') as f:
         return json.load(f)
 
-AGENT_CONFIG = load_agent_config()
+class AgentRegistry:
+    """Immutable snapshot of agents.json with everything the hot path needs.
+
+    The id index, router agent list and system messages are built once per
+    load; a reload builds a new registry and swaps the reference, so readers
+    always see one consistent version.
+    """
+
+    def __init__(self, config: Dict, mtime: float = 0.0):
+        self.config = config
+        self.mtime = mtime
+        self.version = hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:12]
+        self.router = config['router']
+        self.agents: List[Dict] = config['agents']
+        self.by_id: Dict[str, Dict] = {agent['id']: agent for agent in self.agents}
+
+        self.agent_list_for_router = "\n".join(
+            f"- {agent['id']}: {agent['name']} - {agent['specialty']}" for agent in self.agents
+        )
+        self.router_system_prompt = ROUTER_PROMPT_TEMPLATE.format(
+            base_prompt=self.router['systemPrompt'],
+            agents_list=self.agent_list_for_router,
+            agent_ids=", ".join(self.by_id)
+        )
+        self.router_system_message = SystemMessage(content=self.router_system_prompt)
+        self.system_messages: Dict[str, SystemMessage] = {
+            agent['id']: SystemMessage(content=agent['systemPrompt']) for agent in self.agents
+        }
+
+        self.history_budgets: Dict[str, int] = {
+            'router': self.router.get('historyTokenBudget', Config.ROUTER_HISTORY_TOKENS)
+        }
+        for agent in self.agents:
+            self.history_budgets[agent['id']] = agent.get('historyTokenBudget', Config.SPECIALIST_HISTORY_TOKENS)
+
+class RegistryLoader:
+    """Serves the current AgentRegistry and reloads it when agents.json changes.
+
+    The file's mtime is checked at most once per ``reload_interval`` seconds,
+    so steady-state lookups cost a clock read. A file that fails to parse
+    (e.g. caught mid-save) leaves the previous registry in place. Callbacks
+    registered with ``on_reload`` run after each successful reload.
+    """
+
+    def __init__(self, path: str = AGENT_CONFIG_PATH, reload_interval: float = 2.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.lock = threading.Lock()
+        self.reloads = 0
+        self.failed_mtime = None
+        self.listeners = []
+        self.registry = AgentRegistry(load_agent_config(path), self._mtime())
+        self.next_check = time.monotonic() + reload_interval
+
+    def _mtime(self) -> float:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return 0.0
+
+    def on_reload(self, callback):
+        self.listeners.append(callback)
+
+    def get(self) -> AgentRegistry:
+        if self.reload_interval > 0 and time.monotonic() >= self.next_check:
+            self.check()
+        return self.registry
+
+    def check(self) -> bool:
+        if not self.lock.acquire(blocking=False):
+            return False
+        try:
+            self.next_check = time.monotonic() + self.reload_interval
+            mtime = self._mtime()
+            if not mtime or mtime in (self.registry.mtime, self.failed_mtime):
+                return False
+            try:
+                self.registry = AgentRegistry(load_agent_config(self.path), mtime)
+            except Exception as e:
+                self.failed_mtime = mtime
+                print(f"Failed to reload {self.path}: {str(e)}")
+                return False
+            self.reloads += 1
+        finally:
+            self.lock.release()
+        for callback in self.listeners:
+            try:
+                callback(self.registry)
+            except Exception as e:
+                print(f"Agent registry reload callback failed: {str(e)}")
+        return True
+
+    def stats(self) -> Dict:
+        registry = self.registry
+        return {
+            'version': registry.version,
+            'agents': len(registry.agents),
+            'reloads': self.reloads,
+            'reload_interval': self.reload_interval
+        }
+
+registry_loader = RegistryLoader(reload_interval=Config.AGENT_CONFIG_RELOAD_INTERVAL)
+
+def get_registry() -> AgentRegistry:
+    return registry_loader.get()
 
 def get_router_config():
-    return AGENT_CONFIG['router']
+    return get_registry().router
 
-def get_agent_by_id(agent_id: str):
-    for agent in AGENT_CONFIG['agents']:
-        if agent['id'] == agent_id:
-            return agent
-    return None
+def get_agent_by_id(agent_id: str) -> Optional[Dict]:
+    return get_registry().by_id.get(agent_id)
 
 def get_all_agents():
-    return AGENT_CONFIG['agents']
+    return get_registry().agents
 
 def get_agent_list_for_router():
-    agents_info = []
-    for agent in AGENT_CONFIG['agents']:
-        agents_info.append(f"- {agent['id']}: {agent['name']} - {agent['specialty']}")
-    return "\n".join(agents_info)
\ No newline at end of file
+    return get_registry().agent_list_for_router
+
+def get_history_token_budget(agent_id: str) -> int:
+    budgets = get_registry().history_budgets
+    return budgets.get(agent_id, Config.SPECIALIST_HISTORY_TOKENS)
@@ -0,0 +1,217 @@
+import asyncio
+import contextvars
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain.schema import HumanMessage, SystemMessage
+
+from config import Config
+from memory.conversation_memory import conversation_manager
+from memory.summarizer import conversation_summarizer
+from utils.metrics import agent_scope
+from .agent_config import get_history_token_budget, get_registry
+from .route_classifier import route_classifier
+from .specialists import agent_manager
+
+SYNOPSIS_PROMPT = """You coordinate a panel of medical specialists who have each answered the same patient message.
+Write a short synopsis for the patient that merges their answers: where they agree, where they differ,
+and the most important next step. Do not add advice that none of the specialists gave."""
+
+# Shortest deadline a caller may ask for; anything less would time every specialist out.
+MIN_DEADLINE = 1.0
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+class Consultation:
+    """Sends one message to several specialists at once and reports answers as they finish.
+
+    Specialists are the top-k matches from the route classifier (or the ones the
+    caller names). Each answer must arrive within the deadline; stragglers are
+    reported as timed out rather than holding up the rest. The sync path runs
+    on a thread pool, the async path on the event loop. An optional synopsis
+    merges the answers with one more LLM call.
+    """
+
+    def __init__(self, max_workers: int = 16, top_k: int = 3, max_agents: int = 5, deadline: float = 20):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='consult')
+        self.top_k = top_k
+        self.max_agents = max_agents
+        self.deadline = deadline
+        self.lock = threading.Lock()
+        self.counts = {'consultations': 0, 'answers': 0, 'timeouts': 0, 'synopses': 0}
+
+    def _count(self, name: str, value: int = 1):
+        with self.lock:
+            self.counts[name] += value
+
+    def select(self, message: str, requested: Optional[List[str]] = None, top_k: Optional[int] = None) -> List[str]:
+        """Specialist ids to consult: the requested ones that exist, else the classifier's best matches.
+
+        Raises ValueError for a malformed ``requested`` list or ``top_k``.
+        """
+        by_id = get_registry().by_id
+        if requested:
+            if not isinstance(requested, list) or not all(isinstance(agent_id, str) for agent_id in requested):
+                raise ValueError('agents must be a list of agent ids')
+            selected = [agent_id for agent_id in dict.fromkeys(requested) if agent_id in by_id and agent_id != 'router']
+        else:
+            if top_k is not None and (not isinstance(top_k, int) or isinstance(top_k, bool) or top_k <= 0):
+                raise ValueError('top_k must be a positive integer')
+            limit = min(top_k or self.top_k, self.max_agents)
+            selected = [agent_id for agent_id, score in route_classifier.rank(message) if score > 0][:limit]
+        return selected[:self.max_agents]
+
+    def deadline_for(self, requested: Optional[float] = None) -> float:
+        """The requested deadline clamped to [MIN_DEADLINE, configured deadline]; ValueError unless a positive number."""
+        if requested is None:
+            return self.deadline
+        if not _is_number(requested) or requested <= 0:
+            raise ValueError('deadline must be a positive number of seconds')
+        return min(max(float(requested), MIN_DEADLINE), self.deadline)
+
+    def _history(self, session_id: str, agent_id: str) -> list:
+        return conversation_manager.history_messages_for_context(session_id, max_tokens=get_history_token_budget(agent_id))
+
+    def _plan(self, agent_ids: List[str]) -> Dict:
+        agents = [agent_manager.get_agent(agent_id) for agent_id in agent_ids]
+        self._count('consultations')
+        return {
+            'type': 'consult',
+            'agents': [{'id': agent.agent_id, 'name': agent.name, 'specialty': agent.specialty} for agent in agents]
+        }
+
+    def _answer(self, agent_id: str, response: str, started: float) -> Dict:
+        self._count('answers')
+        return {
+            'type': 'answer',
+            'agent_id': agent_id,
+            'agent_name': agent_manager.get_agent(agent_id).name,
+            'response': response,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000)
+        }
+
+    def _timeout(self, agent_id: str, deadline: float) -> Dict:
+        self._count('timeouts')
+        return {
+            'type': 'timeout',
+            'agent_id': agent_id,
+            'agent_name': agent_manager.get_agent(agent_id).name,
+            'error': f'No answer within {deadline:g}s'
+        }
+
+    def _synopsis_messages(self, message: str, answers: List[Dict]) -> list:
+        opinions = "\n\n".join(f"{answer['agent_name']}:\n{answer['response']}" for answer in answers)
+        return [
+            SystemMessage(content=SYNOPSIS_PROMPT),
+            HumanMessage(content=f"Patient message:\n{message}\n\nSpecialist answers:\n{opinions}")
+        ]
+
+    def _synopsis(self, response) -> Dict:
+        self._count('synopses')
+        return {'type': 'synopsis', 'response': response.content if hasattr(response, 'content') else str(response)}
+
+    def _record(self, llm, session_id: str, message: str, answers: List[Dict], synopsis: Optional[Dict]):
+        replies = [f"{answer['agent_name']}: {answer['response']}" for answer in answers]
+        if synopsis and synopsis.get('response'):
+            replies.append(f"Synopsis: {synopsis['response']}")
+        conversation_manager.add_exchange(session_id, message, *replies)
+        if Config.SUMMARY_ENABLED:
+            conversation_summarizer.schedule(session_id, llm, get_history_token_budget('router'))
+
+    def _done(self, agent_ids: List[str], answers: List[Dict]) -> Dict:
+        return {
+            'type': 'done',
+            'success': True,
+            'answered': [answer['agent_id'] for answer in answers],
+            'timed_out': [agent_id for agent_id in agent_ids if agent_id not in {a['agent_id'] for a in answers}]
+        }
+
+    def stream(self, llm, session_id: str, message: str, agent_ids: List[str], deadline: float,
+               with_synopsis: bool = False) -> Iterator[Dict]:
+        yield self._plan(agent_ids)
+        started = time.perf_counter()
+        futures = {
+            self.executor.submit(contextvars.copy_context().run, agent_manager.get_agent(agent_id).respond,
+                                 llm, message, self._history(session_id, agent_id)): agent_id
+            for agent_id in agent_ids
+        }
+
+        answers = []
+        try:
+            for future in as_completed(futures, timeout=deadline):
+                answer = self._answer(futures[future], future.result(), started)
+                answers.append(answer)
+                yield answer
+        except FutureTimeoutError:
+            for future, agent_id in futures.items():
+                if not future.done():
+                    future.cancel()
+                    yield self._timeout(agent_id, deadline)
+
+        synopsis = None
+        if with_synopsis and len(answers) > 1:
+            try:
+                with agent_scope('consult_synopsis'):
+                    synopsis = self._synopsis(llm.invoke(self._synopsis_messages(message, answers)))
+                yield synopsis
+            except Exception as e:
+                yield {'type': 'synopsis', 'success': False, 'error': str(e)}
+
+        self._record(llm, session_id, message, answers, synopsis)
+        yield self._done(agent_ids, answers)
+
+    async def astream(self, llm, session_id: str, message: str, agent_ids: List[str], deadline: float,
+                      with_synopsis: bool = False) -> AsyncIterator[Dict]:
+        yield self._plan(agent_ids)
+        started = time.perf_counter()
+        # Reading and recording history can touch the conversation store, so it stays off the event loop.
+        histories = await asyncio.to_thread(lambda: [self._history(session_id, agent_id) for agent_id in agent_ids])
+        tasks = {
+            asyncio.ensure_future(agent_manager.get_agent(agent_id).arespond(llm, message, history)): agent_id
+            for agent_id, history in zip(agent_ids, histories)
+        }
+
+        answers = []
+        pending = set(tasks)
+        try:
+            while pending:
+                remaining = deadline - (time.perf_counter() - started)
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    answer = self._answer(tasks[task], task.result(), started)
+                    answers.append(answer)
+                    yield answer
+        finally:
+            for task in pending:
+                task.cancel()
+        for task in pending:
+            yield self._timeout(tasks[task], deadline)
+
+        synopsis = None
+        if with_synopsis and len(answers) > 1:
+            try:
+                with agent_scope('consult_synopsis'):
+                    synopsis = self._synopsis(await llm.ainvoke(self._synopsis_messages(message, answers)))
+                yield synopsis
+            except Exception as e:
+                yield {'type': 'synopsis', 'success': False, 'error': str(e)}
+
+        await asyncio.to_thread(self._record, llm, session_id, message, answers, synopsis)
+        yield self._done(agent_ids, answers)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return dict(self.counts)
+
+consultation = Consultation(
+    max_workers=Config.CONSULT_WORKERS,
+    top_k=Config.CONSULT_TOP_K,
+    max_agents=Config.CONSULT_MAX_AGENTS,
+    deadline=Config.CONSULT_DEADLINE
+)
@@ -0,0 +1,32 @@
+from typing import List, Sequence
+
+from langchain.schema import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+# Stands in for the user turn a window cut off, so the assistant reply after it is kept.
+EARLIER_TURN = "(earlier conversation)"
+
+def merge_turns(messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+    """Collapses runs of same-role messages so turns strictly alternate, starting with the user.
+
+    A router reply followed by the specialist's intro becomes one assistant
+    turn. When the window cut into an exchange and starts on an assistant
+    reply, a fixed placeholder user turn goes in front of it.
+    """
+    turns: List[BaseMessage] = []
+    for message in messages:
+        if not turns and isinstance(message, AIMessage):
+            turns.append(HumanMessage(content=EARLIER_TURN))
+        if turns and turns[-1].type == message.type:
+            turns[-1] = type(message)(content=f"{turns[-1].content}\n\n{message.content}")
+        else:
+            turns.append(message)
+    return turns
+
+def build_prompt(system_message: SystemMessage, history: Sequence[BaseMessage], user_message: str) -> List[BaseMessage]:
+    """System prompt, then history as native Human/AI turns, then the new message.
+
+    The system prompt is identical for every call to an agent and comes
+    first, so providers can cache it as a prompt prefix (see
+    utils/prompt_cache.py); the conversation only ever appends after it.
+    """
+    return [system_message] + merge_turns(list(history) + [HumanMessage(content=user_message)])
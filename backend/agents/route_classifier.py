@@ -0,0 +1,151 @@
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from config import Config
+from .agent_config import AgentRegistry, get_registry
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'been', 'but', 'by', 'can', 'do', 'for', 'from',
+    'had', 'has', 'have', 'i', 'if', 'in', 'is', 'it', 'its', 'me', 'my', 'of', 'on', 'or', 'so',
+    'that', 'the', 'this', 'to', 'was', 'we', 'were', 'what', 'when', 'with', 'you', 'your'
+}
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for word in re.findall(r"[a-z0-9']+", text.lower()):
+        word = word.strip("'")
+        if not word or word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+def ngrams(tokens: List[str]) -> List[str]:
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+class RoutePrediction(NamedTuple):
+    agent_id: Optional[str]
+    confidence: float
+    score: float
+
+class RouteIndex(NamedTuple):
+    registry: AgentRegistry
+    idf: Dict[str, float]
+    vectors: Dict[str, Dict[str, float]]
+    keywords: Dict[str, List]
+
+class RouteClassifier:
+    """Zero-LLM specialist classifier built from the agents.json descriptions.
+
+    Each agent is scored by TF-IDF cosine similarity over unigrams and bigrams
+    of its name, specialty, description and keywords, plus a bonus for every
+    keyword phrase found in the message. Confidence is the top score's share of
+    the top two scores, so it is high only when one specialist clearly wins.
+    The index is rebuilt whenever agents.json is reloaded.
+    """
+
+    def __init__(self, registry: AgentRegistry, threshold: float = 0.8, min_score: float = 0.35,
+                 keyword_weight: float = 0.35):
+        self.threshold = threshold
+        self.min_score = min_score
+        self.keyword_weight = keyword_weight
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        self.index = self._build(registry)
+
+    def _build(self, registry: AgentRegistry) -> RouteIndex:
+        documents = {}
+        keywords: Dict[str, List] = {}
+        for agent in registry.agents:
+            agent_keywords = [k.lower() for k in agent.get('keywords', [])]
+            text = " ".join([agent['name'], agent['specialty'], agent['description']] + agent_keywords)
+            documents[agent['id']] = Counter(ngrams(tokenize(text)))
+            keywords[agent['id']] = [re.compile(r'\b' + re.escape(k) + r'\b') for k in agent_keywords]
+
+        document_frequency = Counter()
+        for terms in documents.values():
+            document_frequency.update(terms.keys())
+        total = len(documents)
+        idf = {term: math.log((1 + total) / (1 + df)) + 1 for term, df in document_frequency.items()}
+
+        vectors = {agent_id: self._normalize(self._weigh(terms, idf)) for agent_id, terms in documents.items()}
+        return RouteIndex(registry, idf, vectors, keywords)
+
+    def _current_index(self) -> RouteIndex:
+        registry = get_registry()
+        index = self.index
+        if index.registry is not registry:
+            index = self._build(registry)
+            self.index = index
+        return index
+
+    def _weigh(self, terms: Counter, idf: Dict[str, float]) -> Dict[str, float]:
+        return {term: (1 + math.log(count)) * idf[term] for term, count in terms.items() if term in idf}
+
+    def _normalize(self, vector: Dict[str, float]) -> Dict[str, float]:
+        norm = math.sqrt(sum(v * v for v in vector.values()))
+        return {term: v / norm for term, v in vector.items()} if norm else {}
+
+    def scores(self, message: str) -> Dict[str, float]:
+        index = self._current_index()
+        query = self._normalize(self._weigh(Counter(ngrams(tokenize(message))), index.idf))
+        lowered = message.lower()
+        result = {}
+        for agent_id, vector in index.vectors.items():
+            similarity = sum(weight * vector.get(term, 0.0) for term, weight in query.items())
+            matches = sum(1 for pattern in index.keywords[agent_id] if pattern.search(lowered))
+            result[agent_id] = similarity + self.keyword_weight * matches
+        return result
+
+    def rank(self, message: str) -> List[Tuple[str, float]]:
+        """(agent_id, score) for every specialist, best first."""
+        return sorted(self.scores(message).items(), key=lambda item: item[1], reverse=True)
+
+    def classify(self, message: str) -> RoutePrediction:
+        ranked = self.rank(message)
+        if not ranked or ranked[0][1] <= 0:
+            return RoutePrediction(None, 0.0, 0.0)
+
+        best_id, best = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        return RoutePrediction(best_id, best / (best + runner_up), best)
+
+    def is_confident(self, prediction: RoutePrediction) -> bool:
+        return (prediction.agent_id is not None
+                and prediction.confidence >= self.threshold
+                and prediction.score >= self.min_score)
+
+    def record_direct(self):
+        with self.lock:
+            self.counts['predictions'] += 1
+            self.counts['direct_routes'] += 1
+
+    def record_llm_route(self, prediction: RoutePrediction, llm_agent_id: Optional[str]):
+        with self.lock:
+            self.counts['predictions'] += 1
+            self.counts['llm_routes'] += 1
+            if prediction.agent_id and llm_agent_id:
+                self.counts['compared'] += 1
+                if prediction.agent_id == llm_agent_id:
+                    self.counts['agreements'] += 1
+
+    def stats(self) -> Dict:
+        with self.lock:
+            counts = dict(self.counts)
+        predictions = counts.get('predictions', 0)
+        compared = counts.get('compared', 0)
+        return {
+            'threshold': self.threshold,
+            'predictions': predictions,
+            'direct_routes': counts.get('direct_routes', 0),
+            'llm_routes': counts.get('llm_routes', 0),
+            'hit_rate': round(counts.get('direct_routes', 0) / predictions, 4) if predictions else 0.0,
+            'compared_with_llm': compared,
+            'agreement_rate': round(counts.get('agreements', 0) / compared, 4) if compared else 0.0
+        }
+
+route_classifier = RouteClassifier(get_registry(), threshold=Config.ROUTER_CLASSIFIER_THRESHOLD)
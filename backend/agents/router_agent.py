@@ -1,66 +1,247 @@
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.schema import SystemMessage, HumanMessage, AIMessage
+from langchain.schema import BaseMessage, SystemMessage, HumanMessage, AIMessage
 from langchain.chains import LLMChain
-from typing import Dict, Optional, Tuple
+from typing import Dict, Iterator, Optional, Sequence, Tuple
 import re
-from .agent_config import get_router_config, get_agent_list_for_router, get_agent_by_id
+from config import Config
+from .prompt_layout import build_prompt
+from .agent_config import get_registry, get_agent_by_id
+from .route_classifier import route_classifier, RoutePrediction
+from utils.response_cache import response_cache
+from utils.metrics import agent_scope, record_route
+
+ROUTE_MARKER = 'ROUTE_TO:'
+
+def chunk_text(chunk) -> str:
+    content = chunk.content if hasattr(chunk, 'content') else chunk
+    if isinstance(content, list):
+        return "".join(part.get('text', '') if isinstance(part, dict) else str(part) for part in content)
+    return content or ""
+
+class RouteMarkerParser:
+    """Incrementally strips the ROUTE_TO marker from a streamed router reply.
+
+    Text that could be the start of the marker is held back until it is
+    disambiguated, and everything after the marker is buffered so the
+    specialist id can be parsed once the stream ends.
+    """
+    
+    def __init__(self):
+        self.parts = []
+        self.pending = ""
+        self.tail = None
+    
+    def feed(self, chunk: str) -> str:
+        if self.tail is not None:
+            self.tail += chunk
+            return ""
+        
+        text = self.pending + chunk
+        index = text.find(ROUTE_MARKER)
+        if index != -1:
+            self.pending = ""
+            self.tail = text[index + len(ROUTE_MARKER):]
+            emitted = text[:index]
+        else:
+            keep = 0
+            for size in range(min(len(text), len(ROUTE_MARKER) - 1), 0, -1):
+                if ROUTE_MARKER.startswith(text[-size:]):
+                    keep = size
+                    break
+            emitted = text[:len(text) - keep]
+            self.pending = text[len(text) - keep:]
+        
+        self.parts.append(emitted)
+        return emitted
+    
+    def emitted_text(self) -> str:
+        return "".join(self.parts)
+    
+    def finish(self) -> Tuple[str, str, Optional[str]]:
+        """Return (text still to emit, full cleaned response, specialist id)."""
+        if self.tail is None:
+            remainder = self.pending
+            self.pending = ""
+            self.parts.append(remainder)
+            return remainder, self.emitted_text(), None
+        
+        id_match = re.match(r'\s*(\w+)', self.tail)
+        if id_match and get_agent_by_id(id_match.group(1).strip()):
+            remainder = self.tail[id_match.end():]
+            self.parts.append(remainder)
+            return remainder, self.emitted_text().strip(), id_match.group(1).strip()
+        
+        remainder = ROUTE_MARKER + self.tail
+        self.parts.append(remainder)
+        return remainder, self.emitted_text(), None
 
 class RouterAgent:
     def __init__(self, llm):
         self.llm = llm
-        self.config = get_router_config()
-        self.system_prompt = self._build_system_prompt()
+        self.registry = get_registry()
+        self.config = self.registry.router
+        self.system_prompt = self.registry.router_system_prompt
+    
+    def _build_messages(self, user_message: str, conversation_history: Sequence[BaseMessage] = ()) -> list:
+        return build_prompt(self.registry.router_system_message, conversation_history, user_message)
+    
+    def _parse_response(self, response) -> Tuple[str, Optional[str]]:
+        if hasattr(response, 'content'):
+            response_text = response.content
+        else:
+            response_text = str(response)
         
-    def _build_system_prompt(self) -> str:
-        base_prompt = self.config['systemPrompt']
-        agents_list = get_agent_list_for_router()
+        route_match = re.search(r'ROUTE_TO:\s*(\w+)', response_text)
         
-        enhanced_prompt = f"""{base_prompt}
-
-Available specialists with their IDs:
-{agents_list}
-
-IMPORTANT: You must end your response with 'ROUTE_TO: [specialist_id]' when you determine the appropriate specialist.
-The specialist_id must be one of: primary_care, cardiology, dermatology, orthopedics, mental_health, pediatrics, womens_health, general_surgery
-
-Be conversational, empathetic, and keep your response to 2-4 sentences before routing."""
+        if route_match:
+            specialist_id = route_match.group(1).strip()
+            clean_response = response_text.replace(route_match.group(0), '').strip()
+            
+            specialist = self.registry.by_id.get(specialist_id)
+            if specialist:
+                return clean_response, specialist_id
+            else:
+                return response_text, None
+        else:
+            return response_text, None
+    
+    def _error_response(self, error: Exception) -> str:
+        record_route('error', None)
+        return f"I apologize, but I'm having trouble understanding your request. Could you please rephrase it? Error: {str(error)}"
+    
+    def _classify(self, user_message: str) -> Optional[RoutePrediction]:
+        if not Config.ROUTER_CLASSIFIER_ENABLED:
+            return None
+        return route_classifier.classify(user_message)
+    
+    def _direct_route(self, prediction: Optional[RoutePrediction]) -> Optional[Tuple[str, str]]:
+        if prediction is None or not route_classifier.is_confident(prediction):
+            return None
+        
+        specialist = self.registry.by_id.get(prediction.agent_id)
+        if specialist is None:
+            return None
         
-        return enhanced_prompt
+        route_classifier.record_direct()
+        record_route('classifier', prediction.agent_id)
+        response = (f"Thank you for sharing that. Based on what you've described, I'm connecting you with "
+                    f"{specialist['name']}, our {specialist['specialty']} specialist.")
+        return response, prediction.agent_id
+    
+    def _cache_key(self, user_message: str, conversation_history: Sequence[BaseMessage]) -> Optional[str]:
+        if response_cache is None:
+            return None
+        return response_cache.make_key(f"router@{self.registry.version}", user_message, conversation_history, self.llm)
     
-    def route(self, user_message: str, conversation_history: str = "") -> Tuple[str, Optional[str]]:
+    def _cached_route(self, cache_key: Optional[str]) -> Optional[Tuple[str, Optional[str]]]:
+        cached = response_cache.get(cache_key) if cache_key else None
+        if not cached:
+            return None
+        record_route('cache', cached[1])
+        return cached[0], cached[1]
+    
+    def _store_route(self, cache_key: Optional[str], response_text: str, specialist_id: Optional[str]):
+        if cache_key:
+            response_cache.set(cache_key, [response_text, specialist_id])
+    
+    def _record_llm_route(self, prediction: Optional[RoutePrediction], specialist_id: Optional[str]):
+        record_route('llm', specialist_id)
+        if prediction is not None:
+            route_classifier.record_llm_route(prediction, specialist_id)
+    
+    def route(self, user_message: str, conversation_history: Sequence[BaseMessage] = ()) -> Tuple[str, Optional[str]]:
+        prediction = self._classify(user_message)
+        direct = self._direct_route(prediction)
+        if direct:
+            return direct
+        
+        cache_key = self._cache_key(user_message, conversation_history)
+        cached = self._cached_route(cache_key)
+        if cached:
+            return cached
+        
         try:
-            messages = [
-                SystemMessage(content=self.system_prompt)
-            ]
+            messages = self._build_messages(user_message, conversation_history)
             
-            if conversation_history:
-                messages.append(SystemMessage(content=f"Previous conversation:\n{conversation_history}"))
+            with agent_scope('router'):
+                response = self.llm.invoke(messages)
             
-            messages.append(HumanMessage(content=user_message))
+            response_text, specialist_id = self._parse_response(response)
+            self._record_llm_route(prediction, specialist_id)
+            self._store_route(cache_key, response_text, specialist_id)
+            return response_text, specialist_id
+                
+        except Exception as e:
+            return self._error_response(e), None
+    
+    async def aroute(self, user_message: str, conversation_history: Sequence[BaseMessage] = ()) -> Tuple[str, Optional[str]]:
+        prediction = self._classify(user_message)
+        direct = self._direct_route(prediction)
+        if direct:
+            return direct
+        
+        cache_key = self._cache_key(user_message, conversation_history)
+        cached = self._cached_route(cache_key)
+        if cached:
+            return cached
+        
+        try:
+            messages = self._build_messages(user_message, conversation_history)
             
-            response = self.llm.invoke(messages)
+            with agent_scope('router'):
+                response = await self.llm.ainvoke(messages)
             
-            if hasattr(response, 'content'):
-                response_text = response.content
-            else:
-                response_text = str(response)
+            response_text, specialist_id = self._parse_response(response)
+            self._record_llm_route(prediction, specialist_id)
+            self._store_route(cache_key, response_text, specialist_id)
+            return response_text, specialist_id
+                
+        except Exception as e:
+            return self._error_response(e), None
+    
+    def stream_route(self, user_message: str, conversation_history: Sequence[BaseMessage] = ()) -> Iterator[Tuple[str, object]]:
+        """Stream the router reply as ('token', text) events, ending with ('done', (response, specialist_id)).
+
+        The ROUTE_TO marker is stripped incrementally so it never reaches the client.
+        """
+        prediction = self._classify(user_message)
+        direct = self._direct_route(prediction)
+        if direct:
+            yield 'token', direct[0]
+            yield 'done', direct
+            return
+        
+        cache_key = self._cache_key(user_message, conversation_history)
+        cached = self._cached_route(cache_key)
+        if cached:
+            yield 'token', cached[0]
+            yield 'done', cached
+            return
+        
+        parser = RouteMarkerParser()
+        try:
+            messages = self._build_messages(user_message, conversation_history)
             
-            route_match = re.search(r'ROUTE_TO:\s*(\w+)', response_text)
+            with agent_scope('router'):
+                for chunk in self.llm.stream(messages):
+                    text = parser.feed(chunk_text(chunk))
+                    if text:
+                        yield 'token', text
+            
+            remainder, response_text, specialist_id = parser.finish()
+            if remainder:
+                yield 'token', remainder
+            self._record_llm_route(prediction, specialist_id)
+            self._store_route(cache_key, response_text, specialist_id)
+            yield 'done', (response_text, specialist_id)
             
-            if route_match:
-                specialist_id = route_match.group(1).strip()
-                clean_response = response_text.replace(route_match.group(0), '').strip()
-                
-                specialist = get_agent_by_id(specialist_id)
-                if specialist:
-                    return clean_response, specialist_id
-                else:
-                    return response_text, None
-            else:
-                return response_text, None
-                
         except Exception as e:
-            return f"I apologize, but I'm having trouble understanding your request. Could you please rephrase it? Error: {str(e)}", None
+            fallback = self._error_response(e)
+            if not parser.emitted_text():
+                yield 'token', fallback
+                yield 'done', (fallback, None)
+            else:
+                yield 'done', (parser.emitted_text().strip(), None)
     
     def greet(self) -> str:
         return "Welcome to VRG & AI Medical! I'm here to help you connect with the right medical specialist. Could you briefly describe your health concern?"
\ No newline at end of file
@@ -1,88 +1,162 @@
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.schema import SystemMessage, HumanMessage, AIMessage
+from langchain.schema import BaseMessage, SystemMessage, HumanMessage, AIMessage
 from langchain.chains import ConversationChain
-from langchain.memory import ConversationBufferMemory
-from typing import Dict, Optional
-from .agent_config import get_agent_by_id, get_all_agents
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+from .prompt_layout import build_prompt
+from .agent_config import AgentRegistry, get_registry
+from .router_agent import chunk_text
+from utils.response_cache import response_cache
+from utils.metrics import agent_scope
+
+INTROS = {
+    'primary_care': "Hello, I'm Dr. James Anderson. I'm here to help with your health concerns. What brings you in today?",
+    'cardiology': "Hi, I'm Dr. Sarah Chen. I specialize in heart health. What cardiac symptoms are you experiencing?",
+    'dermatology': "Hello, I'm Dr. Maria Garcia. I understand you have a skin concern. What would you like me to look at?",
+    'orthopedics': "Hi, I'm Dr. Michael Roberts. I specialize in bones and joints. Tell me about your injury or pain.",
+    'mental_health': "Hello, I'm Dr. Lisa Thompson. Thank you for reaching out. What's been on your mind?",
+    'pediatrics': "Hi, I'm Dr. David Kim. I understand you have concerns about your child. What's going on?",
+    'womens_health': "Hello, I'm Dr. Jennifer Martinez. I'm here to help with your health needs. What brings you in today?",
+    'general_surgery': "Hi, I'm Dr. Robert Wilson. I understand you may need surgery. What condition are we addressing?"
+}
 
 class SpecialistAgent:
-    def __init__(self, agent_id: str, llm, memory: Optional[ConversationBufferMemory] = None):
+    """Prompt-only specialist built once from agents.json.
+
+    Instances hold no per-user state and are never mutated after construction;
+    the caller's LLM is passed to every call, so one shared agent can serve any
+    number of concurrent requests from threaded or async workers.
+    """
+
+    def __init__(self, agent_id: str, registry: AgentRegistry):
         self.agent_id = agent_id
-        self.llm = llm
-        self.config = get_agent_by_id(agent_id)
+        self.config = registry.by_id.get(agent_id)
         
         if not self.config:
             raise ValueError(f"Agent with id {agent_id} not found")
         
-        self.memory = memory or ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True,
-            output_key="response"
-        )
-        
         self.system_prompt = self.config['systemPrompt']
+        self.system_message = registry.system_messages[agent_id]
+        self.cache_scope = f"{agent_id}@{registry.version}"
         self.name = self.config['name']
         self.specialty = self.config['specialty']
     
-    def respond(self, user_message: str, conversation_history: str = "") -> str:
+    def _build_messages(self, user_message: str, conversation_history: Sequence[BaseMessage] = ()) -> list:
+        return build_prompt(self.system_message, conversation_history, user_message)
+    
+    def _fallback_response(self) -> str:
+        return f"I apologize for the technical difficulty. Let me try to help you another way. What specific aspect of {self.specialty.lower()} can I assist you with?"
+    
+    def _cache_key(self, llm, user_message: str, conversation_history: Sequence[BaseMessage]) -> Optional[str]:
+        if response_cache is None:
+            return None
+        return response_cache.make_key(self.cache_scope, user_message, conversation_history, llm)
+    
+    def respond(self, llm, user_message: str, conversation_history: Sequence[BaseMessage] = ()) -> str:
+        cache_key = self._cache_key(llm, user_message, conversation_history)
+        cached = response_cache.get(cache_key) if cache_key else None
+        if cached:
+            return cached
+        
         try:
-            messages = [
-                SystemMessage(content=self.system_prompt)
-            ]
+            messages = self._build_messages(user_message, conversation_history)
             
-            if conversation_history:
-                messages.append(SystemMessage(content=f"Previous conversation:\n{conversation_history}"))
+            with agent_scope(self.agent_id):
+                response = llm.invoke(messages)
             
-            messages.append(HumanMessage(content=user_message))
+            if hasattr(response, 'content'):
+                response_text = response.content
+            else:
+                response_text = str(response)
             
-            response = self.llm.invoke(messages)
+            if cache_key:
+                response_cache.set(cache_key, response_text)
+            return response_text
+            
+        except Exception as e:
+            return self._fallback_response()
+    
+    async def arespond(self, llm, user_message: str, conversation_history: Sequence[BaseMessage] = ()) -> str:
+        cache_key = self._cache_key(llm, user_message, conversation_history)
+        cached = response_cache.get(cache_key) if cache_key else None
+        if cached:
+            return cached
+        
+        try:
+            messages = self._build_messages(user_message, conversation_history)
+            
+            with agent_scope(self.agent_id):
+                response = await llm.ainvoke(messages)
             
             if hasattr(response, 'content'):
                 response_text = response.content
             else:
                 response_text = str(response)
             
+            if cache_key:
+                response_cache.set(cache_key, response_text)
             return response_text
             
         except Exception as e:
-            return f"I apologize for the technical difficulty. Let me try to help you another way. What specific aspect of {self.specialty.lower()} can I assist you with?"
+            return self._fallback_response()
     
-    def introduce(self) -> str:
-        intros = {
-            'primary_care': "Hello, I'm Dr. James Anderson. I'm here to help with your health concerns. What brings you in today?",
-            'cardiology': "Hi, I'm Dr. Sarah Chen. I specialize in heart health. What cardiac symptoms are you experiencing?",
-            'dermatology': "Hello, I'm Dr. Maria Garcia. I understand you have a skin concern. What would you like me to look at?",
-            'orthopedics': "Hi, I'm Dr. Michael Roberts. I specialize in bones and joints. Tell me about your injury or pain.",
-            'mental_health': "Hello, I'm Dr. Lisa Thompson. Thank you for reaching out. What's been on your mind?",
-            'pediatrics': "Hi, I'm Dr. David Kim. I understand you have concerns about your child. What's going on?",
-            'womens_health': "Hello, I'm Dr. Jennifer Martinez. I'm here to help with your health needs. What brings you in today?",
-            'general_surgery': "Hi, I'm Dr. Robert Wilson. I understand you may need surgery. What condition are we addressing?"
-        }
+    def stream_respond(self, llm, user_message: str, conversation_history: Sequence[BaseMessage] = ()) -> Iterator[str]:
+        cache_key = self._cache_key(llm, user_message, conversation_history)
+        cached = response_cache.get(cache_key) if cache_key else None
+        if cached:
+            yield cached
+            return
         
-        return intros.get(self.agent_id, f"Hello, I'm {self.name}. How can I help you with {self.specialty}?")
+        emitted = False
+        parts = []
+        try:
+            messages = self._build_messages(user_message, conversation_history)
+            
+            with agent_scope(self.agent_id):
+                for chunk in llm.stream(messages):
+                    text = chunk_text(chunk)
+                    if text:
+                        emitted = True
+                        parts.append(text)
+                        yield text
+            
+            if cache_key and parts:
+                response_cache.set(cache_key, "".join(parts))
+                    
+        except Exception as e:
+            if not emitted:
+                yield self._fallback_response()
+    
+    def introduce(self) -> str:
+        return INTROS.get(self.agent_id, f"Hello, I'm {self.name}. How can I help you with {self.specialty}?")
 
 class AgentManager:
+    """Registry of the shared, preallocated specialist agents.
+
+    The agent set is rebuilt, and swapped in as a whole, when agents.json is
+    reloaded.
+    """
+
     def __init__(self):
-        self.agents: Dict[str, SpecialistAgent] = {}
-        self.llm = None
+        self.state = self._build(get_registry())
     
-    def set_llm(self, llm):
-        self.llm = llm
+    def _build(self, registry: AgentRegistry) -> Tuple[AgentRegistry, Dict[str, SpecialistAgent]]:
+        return registry, {agent['id']: SpecialistAgent(agent['id'], registry) for agent in registry.agents}
     
-    def get_or_create_agent(self, agent_id: str, memory: Optional[ConversationBufferMemory] = None) -> SpecialistAgent:
-        if not self.llm:
-            raise ValueError("LLM not set. Call set_llm() first.")
-        
-        if agent_id not in self.agents:
-            self.agents[agent_id] = SpecialistAgent(agent_id, self.llm, memory)
-        
-        return self.agents[agent_id]
+    def _current_agents(self) -> Dict[str, SpecialistAgent]:
+        registry = get_registry()
+        state = self.state
+        if state[0] is not registry:
+            state = self._build(registry)
+            self.state = state
+        return state[1]
     
-    def get_available_agents(self) -> list:
-        return get_all_agents()
+    def get_agent(self, agent_id: str) -> SpecialistAgent:
+        agent = self._current_agents().get(agent_id)
+        if agent is None:
+            raise ValueError(f"Agent with id {agent_id} not found")
+        return agent
     
-    def clear_agent(self, agent_id: str):
-        if agent_id in self.agents:
-            del self.agents[agent_id]
+    def get_available_agents(self) -> list:
+        return get_registry().agents
 
-agent_manager = AgentManager()
\ No newline at end of file
+agent_manager = AgentManager()
@@ -0,0 +1,172 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from config import Config
+from memory.conversation_memory import conversation_manager
+from utils.metrics import agent_scope, metrics
+from utils.tokens import estimate_tokens
+from .agent_config import get_history_token_budget
+from .route_classifier import route_classifier
+from .router_agent import chunk_text
+from .specialists import agent_manager
+
+metrics.counter('speculative_drafts_total', 'Speculative specialist drafts by outcome (hit/miss/failed).')
+metrics.counter('speculative_wasted_tokens_total', 'Estimated tokens spent on discarded drafts, by direction.')
+
+class Draft:
+    """A specialist's answer being generated while the router decides."""
+
+    def __init__(self, agent_id: str, messages: list):
+        self.agent_id = agent_id
+        self.messages = messages
+        self.cancelled = threading.Event()
+        self.parts: List[str] = []
+        self.future = None
+        self.task = None
+
+    def prompt_tokens(self) -> int:
+        return sum(estimate_tokens(getattr(message, 'content', str(message))) for message in self.messages)
+
+    def completion_tokens(self) -> int:
+        return estimate_tokens("".join(self.parts))
+
+class Speculator:
+    """Drafts the likely specialist's reply concurrently with the router LLM call.
+
+    The guess is the route classifier's top specialist when it is plausible but
+    not confident enough for a local route (confident messages never reach the
+    router LLM, so there is nothing to overlap). If the router picks the same
+    specialist the draft becomes the turn's answer; otherwise it is cancelled:
+    sync drafts stream and stop reading at the next chunk, which closes the
+    provider stream, and async drafts are cancelled outright.
+    """
+
+    def __init__(self, max_workers: int = 16, min_confidence: float = 0.6):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='speculate')
+        self.min_confidence = min_confidence
+        self.lock = threading.Lock()
+        self.counts = {'drafts': 0, 'hits': 0, 'misses': 0, 'failed': 0,
+                       'wasted_prompt_tokens': 0, 'wasted_completion_tokens': 0}
+
+    def _count(self, name: str, value: int = 1):
+        with self.lock:
+            self.counts[name] += value
+
+    def _outcome(self, outcome: str):
+        self._count({'hit': 'hits', 'miss': 'misses', 'failed': 'failed'}[outcome])
+        metrics.inc('speculative_drafts_total', {'outcome': outcome})
+
+    def _waste(self, prompt: int, completion: int):
+        self._count('wasted_prompt_tokens', prompt)
+        self._count('wasted_completion_tokens', completion)
+        metrics.inc('speculative_wasted_tokens_total', {'direction': 'prompt'}, prompt)
+        metrics.inc('speculative_wasted_tokens_total', {'direction': 'completion'}, completion)
+
+    def guess(self, message: str) -> Optional[str]:
+        prediction = route_classifier.classify(message)
+        if prediction.agent_id is None or prediction.confidence < self.min_confidence:
+            return None
+        if Config.ROUTER_CLASSIFIER_ENABLED and route_classifier.is_confident(prediction):
+            return None
+        return prediction.agent_id
+
+    def _draft(self, session_id: str, message: str) -> Optional[Draft]:
+        agent_id = self.guess(message)
+        if agent_id is None:
+            return None
+        history = conversation_manager.history_messages_for_context(session_id, max_tokens=get_history_token_budget(agent_id))
+        self._count('drafts')
+        return Draft(agent_id, agent_manager.get_agent(agent_id)._build_messages(message, history))
+
+    def _generate(self, llm, draft: Draft) -> str:
+        with agent_scope(draft.agent_id):
+            chunks = llm.stream(draft.messages)
+            try:
+                for chunk in chunks:
+                    if draft.cancelled.is_set():
+                        break
+                    draft.parts.append(chunk_text(chunk))
+            finally:
+                close = getattr(chunks, 'close', None)
+                if close:
+                    close()
+        return "".join(draft.parts)
+
+    def start(self, llm, session_id: str, message: str) -> Optional[Draft]:
+        draft = self._draft(session_id, message)
+        if draft is not None:
+            draft.future = self.executor.submit(contextvars.copy_context().run, self._generate, llm, draft)
+        return draft
+
+    def resolve(self, draft: Optional[Draft], specialist_id: Optional[str]) -> Optional[str]:
+        """The draft's text if the router confirmed its specialist; otherwise cancels it and returns None."""
+        if draft is None:
+            return None
+        if specialist_id == draft.agent_id:
+            try:
+                text = draft.future.result()
+            except Exception as e:
+                print(f"Speculative draft failed: {str(e)}")
+                text = ""
+            if text.strip() and not draft.cancelled.is_set():
+                self._outcome('hit')
+                return text
+            self._outcome('failed')
+            return None
+
+        draft.cancelled.set()
+        self._outcome('miss')
+        if not draft.future.cancel():
+            draft.future.add_done_callback(lambda _: self._waste(draft.prompt_tokens(), draft.completion_tokens()))
+        return None
+
+    async def _agenerate(self, llm, draft: Draft) -> str:
+        with agent_scope(draft.agent_id):
+            response = await llm.ainvoke(draft.messages)
+        text = response.content if hasattr(response, 'content') else str(response)
+        draft.parts.append(text)
+        return text
+
+    async def astart(self, llm, session_id: str, message: str) -> Optional[Draft]:
+        # Reading history can touch the conversation store, so it stays off the event loop.
+        draft = await asyncio.to_thread(self._draft, session_id, message)
+        if draft is not None:
+            draft.task = asyncio.ensure_future(self._agenerate(llm, draft))
+        return draft
+
+    async def aresolve(self, draft: Optional[Draft], specialist_id: Optional[str]) -> Optional[str]:
+        if draft is None:
+            return None
+        if specialist_id == draft.agent_id:
+            text = ""
+            if not draft.task.cancelled():
+                try:
+                    text = await draft.task
+                except Exception as e:
+                    print(f"Speculative draft failed: {str(e)}")
+            if text.strip():
+                self._outcome('hit')
+                return text
+            self._outcome('failed')
+            return None
+
+        self._outcome('miss')
+        if draft.task.done():
+            if not draft.task.cancelled() and draft.task.exception() is None:
+                self._waste(draft.prompt_tokens(), draft.completion_tokens())
+        else:
+            # The request is abandoned mid-flight; the prompt was sent, the completion is unknown.
+            draft.task.cancel()
+            self._waste(draft.prompt_tokens(), 0)
+        return None
+
+    def stats(self) -> Dict:
+        with self.lock:
+            counts = dict(self.counts)
+        resolved = counts['hits'] + counts['misses'] + counts['failed']
+        return dict(counts, hit_rate=round(counts['hits'] / resolved, 3) if resolved else 0.0)
+
+speculator = Speculator(max_workers=Config.SPECULATIVE_WORKERS, min_confidence=Config.SPECULATIVE_MIN_CONFIDENCE)
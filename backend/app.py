@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, session, send_from_directory
+from flask import Flask, Response, g, request, jsonify, session
 from flask_cors import CORS
 from flask_session import Session
 import os
@@ -7,18 +7,48 @@ from datetime import datetime, timedelta
 from cryptography.fernet import Fernet
 import base64
 import json
+import time
 
 from config import Config
-from utils.llm_factory import LLMFactory
+from utils.llm_pool import llm_pool
+from utils.resilient_llm import provider_health
+from utils.rate_limit import rate_limiter
+from utils.grok_client import grok_pool
+from utils.replay_llm import register_replay_provider
+from utils.session_store import create_session_interface
+from utils.tokens import load_encoding
+from utils.static_assets import AssetManifest, default_static_root
+from utils.metrics import metrics, prompt_cache_stats, record_request
+from utils.response_cache import response_cache
+from utils.key_validation import key_validator
+from utils.batch_runner import chat_batches
 from memory.conversation_memory import conversation_manager
+from memory.summarizer import conversation_summarizer
 from agents.router_agent import RouterAgent
 from agents.specialists import agent_manager
-from agents.agent_config import get_all_agents, get_agent_by_id
+from agents.route_classifier import route_classifier
+from agents.consultation import consultation
+from agents.speculation import speculator
+from agents.agent_config import get_all_agents, get_agent_by_id, get_history_token_budget, registry_loader
 
-app = Flask(__name__, static_folder='../frontend', static_url_path='')
+app = Flask(__name__, static_folder=None)
 app.config.from_object(Config)
 
-Session(app)
+load_encoding()
+
+static_assets = AssetManifest(Config.STATIC_ROOT or default_static_root(app.root_path),
+                              reload_interval=Config.STATIC_RELOAD_INTERVAL)
+# The frontend fetches agents.json itself; keep the served copy in step with the hot-reloaded registry.
+AGENT_CONFIG_ASSET = os.path.basename(registry_loader.path)
+SERVES_AGENT_CONFIG = static_assets.path(AGENT_CONFIG_ASSET) == os.path.abspath(registry_loader.path)
+if SERVES_AGENT_CONFIG:
+    registry_loader.on_reload(lambda registry: static_assets.refresh())
+
+session_interface = create_session_interface()
+if session_interface is None:
+    Session(app)
+else:
+    app.session_interface = session_interface
 CORS(app, origins=Config.CORS_ORIGINS, supports_credentials=True)
 
 SECRET_ENCRYPTION_KEY = os.environ.get('ENCRYPTION_KEY')
@@ -30,6 +60,11 @@ else:
     SECRET_ENCRYPTION_KEY = SECRET_ENCRYPTION_KEY.encode()
 
 cipher_suite = Fernet(SECRET_ENCRYPTION_KEY)
+
+if Config.LLM_REPLAY_CASSETTE:
+    register_replay_provider(Config.LLM_REPLAY_CASSETTE, mode=Config.LLM_REPLAY_MODE,
+                             timing=Config.LLM_REPLAY_TIMING, upstream=Config.LLM_REPLAY_UPSTREAM)
+
 def encrypt_api_key(api_key: str) -> str:
     return cipher_suite.encrypt(api_key.encode()).decode()
 
@@ -42,24 +77,103 @@ def get_or_create_session_id():
         session.permanent = True
     return session['session_id']
 
+def summarize_in_background(session_id: str, llm, agent_id: str):
+    if Config.SUMMARY_ENABLED:
+        conversation_summarizer.schedule(session_id, llm, get_history_token_budget(agent_id))
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def sse_response(events) -> Response:
+    return Response(events, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def ndjson_response(lines) -> Response:
+    return Response(lines, mimetype='application/x-ndjson', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def sse_error(error: dict) -> str:
+    return sse_event('error', error)
+
+def ndjson_error(error: dict) -> str:
+    return json.dumps(dict(error, type='error')) + "\n"
+
+def guarded_stream(events, format_error=sse_error):
+    """Passes ``events`` through; an exception mid-stream becomes a final error event instead of a cut-off body."""
+    try:
+        yield from events
+    except Exception as e:
+        import traceback
+        print(f"Stream error: {str(e)}")
+        traceback.print_exc()
+        yield format_error({'success': False, 'error': str(e)})
+
+metrics.gauge('conversation_sessions', 'Live conversation sessions in the conversation store.',
+              lambda: [({}, conversation_manager.session_count())])
+metrics.gauge('llm_rate_limit_queue_depth', 'Provider calls currently waiting on the outbound rate limiter.',
+              lambda: [({}, rate_limiter.stats()['queue_depth'])])
+metrics.gauge('llm_circuit_open', 'Whether a provider circuit breaker is open (1) or closed/half-open (0).',
+              lambda: [({'provider': name}, int(stats['state'] == 'open'))
+                       for name, stats in provider_health.stats()['providers'].items()])
+metrics.gauge('summarizer_jobs_in_flight', 'Background summarization jobs queued or running.',
+              lambda: [({}, conversation_summarizer.stats()['in_flight'])])
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        method, status = request.method, response.status_code
+        # Streamed bodies finish after this hook, so record when the response is closed.
+        response.call_on_close(lambda: record_request(route, method, status, time.perf_counter() - started))
+    return response
+
 @app.route('/')
 def serve_frontend():
-    return send_from_directory('../', 'index.html')
+    return static_assets.response('index.html', request)
 
 @app.route('/<path:path>')
 def serve_static(path):
-    if os.path.exists(os.path.join('../', path)):
-        return send_from_directory('../', path)
-    return send_from_directory('../', 'index.html')
+    if SERVES_AGENT_CONFIG and path == AGENT_CONFIG_ASSET:
+        registry_loader.get()
+    return static_assets.response(path, request)
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({
         'status': 'healthy',
         'service': 'VRG & AI Law Backend',
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'llm_pool': llm_pool.stats(),
+        'llm_resilience': provider_health.stats(),
+        'llm_rate_limit': rate_limiter.stats(),
+        'grok_client': grok_pool.stats(),
+        'agent_registry': registry_loader.stats(),
+        'router_classifier': route_classifier.stats(),
+        'conversations': conversation_manager.stats(),
+        'summarizer': conversation_summarizer.stats(),
+        'response_cache': response_cache.stats() if response_cache else {'enabled': False},
+        'key_validation': key_validator.stats(),
+        'sessions': session_interface.stats() if session_interface else {'backend': 'filesystem'},
+        'static_assets': static_assets.stats(),
+        'chat_batches': chat_batches.stats(),
+        'consultations': consultation.stats(),
+        'speculation': speculator.stats(),
+        'prompt_cache': prompt_cache_stats.stats()
     })
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/api/activate', methods=['POST'])
 def activate():
     try:
@@ -72,8 +186,8 @@ def activate():
             return jsonify({'success': False, 'error': 'API key is required'}), 400
         
         try:
-            llm = LLMFactory.create_llm(provider, api_key)
-            test_response = llm.invoke([{"role": "user", "content": "test"}])
+            llm = llm_pool.get(provider, api_key)
+            key_validator.validate(provider, api_key, llm)
             
             encrypted_key = encrypt_api_key(api_key)
             session['api_key'] = encrypted_key
@@ -135,41 +249,288 @@ def route_message():
         
         encrypted_key = session.get('api_key')
         provider = session.get('provider', 'openai')
-        api_key = decrypt_api_key(encrypted_key)
         
-        llm = LLMFactory.create_llm(provider, api_key)
-        router = RouterAgent(llm)
+        llm = llm_pool.get_for_encrypted_key(provider, encrypted_key, decrypt_api_key)
+        
+        return jsonify(route_turn(llm, session_id, message))
+            
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def turn_history(session_id: str, agent_id: str = 'router') -> list:
+    return conversation_manager.history_messages_for_context(session_id, max_tokens=get_history_token_budget(agent_id))
+
+def record_route_turn(llm, session_id: str, message: str, response: str, specialist_id: str = None) -> dict:
+    """Records a /api/route exchange and returns its payload; the handoff itself is left to the client."""
+    conversation_manager.add_exchange(session_id, message, response, agent_id=specialist_id)
+    summarize_in_background(session_id, llm, specialist_id or 'router')
+
+    if specialist_id:
+        return {
+            'success': True,
+            'response': response,
+            'route_to': specialist_id,
+            'specialist': get_agent_by_id(specialist_id),
+            'requires_handoff': True
+        }
+    return {
+        'success': True,
+        'response': response,
+        'requires_handoff': False
+    }
+
+def record_routed_turn(llm, session_id: str, message: str, response: str, specialist_id: str = None,
+                       answer: str = None) -> dict:
+    """Records a routed /api/chat turn and returns its payload, handing off (with the speculative answer, if any)."""
+    if not specialist_id:
+        conversation_manager.add_exchange(session_id, message, response)
+        summarize_in_background(session_id, llm, 'router')
+        return {
+            'success': True,
+            'response': response,
+            'current_agent': 'router'
+        }
+
+    reply = answer or agent_manager.get_agent(specialist_id).introduce()
+    conversation_manager.add_exchange(session_id, message, response, reply, agent_id=specialist_id)
+    summarize_in_background(session_id, llm, specialist_id)
+
+    payload = {
+        'success': True,
+        'response': response + "\n\n" + reply,
+        'route_to': specialist_id,
+        'specialist': get_agent_by_id(specialist_id),
+        'current_agent': specialist_id
+    }
+    if answer:
+        payload['speculative'] = True
+    return payload
+
+def record_specialist_turn(llm, session_id: str, message: str, agent_id: str, response: str) -> dict:
+    conversation_manager.add_exchange(session_id, message, response, agent_id=agent_id)
+    summarize_in_background(session_id, llm, agent_id)
+    return {
+        'success': True,
+        'response': response,
+        'current_agent': agent_id,
+        'agent_name': agent_manager.get_agent(agent_id).name
+    }
+
+def route_turn(llm, session_id: str, message: str) -> dict:
+    response, specialist_id = RouterAgent(llm).route(message, turn_history(session_id))
+    return record_route_turn(llm, session_id, message, response, specialist_id)
+
+def chat_turn(llm, session_id: str, message: str, agent_id: str = None, speculative: bool = False) -> dict:
+    """One /api/chat turn: route (or answer with the specialist), record the exchange, return the reply payload.
+
+    asgi.py runs the same steps with the async agent calls; both share the
+    history and record_* helpers above.
+    """
+    if not agent_id or agent_id == 'router':
+        history = turn_history(session_id)
+        draft = speculator.start(llm, session_id, message) if speculative else None
+        response, specialist_id = RouterAgent(llm).route(message, history)
+        answer = speculator.resolve(draft, specialist_id)
+        return record_routed_turn(llm, session_id, message, response, specialist_id, answer)
+
+    response = agent_manager.get_agent(agent_id).respond(llm, message, turn_history(session_id, agent_id))
+    return record_specialist_turn(llm, session_id, message, agent_id, response)
+
+@app.route('/api/chat', methods=['POST'])
+def chat():
+    try:
+        if not session.get('authenticated'):
+            return jsonify({'success': False, 'error': 'Not authenticated'}), 401
+        
+        data = request.json
+        message = data.get('message')
+        agent_id = data.get('agent_id')
+        
+        if not message:
+            return jsonify({'success': False, 'error': 'Message is required'}), 400
+        
+        session_id = get_or_create_session_id()
         
-        conversation_history = conversation_manager.format_history_for_context(session_id, max_messages=6)
+        encrypted_key = session.get('api_key')
+        provider = session.get('provider', 'openai')
         
-        response, specialist_id = router.route(message, conversation_history)
+        llm = llm_pool.get_for_encrypted_key(provider, encrypted_key, decrypt_api_key)
         
-        conversation_manager.add_message(session_id, message, is_human=True)
-        conversation_manager.add_message(session_id, response, is_human=False)
+        if data.get('mode') == 'consult':
+            try:
+                agent_ids = consultation.select(message, data.get('agents'), data.get('top_k'))
+                deadline = consultation.deadline_for(data.get('deadline'))
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            if not agent_ids:
+                return jsonify({'success': False, 'error': 'No matching specialists to consult'}), 400
+            events = consultation.stream(llm, session_id, message, agent_ids, deadline,
+                                         with_synopsis=bool(data.get('synopsis')))
+            return ndjson_response(guarded_stream((json.dumps(event) + "\n" for event in events), ndjson_error))
         
-        if specialist_id:
-            conversation_manager.set_current_agent(session_id, specialist_id)
-            specialist = get_agent_by_id(specialist_id)
+        return jsonify(chat_turn(llm, session_id, message, agent_id,
+                                 speculative=bool(data.get('speculative', Config.SPECULATIVE_ROUTING))))
             
-            return jsonify({
-                'success': True,
-                'response': response,
-                'route_to': specialist_id,
-                'specialist': specialist,
-                'requires_handoff': True
-            })
+    except Exception as e:
+        import traceback
+        print(f"Chat error: {str(e)}")
+        print("Full traceback:")
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def batch_thread_id(session_id: str, item: dict) -> str:
+    """Conversation an item belongs to; labelled threads are namespaced under the caller's session."""
+    label = item.get('session')
+    return f"{session_id}:{label}" if label else session_id
+
+def batch_lines(llm, session_id: str, items: list):
+    started = time.perf_counter()
+    errors = 0
+    results = chat_batches.run(
+        items,
+        lambda item: chat_turn(llm, batch_thread_id(session_id, item), item['message'], item.get('agent_id'),
+                              speculative=bool(item.get('speculative', Config.SPECULATIVE_ROUTING))),
+        key=lambda item: batch_thread_id(session_id, item)
+    )
+    for index, result, error in results:
+        line = {'index': index, 'session': items[index].get('session')}
+        if error is not None:
+            errors += 1
+            print(f"Batch item {index} error: {str(error)}")
+            line.update({'success': False, 'error': str(error)})
         else:
-            return jsonify({
-                'success': True,
-                'response': response,
-                'requires_handoff': False
-            })
+            line.update(result)
+        yield json.dumps(line) + "\n"
+    yield json.dumps({
+        'done': True,
+        'items': len(items),
+        'errors': errors,
+        'duration_ms': round((time.perf_counter() - started) * 1000)
+    }) + "\n"
+
+@app.route('/api/chat/batch', methods=['POST'])
+def chat_batch():
+    try:
+        if not session.get('authenticated'):
+            return jsonify({'success': False, 'error': 'Not authenticated'}), 401
+        
+        data = request.json or {}
+        items = data.get('items')
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({'success': False, 'error': 'items must be a non-empty list'}), 400
+        if len(items) > Config.CHAT_BATCH_MAX_ITEMS:
+            return jsonify({'success': False, 'error': f'At most {Config.CHAT_BATCH_MAX_ITEMS} items per batch'}), 400
+        for index, item in enumerate(items):
+            if not isinstance(item, dict) or not item.get('message'):
+                return jsonify({'success': False, 'error': f'Item {index}: message is required'}), 400
+        labels = {str(item['session']) for item in items if item.get('session')}
+        if len(labels) > Config.CHAT_BATCH_MAX_SESSIONS:
+            return jsonify({'success': False, 'error': f'At most {Config.CHAT_BATCH_MAX_SESSIONS} sessions per batch'}), 400
+        
+        session_id = get_or_create_session_id()
+        
+        encrypted_key = session.get('api_key')
+        provider = session.get('provider', 'openai')
+        
+        llm = llm_pool.get_for_encrypted_key(provider, encrypted_key, decrypt_api_key)
+        
+        return ndjson_response(batch_lines(llm, session_id, items))
             
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/chat', methods=['POST'])
-def chat():
+def stream_router_turn(llm, session_id: str, message: str, with_intro: bool):
+    router = RouterAgent(llm)
+    conversation_history = conversation_manager.history_messages_for_context(session_id, max_tokens=get_history_token_budget('router'))
+    
+    response, specialist_id = "", None
+    for kind, value in router.stream_route(message, conversation_history):
+        if kind == 'token':
+            yield sse_event('token', {'text': value})
+        else:
+            response, specialist_id = value
+    
+    if not specialist_id:
+        conversation_manager.add_exchange(session_id, message, response)
+        summarize_in_background(session_id, llm, 'router')
+        yield sse_event('done', {
+            'success': True,
+            'response': response,
+            'requires_handoff': False,
+            'current_agent': 'router'
+        })
+        return
+    
+    specialist = get_agent_by_id(specialist_id)
+    yield sse_event('route', {'route_to': specialist_id, 'specialist': specialist})
+    
+    full_response = response
+    replies = [response]
+    if with_intro:
+        intro = agent_manager.get_agent(specialist_id).introduce()
+        replies.append(intro)
+        yield sse_event('token', {'text': "\n\n" + intro})
+        full_response = response + "\n\n" + intro
+    
+    conversation_manager.add_exchange(session_id, message, *replies, agent_id=specialist_id)
+    summarize_in_background(session_id, llm, specialist_id)
+    
+    yield sse_event('done', {
+        'success': True,
+        'response': full_response,
+        'route_to': specialist_id,
+        'specialist': specialist,
+        'requires_handoff': True,
+        'current_agent': specialist_id
+    })
+
+def stream_specialist_turn(llm, session_id: str, message: str, agent_id: str):
+    specialist_agent = agent_manager.get_agent(agent_id)
+    conversation_history = conversation_manager.history_messages_for_context(session_id, max_tokens=get_history_token_budget(agent_id))
+    
+    parts = []
+    for text in specialist_agent.stream_respond(llm, message, conversation_history):
+        parts.append(text)
+        yield sse_event('token', {'text': text})
+    response = "".join(parts)
+    
+    conversation_manager.add_exchange(session_id, message, response, agent_id=agent_id)
+    summarize_in_background(session_id, llm, agent_id)
+    
+    yield sse_event('done', {
+        'success': True,
+        'response': response,
+        'current_agent': agent_id,
+        'agent_name': specialist_agent.name
+    })
+
+@app.route('/api/route/stream', methods=['POST'])
+def route_message_stream():
+    try:
+        if not session.get('authenticated'):
+            return jsonify({'success': False, 'error': 'Not authenticated'}), 401
+        
+        data = request.json
+        message = data.get('message')
+        
+        if not message:
+            return jsonify({'success': False, 'error': 'Message is required'}), 400
+        
+        session_id = get_or_create_session_id()
+        
+        encrypted_key = session.get('api_key')
+        provider = session.get('provider', 'openai')
+        
+        llm = llm_pool.get_for_encrypted_key(provider, encrypted_key, decrypt_api_key)
+        
+        return sse_response(guarded_stream(stream_router_turn(llm, session_id, message, with_intro=False)))
+            
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
     try:
         if not session.get('authenticated'):
             return jsonify({'success': False, 'error': 'Not authenticated'}), 401
@@ -185,65 +546,17 @@ def chat():
         
         encrypted_key = session.get('api_key')
         provider = session.get('provider', 'openai')
-        api_key = decrypt_api_key(encrypted_key)
         
-        llm = LLMFactory.create_llm(provider, api_key)
+        llm = llm_pool.get_for_encrypted_key(provider, encrypted_key, decrypt_api_key)
         
         if not agent_id or agent_id == 'router':
-            router = RouterAgent(llm)
-            conversation_history = conversation_manager.format_history_for_context(session_id, max_messages=6)
-            response, specialist_id = router.route(message, conversation_history)
-            
-            conversation_manager.add_message(session_id, message, is_human=True)
-            conversation_manager.add_message(session_id, response, is_human=False)
-            
-            if specialist_id:
-                conversation_manager.set_current_agent(session_id, specialist_id)
-                specialist = get_agent_by_id(specialist_id)
-                
-                agent_manager.set_llm(llm)
-                specialist_agent = agent_manager.get_or_create_agent(specialist_id)
-                intro = specialist_agent.introduce()
-                
-                conversation_manager.add_message(session_id, intro, is_human=False)
-                
-                return jsonify({
-                    'success': True,
-                    'response': response + "\n\n" + intro,
-                    'route_to': specialist_id,
-                    'specialist': specialist,
-                    'current_agent': specialist_id
-                })
-            else:
-                return jsonify({
-                    'success': True,
-                    'response': response,
-                    'current_agent': 'router'
-                })
+            events = stream_router_turn(llm, session_id, message, with_intro=True)
         else:
-            agent_manager.set_llm(llm)
-            specialist_agent = agent_manager.get_or_create_agent(agent_id)
-            
-            conversation_history = conversation_manager.format_history_for_context(session_id, max_messages=8)
-            
-            response = specialist_agent.respond(message, conversation_history)
-            
-            conversation_manager.add_message(session_id, message, is_human=True)
-            conversation_manager.add_message(session_id, response, is_human=False)
-            conversation_manager.set_current_agent(session_id, agent_id)
-            
-            return jsonify({
-                'success': True,
-                'response': response,
-                'current_agent': agent_id,
-                'agent_name': specialist_agent.name
-            })
+            events = stream_specialist_turn(llm, session_id, message, agent_id)
+        
+        return sse_response(guarded_stream(events))
             
     except Exception as e:
-        import traceback
-        print(f"Chat error: {str(e)}")
-        print("Full traceback:")
-        traceback.print_exc()
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/clear', methods=['POST'])
@@ -252,10 +565,6 @@ def clear_conversation():
         session_id = get_or_create_session_id()
         conversation_manager.clear_session(session_id)
         
-        current_agent = request.json.get('agent_id')
-        if current_agent and current_agent != 'router':
-            agent_manager.clear_agent(current_agent)
-        
         return jsonify({
             'success': True,
             'message': 'Conversation cleared successfully'
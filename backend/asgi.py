@@ -0,0 +1,273 @@
+"""asyncio-native serving mode for the LLM-bound endpoints.
+
+/api/activate, /api/route and /api/chat are served by coroutine handlers;
+route and chat await the provider's ``ainvoke``, and key validation and
+decryption run off the event loop, so a single worker can hold many in-flight
+conversations. Every other path falls through to the sync Flask app, and the
+Flask session interface is reused so both halves share the same cookie.
+
+Run with ``uvicorn asgi:app`` (or ``gunicorn -k uvicorn.workers.UvicornWorker
+asgi:app``); ``gunicorn app:app`` keeps serving the fully sync app.
+"""
+
+import json
+import os
+import secrets
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from werkzeug.test import EnvironBuilder
+
+from config import Config
+from app import (app as flask_app, encrypt_api_key, decrypt_api_key, turn_history, record_route_turn, record_routed_turn,
+                 record_specialist_turn, ndjson_error)
+from utils.llm_pool import llm_pool
+from utils.key_validation import key_validator
+from utils.metrics import record_request
+from agents.router_agent import RouterAgent
+from agents.specialists import agent_manager
+from agents.consultation import consultation
+from agents.speculation import speculator
+
+class FlaskSessionBridge:
+    """Opens and saves Flask sessions for requests that bypass Flask."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def _flask_request(self, request: Request):
+        builder = EnvironBuilder(
+            path=request.url.path,
+            method=request.method,
+            headers=list(request.headers.items()),
+            base_url=f"{request.url.scheme}://{request.url.netloc}"
+        )
+        try:
+            return self.app.request_class(builder.get_environ())
+        finally:
+            builder.close()
+
+    async def open(self, request: Request):
+        flask_request = self._flask_request(request)
+        session = await run_in_threadpool(self.app.session_interface.open_session, self.app, flask_request)
+        if session is None:
+            session = self.app.session_interface.make_null_session(self.app)
+        return session
+
+    async def respond(self, session, payload: dict, status_code: int = 200) -> JSONResponse:
+        return await self._with_session(session, JSONResponse(payload, status_code=status_code))
+
+    async def stream(self, session, lines, media_type: str = 'application/x-ndjson') -> StreamingResponse:
+        response = StreamingResponse(lines, media_type=media_type, headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+        return await self._with_session(session, response)
+
+    async def _with_session(self, session, response):
+        flask_response = self.app.response_class()
+        await run_in_threadpool(self.app.session_interface.save_session, self.app, session, flask_response)
+        for cookie in flask_response.headers.getlist('Set-Cookie'):
+            response.headers.append('set-cookie', cookie)
+        return response
+
+sessions = FlaskSessionBridge(flask_app)
+
+def get_or_create_session_id(session) -> str:
+    if 'session_id' not in session:
+        session['session_id'] = secrets.token_urlsafe(32)
+        session.permanent = True
+    return session['session_id']
+
+async def read_json(request: Request) -> dict:
+    try:
+        return await request.json() or {}
+    except ValueError:
+        return {}
+
+async def activate(request: Request):
+    session = await sessions.open(request)
+    try:
+        data = await read_json(request)
+        api_key = data.get('apiKey')
+        provider = data.get('provider', 'openai')
+        remember = data.get('remember', False)
+
+        if not api_key:
+            return await sessions.respond(session, {'success': False, 'error': 'API key is required'}, 400)
+
+        try:
+            llm = await run_in_threadpool(llm_pool.get, provider, api_key)
+            await run_in_threadpool(key_validator.validate, provider, api_key, llm)
+
+            session['api_key'] = encrypt_api_key(api_key)
+            session['provider'] = provider
+            session['authenticated'] = True
+            session['remember'] = remember
+
+            if remember:
+                session.permanent = True
+                session['expiry'] = (datetime.now() + timedelta(days=7)).isoformat()
+            else:
+                session.permanent = False
+                session['expiry'] = None
+
+            return await sessions.respond(session, {
+                'success': True,
+                'message': 'API key validated successfully',
+                'provider': provider,
+                'remember': remember,
+                'expiry': session.get('expiry')
+            })
+        except Exception as e:
+            return await sessions.respond(session, {
+                'success': False,
+                'error': f'Invalid API key or provider: {str(e)}'
+            }, 401)
+
+    except Exception as e:
+        return await sessions.respond(session, {'success': False, 'error': str(e)}, 500)
+
+async def route_message(request: Request):
+    session = await sessions.open(request)
+    try:
+        if not session.get('authenticated'):
+            return await sessions.respond(session, {'success': False, 'error': 'Not authenticated'}, 401)
+
+        data = await read_json(request)
+        message = data.get('message')
+
+        if not message:
+            return await sessions.respond(session, {'success': False, 'error': 'Message is required'}, 400)
+
+        session_id = get_or_create_session_id(session)
+        llm = await run_in_threadpool(llm_pool.get_for_encrypted_key, session.get('provider', 'openai'),
+                                      session.get('api_key'), decrypt_api_key)
+        history = await run_in_threadpool(turn_history, session_id)
+        response, specialist_id = await RouterAgent(llm).aroute(message, history)
+        return await sessions.respond(session, await run_in_threadpool(
+            record_route_turn, llm, session_id, message, response, specialist_id))
+
+    except Exception as e:
+        return await sessions.respond(session, {'success': False, 'error': str(e)}, 500)
+
+async def guarded_lines(events):
+    """NDJSON lines for ``events``; like app.guarded_stream, a mid-stream exception ends with an error line."""
+    try:
+        async for event in events:
+            yield json.dumps(event) + "\n"
+    except Exception as e:
+        print(f"Stream error: {str(e)}")
+        traceback.print_exc()
+        yield ndjson_error({'success': False, 'error': str(e)})
+
+async def achat_turn(llm, session_id: str, message: str, agent_id: str = None, speculative: bool = False) -> dict:
+    """app.chat_turn with async provider calls; conversation-store work stays off the event loop."""
+    if not agent_id or agent_id == 'router':
+        history = await run_in_threadpool(turn_history, session_id)
+        draft = await speculator.astart(llm, session_id, message) if speculative else None
+        response, specialist_id = await RouterAgent(llm).aroute(message, history)
+        answer = await speculator.aresolve(draft, specialist_id)
+        return await run_in_threadpool(record_routed_turn, llm, session_id, message, response, specialist_id, answer)
+
+    history = await run_in_threadpool(turn_history, session_id, agent_id)
+    response = await agent_manager.get_agent(agent_id).arespond(llm, message, history)
+    return await run_in_threadpool(record_specialist_turn, llm, session_id, message, agent_id, response)
+
+async def chat(request: Request):
+    session = await sessions.open(request)
+    try:
+        if not session.get('authenticated'):
+            return await sessions.respond(session, {'success': False, 'error': 'Not authenticated'}, 401)
+
+        data = await read_json(request)
+        message = data.get('message')
+        agent_id = data.get('agent_id')
+
+        if not message:
+            return await sessions.respond(session, {'success': False, 'error': 'Message is required'}, 400)
+
+        session_id = get_or_create_session_id(session)
+        llm = await run_in_threadpool(llm_pool.get_for_encrypted_key, session.get('provider', 'openai'),
+                                      session.get('api_key'), decrypt_api_key)
+
+        if data.get('mode') == 'consult':
+            try:
+                agent_ids = consultation.select(message, data.get('agents'), data.get('top_k'))
+                deadline = consultation.deadline_for(data.get('deadline'))
+            except ValueError as e:
+                return await sessions.respond(session, {'success': False, 'error': str(e)}, 400)
+            if not agent_ids:
+                return await sessions.respond(session, {'success': False, 'error': 'No matching specialists to consult'}, 400)
+            events = consultation.astream(llm, session_id, message, agent_ids, deadline,
+                                          with_synopsis=bool(data.get('synopsis')))
+            return await sessions.stream(session, guarded_lines(events))
+
+        return await sessions.respond(session, await achat_turn(
+            llm, session_id, message, agent_id, speculative=bool(data.get('speculative', Config.SPECULATIVE_ROUTING))))
+
+    except Exception as e:
+        print(f"Chat error: {str(e)}")
+        print("Full traceback:")
+        traceback.print_exc()
+        return await sessions.respond(session, {'success': False, 'error': str(e)}, 500)
+
+async_app = Starlette(
+    routes=[
+        Route('/api/activate', activate, methods=['POST']),
+        Route('/api/route', route_message, methods=['POST']),
+        Route('/api/chat', chat, methods=['POST'])
+    ],
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=Config.CORS_ORIGINS, allow_credentials=True,
+                   allow_methods=['*'], allow_headers=['*'])
+    ]
+)
+
+class HybridApp:
+    """Dispatches the async endpoints to Starlette and everything else to Flask."""
+
+    def __init__(self, async_app, wsgi_app):
+        self.async_app = async_app
+        self.wsgi_app = WSGIMiddleware(wsgi_app)
+        self.async_paths = {route.path for route in async_app.routes}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.async_app(scope, receive, send)
+        elif scope['path'] in self.async_paths:
+            await self._timed(scope, receive, send)
+        else:
+            await self.wsgi_app(scope, receive, send)
+
+    async def _timed(self, scope, receive, send):
+        """Records async-endpoint latency; Flask routes are timed by the Flask app itself."""
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.async_app(scope, receive, send_with_status)
+        finally:
+            record_request(scope['path'], scope['method'], status, time.perf_counter() - started)
+
+app = HybridApp(async_app, flask_app)
+
+if __name__ == '__main__':
+    import uvicorn
+    port = int(os.environ.get('PORT', 5001))
+    uvicorn.run(app, host='0.0.0.0', port=port)
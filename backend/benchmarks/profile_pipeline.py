@@ -0,0 +1,147 @@
+"""Profiles RouterAgent.route, SpecialistAgent.respond and the memory layer in isolation.
+
+Provider calls are answered from a replay cassette, so runs are offline and
+repeatable. Record the cassette once against a real provider, then replay it
+(with zero latency by default, so the profile shows only our own code):
+
+    cd backend
+    OPENAI_API_KEY=... python -m benchmarks.profile_pipeline --cassette benchmarks/cassettes/pipeline.json --record
+    python -m benchmarks.profile_pipeline --cassette benchmarks/cassettes/pipeline.json
+"""
+
+import argparse
+import cProfile
+import os
+import pstats
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+TARGETS = ('router', 'specialist', 'memory')
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cassette', required=True, help='replay cassette (JSON) to read, or to write with --record')
+    parser.add_argument('--record', action='store_true', help='call the upstream provider and record its responses')
+    parser.add_argument('--upstream', default='openai', help='provider to record from')
+    parser.add_argument('--timing', choices=('zero', 'original'), default='zero', help='replay latency')
+    parser.add_argument('--target', choices=TARGETS + ('all',), default='all')
+    parser.add_argument('--iterations', type=int, default=20, help='passes over the scripted conversation')
+    parser.add_argument('--sort', default='cumulative', help='pstats sort key')
+    parser.add_argument('--limit', type=int, default=25, help='functions to print per target')
+    parser.add_argument('--dump', help='directory for <target>.prof files (snakeviz, pstats)')
+    return parser.parse_args(argv)
+
+def transcript() -> List[Tuple[str, str]]:
+    """A fixed conversation used to build history, so prompts hash the same on every run."""
+    from benchmarks.run import COMPLAINTS, FOLLOW_UPS
+    return [(complaint, follow_up) for complaint, follow_up in zip(COMPLAINTS, FOLLOW_UPS * 2)]
+
+def history_messages(turns: List[Tuple[str, str]]) -> list:
+    from langchain.schema import AIMessage, HumanMessage
+
+    return [message for human, ai in turns for message in (HumanMessage(content=human), AIMessage(content=ai))]
+
+def profile(name: str, calls: List[Callable[[], object]], iterations: int, args: argparse.Namespace) -> Dict:
+    profiler = cProfile.Profile()
+    timings = []
+    for _ in range(iterations):
+        for call in calls:
+            started = time.perf_counter()
+            profiler.enable()
+            call()
+            profiler.disable()
+            timings.append(time.perf_counter() - started)
+
+    timings.sort()
+    summary = {
+        'calls': len(timings),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(0.95 * len(timings)))] * 1000, 3)
+    }
+    print(f"\n=== {name}: {summary['calls']} calls, mean {summary['mean_ms']} ms, p95 {summary['p95_ms']} ms")
+    pstats.Stats(profiler, stream=sys.stdout).strip_dirs().sort_stats(args.sort).print_stats(args.limit)
+    if args.dump:
+        os.makedirs(args.dump, exist_ok=True)
+        profiler.dump_stats(os.path.join(args.dump, f"{name}.prof"))
+    return summary
+
+def router_calls(llm) -> List[Callable[[], object]]:
+    from agents.router_agent import RouterAgent
+
+    router = RouterAgent(llm)
+    turns = transcript()
+    return [lambda message=human, history=history_messages(turns[:index]): router.route(message, history)
+            for index, (human, _) in enumerate(turns)]
+
+def specialist_calls(llm) -> List[Callable[[], object]]:
+    from agents.agent_config import get_registry
+    from agents.specialists import agent_manager
+
+    turns = transcript()
+    history = history_messages(turns[:3])
+    calls = []
+    for agent_id in get_registry().by_id:
+        agent = agent_manager.get_agent(agent_id)
+        for human, _ in turns[3:6]:
+            calls.append(lambda agent=agent, message=human: agent.respond(llm, message, history))
+    return calls
+
+def memory_calls() -> List[Callable[[], object]]:
+    from config import Config
+    from memory.conversation_memory import create_conversation_manager
+
+    manager = create_conversation_manager()
+    turns = transcript()
+    calls = []
+    for session_index in range(20):
+        session_id = f"profile-{session_index}"
+        manager.clear_session(session_id)
+
+        def turn(session_id=session_id):
+            for human, ai in turns:
+                manager.add_exchange(session_id, human, ai, agent_id='router')
+                manager.history_messages_for_context(session_id, max_tokens=Config.SPECIALIST_HISTORY_TOKENS)
+                manager.get_summary_work(session_id, Config.ROUTER_HISTORY_TOKENS)
+
+        calls.append(turn)
+    return calls
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from config import Config
+    from utils.llm_factory import LLMFactory, provider_family
+    from utils.replay_llm import register_replay_provider
+
+    cassette = register_replay_provider(args.cassette, mode='record' if args.record else 'replay',
+                                        timing=args.timing, upstream=args.upstream)
+    api_key = 'replay'
+    if args.record:
+        api_key = Config.FALLBACK_API_KEYS.get(provider_family(args.upstream))
+        if not api_key:
+            sys.exit(f"Recording from {args.upstream} needs its API key in the environment")
+    llm = LLMFactory.create_llm('replay', api_key)
+
+    targets = TARGETS if args.target == 'all' else (args.target,)
+    iterations = 1 if args.record else args.iterations
+    results = {}
+    for target in targets:
+        if target == 'memory':
+            calls = memory_calls()
+        else:
+            calls = router_calls(llm) if target == 'router' else specialist_calls(llm)
+        results[target] = profile(target, calls, iterations, args)
+
+    if args.record:
+        print(f"\nCassette {args.cassette} now holds {len(cassette)} exchanges")
+    else:
+        replay = llm.stats()
+        print(f"\nReplay: {replay['hits']} hits, {replay['misses']} misses from {replay['entries']} recorded exchanges")
+        if replay['misses']:
+            print("Misses mean prompts changed since recording; re-record the cassette to profile them.")
+    return results
+
+if __name__ == '__main__':
+    main()
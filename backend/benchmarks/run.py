@@ -0,0 +1,238 @@
+"""Offline load test: drives the Flask app in-process against the stub provider.
+
+Each simulated session activates a key, sends one routed message and then
+chats with the chosen specialist. Sessions run on a thread pool at the
+requested concurrency. Results are written as JSON so runs can be compared
+across commits. --cassette swaps the stub for recorded provider responses
+(see utils/replay_llm.py):
+
+    cd backend
+    python -m benchmarks.run --sessions 200 --concurrency 16 --output bench.json
+    python -m benchmarks.run --sessions 200 --concurrency 16 --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+COMPLAINTS = [
+    "I've had chest pain and my heart keeps racing when I climb stairs",
+    "There's an itchy red rash spreading on my arms",
+    "My knee has been swollen since I twisted it playing football",
+    "I've been feeling anxious and can't sleep for weeks",
+    "My son has had a fever and an earache since yesterday",
+    "I think I might be pregnant and want to know what to do next",
+    "I have a painful lump near my groin that might be a hernia",
+    "I just don't feel well and I'm tired all the time",
+    "Something is wrong but I'm not sure who I should talk to",
+]
+
+FOLLOW_UPS = [
+    "It started about two weeks ago.",
+    "It gets worse in the evening.",
+    "I haven't taken anything for it yet.",
+    "Should I be worried about this?",
+    "What would you recommend as a next step?",
+]
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=100, help='simulated user sessions')
+    parser.add_argument('--concurrency', type=int, default=8, help='sessions in flight at once')
+    parser.add_argument('--turns', type=int, default=4, help='requests per session after activation')
+    parser.add_argument('--latency', default='lognormal:0.6,0.4',
+                        help="provider time-to-first-token: zero | fixed:S | uniform:LO,HI | lognormal:MEDIAN,SIGMA")
+    parser.add_argument('--token-rate', type=float, default=50.0, help='simulated output tokens per second (0 = instant)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of provider calls that fail with 503')
+    parser.add_argument('--reply-tokens', type=int, default=120, help='tokens per specialist reply')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--cassette', help='answer from this replay cassette instead of the stub provider')
+    parser.add_argument('--record', action='store_true', help='fill --cassette from the --upstream provider')
+    parser.add_argument('--upstream', default='openai', help='provider to record from')
+    parser.add_argument('--timing', choices=('original', 'zero'), default='original', help='replay latency')
+    parser.add_argument('--rate-limit', action='store_true', help='keep the outbound rate limiter enabled')
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--compare', help='print deltas against a previous results JSON')
+    return parser.parse_args(argv)
+
+def configure_environment(args: argparse.Namespace):
+    """Settings that must be in place before the app and its singletons are imported."""
+    if not os.environ.get('ENCRYPTION_KEY'):
+        from cryptography.fernet import Fernet
+        os.environ['ENCRYPTION_KEY'] = Fernet.generate_key().decode()
+    if not args.rate_limit:
+        os.environ['LLM_RATE_LIMIT_ENABLED'] = 'false'
+    os.environ.setdefault('CONVERSATION_BACKEND', 'memory')
+    # The test client's filesystem session backend cannot store the signed session id.
+    os.environ.setdefault('SESSION_BACKEND', 'memory')
+
+def percentiles(values: List[float]) -> Dict:
+    if not values:
+        return {'count': 0}
+    ordered = sorted(values)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+    return {
+        'count': len(ordered),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 2),
+        'p50_ms': pick(0.50),
+        'p95_ms': pick(0.95),
+        'p99_ms': pick(0.99),
+        'max_ms': round(ordered[-1] * 1000, 2)
+    }
+
+def rss_bytes() -> int:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+class SessionDriver:
+    """Runs simulated sessions against a Flask test client and collects timings."""
+
+    def __init__(self, app, provider: str, turns: int, seed: int, api_key: Optional[str] = None):
+        self.app = app
+        self.provider = provider
+        self.api_key = api_key
+        self.turns = turns
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def _request(self, client, path: str, payload: Dict) -> Optional[Dict]:
+        started = time.perf_counter()
+        try:
+            response = client.post(path, json=payload, base_url='https://localhost')
+            data = response.get_json(silent=True) or {}
+            ok = response.status_code == 200 and data.get('success', False)
+            response.close()
+        except Exception as e:
+            # A request that blows up inside the app is one error, not the end of the run.
+            print(f"{path} failed: {type(e).__name__}: {str(e)}", file=sys.stderr)
+            data, ok = {}, False
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.samples.setdefault(path, []).append(elapsed)
+            if not ok:
+                self.errors[path] = self.errors.get(path, 0) + 1
+        return data if ok else None
+
+    def run_session(self, index: int):
+        rng = random.Random(self.seed * 100003 + index)
+        client = self.app.test_client()
+        if self._request(client, '/api/activate', {'apiKey': self.api_key or f'bench-key-{index % 50}',
+                                                     'provider': self.provider}) is None:
+            return
+
+        agent_id = None
+        for _ in range(self.turns):
+            if agent_id is None:
+                data = self._request(client, '/api/route', {'message': rng.choice(COMPLAINTS)})
+                agent_id = (data or {}).get('route_to')
+            else:
+                self._request(client, '/api/chat', {'message': rng.choice(FOLLOW_UPS), 'agent_id': agent_id})
+
+def compare(results: Dict, baseline: Dict):
+    print(f"\nCompared with {baseline.get('git_commit') or 'baseline'} ({baseline.get('timestamp')}):")
+    rows = [('throughput_rps', results['throughput_rps'], baseline.get('throughput_rps'))]
+    for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+        rows.append((f"latency {key}", results['latency']['all'].get(key), baseline.get('latency', {}).get('all', {}).get(key)))
+    rows.append(('bytes/session (rss)', results['memory']['rss_bytes_per_session'],
+                 baseline.get('memory', {}).get('rss_bytes_per_session')))
+    for name, current, previous in rows:
+        if previous:
+            change = (current - previous) / previous * 100
+            print(f"  {name:<22} {previous:>12} -> {current:>12}  ({change:+.1f}%)")
+        else:
+            print(f"  {name:<22} {'n/a':>12} -> {current:>12}")
+
+def main(argv: Optional[List[str]] = None) -> Dict:
+    args = parse_args(argv)
+    configure_environment(args)
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from config import Config
+    from utils.llm_factory import provider_family
+    from utils.replay_llm import register_replay_provider
+    from benchmarks.stub_provider import register_stub_provider
+
+    stubs, provider, api_key = [], 'stub', None
+    if args.cassette:
+        register_replay_provider(args.cassette, mode='record' if args.record else 'replay',
+                                 timing=args.timing, upstream=args.upstream)
+        provider = 'replay'
+        if args.record:
+            api_key = Config.FALLBACK_API_KEYS.get(provider_family(args.upstream))
+            if not api_key:
+                sys.exit(f"Recording from {args.upstream} needs its API key in the environment")
+    else:
+        stubs = register_stub_provider(latency=args.latency, token_rate=args.token_rate, error_rate=args.error_rate,
+                                       reply_tokens=args.reply_tokens, seed=args.seed)
+
+    from app import app
+    from memory.conversation_memory import conversation_manager
+
+    driver = SessionDriver(app, provider, args.turns, args.seed, api_key)
+    rss_before = rss_bytes()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(driver.run_session, range(args.sessions)))
+    duration = time.perf_counter() - started
+    rss_after = rss_bytes()
+
+    all_samples = [value for values in driver.samples.values() for value in values]
+    conversation_stats = conversation_manager.stats()
+    results = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'git_commit': git_commit(),
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'duration_s': round(duration, 3),
+        'requests': len(all_samples),
+        'errors': sum(driver.errors.values()),
+        'throughput_rps': round(len(all_samples) / duration, 2) if duration else 0.0,
+        'latency': dict({'all': percentiles(all_samples)},
+                        **{path: percentiles(values) for path, values in sorted(driver.samples.items())}),
+        'errors_by_route': driver.errors,
+        'memory': {
+            'rss_bytes_per_session': round(max(0, rss_after - rss_before) / max(1, args.sessions)),
+            'conversation_bytes_per_session': conversation_stats.get('avg_bytes_per_session'),
+            'conversation_sessions': conversation_stats.get('sessions')
+        },
+        'provider_calls': {
+            'calls': sum(stub.stats()['calls'] for stub in stubs),
+            'errors': sum(stub.stats()['errors'] for stub in stubs)
+        }
+    }
+
+    print(json.dumps({key: results[key] for key in ('requests', 'errors', 'throughput_rps', 'latency', 'memory')}, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+    return results
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Simulated LLM provider for offline benchmarks.
+
+Replies are shaped like the real agents' (the router ends with a ROUTE_TO
+marker) and pay a sampled time-to-first-token plus a per-token generation
+delay, so the request pipeline sees realistic waits without network or cost.
+"""
+
+import asyncio
+import math
+import random
+import threading
+import time
+import zlib
+from typing import Callable, Dict, Iterator, List, Optional
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from agents.agent_config import get_registry
+from agents.router_agent import ROUTE_MARKER
+from utils.llm_factory import LLMFactory
+from utils.tokens import estimate_tokens
+
+FILLER = ("Based on what you have described I would like to understand a little more about your "
+          "symptoms how long they have lasted and whether anything makes them better or worse ").split()
+
+class StubProviderError(Exception):
+    """Simulated transient provider failure (HTTP 503)."""
+    status_code = 503
+
+def parse_distribution(spec: str) -> Callable[[random.Random], float]:
+    """Latency sampler from 'zero', 'fixed:S', 'uniform:LO,HI' or 'lognormal:MEDIAN,SIGMA' (seconds)."""
+    kind, _, args = spec.partition(':')
+    values = [float(v) for v in args.split(',') if v]
+    if kind == 'zero':
+        return lambda rng: 0.0
+    if kind == 'fixed' and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == 'uniform' and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == 'lognormal' and len(values) == 2:
+        mu = math.log(values[0])
+        return lambda rng: rng.lognormvariate(mu, values[1])
+    raise ValueError(f"Unsupported latency distribution: {spec}")
+
+class StubLLM:
+    def __init__(self, latency: Callable[[random.Random], float], token_rate: float = 50.0,
+                 error_rate: float = 0.0, reply_tokens: int = 120, seed: Optional[int] = None,
+                 model: str = 'stub'):
+        self.latency = latency
+        self.token_rate = token_rate
+        self.error_rate = error_rate
+        self.reply_tokens = reply_tokens
+        self.model_name = model
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {'calls': 0, 'errors': 0}
+
+    def _reply(self, messages) -> List[str]:
+        system = messages[0].content if messages and hasattr(messages[0], 'content') else ''
+        last = messages[-1].content if messages and hasattr(messages[-1], 'content') else str(messages[-1])
+        with self.lock:
+            words = [self.rng.choice(FILLER) for _ in range(self.reply_tokens)]
+            agent_ids = list(get_registry().by_id)
+            specialist = agent_ids[zlib.crc32(last.encode()) % len(agent_ids)]
+        words[0] = words[0].capitalize()
+        if ROUTE_MARKER in system:
+            return words[:40] + [f"\n\n{ROUTE_MARKER}", specialist]
+        return words
+
+    def _plan(self, messages):
+        with self.lock:
+            self.counts['calls'] += 1
+            first_token = self.latency(self.rng)
+            failed = self.rng.random() < self.error_rate
+            if failed:
+                self.counts['errors'] += 1
+        return first_token, failed
+
+    def _message(self, messages, words: List[str]) -> AIMessage:
+        content = " ".join(words)
+        prompt = sum(estimate_tokens(getattr(m, 'content', str(m))) for m in messages)
+        return AIMessage(content=content, usage_metadata={
+            'input_tokens': prompt, 'output_tokens': len(words), 'total_tokens': prompt + len(words)
+        })
+
+    def _generation_time(self, words: List[str]) -> float:
+        return len(words) / self.token_rate if self.token_rate > 0 else 0.0
+
+    def invoke(self, messages) -> AIMessage:
+        first_token, failed = self._plan(messages)
+        time.sleep(first_token)
+        if failed:
+            raise StubProviderError("Simulated provider error")
+        words = self._reply(messages)
+        time.sleep(self._generation_time(words))
+        return self._message(messages, words)
+
+    async def ainvoke(self, messages) -> AIMessage:
+        first_token, failed = self._plan(messages)
+        await asyncio.sleep(first_token)
+        if failed:
+            raise StubProviderError("Simulated provider error")
+        words = self._reply(messages)
+        await asyncio.sleep(self._generation_time(words))
+        return self._message(messages, words)
+
+    def stream(self, messages) -> Iterator[AIMessageChunk]:
+        first_token, failed = self._plan(messages)
+        time.sleep(first_token)
+        if failed:
+            raise StubProviderError("Simulated provider error")
+        delay = 1 / self.token_rate if self.token_rate > 0 else 0.0
+        for index, word in enumerate(self._reply(messages)):
+            if index:
+                time.sleep(delay)
+            yield AIMessageChunk(content=word if index == 0 else " " + word)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return dict(self.counts)
+
+def register_stub_provider(name: str = 'stub', latency: str = 'lognormal:0.6,0.4', token_rate: float = 50.0,
+                           error_rate: float = 0.0, reply_tokens: int = 120, seed: Optional[int] = None) -> List[StubLLM]:
+    """Registers ``name`` in LLMFactory; returns the list that collects every client it creates."""
+    sampler = parse_distribution(latency)
+    created: List[StubLLM] = []
+
+    def factory(api_key: str, model: Optional[str] = None) -> StubLLM:
+        llm = StubLLM(sampler, token_rate, error_rate, reply_tokens,
+                      seed=None if seed is None else seed + len(created), model=model or name)
+        created.append(llm)
+        return llm
+
+    LLMFactory.register_provider(name, factory)
+    return created
@@ -13,9 +13,101 @@ class Config:
     SESSION_PERMANENT = False
     SESSION_USE_SIGNER = True
     SESSION_KEY_PREFIX = 'vrg_law_'
+    # 'filesystem' (Flask-Session), 'memory' (single worker) or 'redis'; redis when REDIS_URL is set
+    SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'redis' if os.environ.get('REDIS_URL') else 'filesystem')
+    SESSION_SWEEP_INTERVAL = float(os.environ.get('SESSION_SWEEP_INTERVAL', 60))
     
     PERMANENT_SESSION_LIFETIME = 86400
     
+    LLM_POOL_MAX_SIZE = int(os.environ.get('LLM_POOL_MAX_SIZE', 256))
+    LLM_POOL_IDLE_TTL = int(os.environ.get('LLM_POOL_IDLE_TTL', 1800))
+    
+    GROK_MAX_CONNECTIONS = int(os.environ.get('GROK_MAX_CONNECTIONS', 32))
+    GROK_TIMEOUT = float(os.environ.get('GROK_TIMEOUT', 30))
+    
+    LLM_RATE_LIMIT_ENABLED = os.environ.get('LLM_RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    LLM_RATE_LIMIT_RPM = float(os.environ.get('LLM_RATE_LIMIT_RPM', 300))
+    LLM_RATE_LIMITS = {
+        name.strip(): float(rpm)
+        for name, rpm in (item.split('=', 1) for item in os.environ.get('LLM_RATE_LIMITS', '').split(',') if '=' in item)
+    }
+    LLM_RATE_LIMIT_BURST = float(os.environ.get('LLM_RATE_LIMIT_BURST', 20))
+    LLM_RATE_LIMIT_MAX_WAIT = float(os.environ.get('LLM_RATE_LIMIT_MAX_WAIT', 10))
+    LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', 3))
+    LLM_RETRY_BASE_DELAY = float(os.environ.get('LLM_RETRY_BASE_DELAY', 0.5))
+    
+    LLM_RESILIENCE_ENABLED = os.environ.get('LLM_RESILIENCE_ENABLED', 'true').lower() == 'true'
+    LLM_FALLBACK_CHAIN = [p.strip() for p in os.environ.get('LLM_FALLBACK_CHAIN', '').split(',') if p.strip()]
+    FALLBACK_API_KEYS = {
+        'openai': os.environ.get('OPENAI_API_KEY'),
+        'anthropic': os.environ.get('ANTHROPIC_API_KEY'),
+        'grok': os.environ.get('XAI_API_KEY')
+    }
+    CIRCUIT_BREAKER_THRESHOLD = int(os.environ.get('CIRCUIT_BREAKER_THRESHOLD', 5))
+    CIRCUIT_BREAKER_RESET = float(os.environ.get('CIRCUIT_BREAKER_RESET', 30))
+    LLM_HEDGE_ENABLED = os.environ.get('LLM_HEDGE_ENABLED', 'false').lower() == 'true'
+    LLM_HEDGE_MIN_SAMPLES = int(os.environ.get('LLM_HEDGE_MIN_SAMPLES', 20))
+    LLM_HEDGE_MIN_DELAY = float(os.environ.get('LLM_HEDGE_MIN_DELAY', 0.5))
+    LLM_HEDGE_WORKERS = int(os.environ.get('LLM_HEDGE_WORKERS', 16))
+    
+    LLM_REPLAY_CASSETTE = os.environ.get('LLM_REPLAY_CASSETTE')
+    LLM_REPLAY_MODE = os.environ.get('LLM_REPLAY_MODE', 'replay')
+    LLM_REPLAY_TIMING = os.environ.get('LLM_REPLAY_TIMING', 'original')
+    LLM_REPLAY_UPSTREAM = os.environ.get('LLM_REPLAY_UPSTREAM', 'openai')
+    
+    KEY_VALIDATION_TTL = int(os.environ.get('KEY_VALIDATION_TTL', 3600))
+    
+    ROUTER_CLASSIFIER_ENABLED = os.environ.get('ROUTER_CLASSIFIER_ENABLED', 'true').lower() == 'true'
+    ROUTER_CLASSIFIER_THRESHOLD = float(os.environ.get('ROUTER_CLASSIFIER_THRESHOLD', 0.8))
+    
+    PROMPT_CACHE_ENABLED = os.environ.get('PROMPT_CACHE_ENABLED', 'true').lower() == 'true'
+    
+    SPECULATIVE_ROUTING = os.environ.get('SPECULATIVE_ROUTING', 'false').lower() == 'true'
+    SPECULATIVE_MIN_CONFIDENCE = float(os.environ.get('SPECULATIVE_MIN_CONFIDENCE', 0.6))
+    SPECULATIVE_WORKERS = int(os.environ.get('SPECULATIVE_WORKERS', 16))
+    
+    AGENT_CONFIG_RELOAD_INTERVAL = float(os.environ.get('AGENT_CONFIG_RELOAD_INTERVAL', 2))
+    
+    REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    CONVERSATION_BACKEND = os.environ.get('CONVERSATION_BACKEND', 'memory')
+    CONVERSATION_MAX_MESSAGES = int(os.environ.get('CONVERSATION_MAX_MESSAGES', 200))
+    CONVERSATION_TTL = int(os.environ.get('CONVERSATION_TTL', 86400))
+    CONVERSATION_MAX_SESSIONS = int(os.environ.get('CONVERSATION_MAX_SESSIONS', 10000))
+    CONVERSATION_COLD_AFTER = int(os.environ.get('CONVERSATION_COLD_AFTER', 900))
+    CONVERSATION_SQLITE_PATH = os.environ.get('CONVERSATION_SQLITE_PATH', 'data/conversations.db')
+    CONVERSATION_FLUSH_INTERVAL = float(os.environ.get('CONVERSATION_FLUSH_INTERVAL', 1.0))
+    CONVERSATION_FLUSH_BATCH = int(os.environ.get('CONVERSATION_FLUSH_BATCH', 500))
+    CONVERSATION_PURGE_INTERVAL = int(os.environ.get('CONVERSATION_PURGE_INTERVAL', 300))
+    
+    ROUTER_HISTORY_TOKENS = int(os.environ.get('ROUTER_HISTORY_TOKENS', 1000))
+    SPECIALIST_HISTORY_TOKENS = int(os.environ.get('SPECIALIST_HISTORY_TOKENS', 3000))
+    # Seconds to wait for tiktoken's encoding (a download unless TIKTOKEN_CACHE_DIR holds it)
+    TOKENIZER_LOAD_TIMEOUT = float(os.environ.get('TOKENIZER_LOAD_TIMEOUT', 5))
+    
+    # Off by default: each summary is an extra LLM call billed to the user's key
+    SUMMARY_ENABLED = os.environ.get('SUMMARY_ENABLED', 'false').lower() == 'true'
+    SUMMARY_WORKERS = int(os.environ.get('SUMMARY_WORKERS', 2))
+    SUMMARY_MIN_MESSAGES = int(os.environ.get('SUMMARY_MIN_MESSAGES', 4))
+    
+    CHAT_BATCH_WORKERS = int(os.environ.get('CHAT_BATCH_WORKERS', 8))
+    CHAT_BATCH_MAX_ITEMS = int(os.environ.get('CHAT_BATCH_MAX_ITEMS', 100))
+    # Each distinct "session" label is a conversation in the shared store; cap them so a batch can't evict other users
+    CHAT_BATCH_MAX_SESSIONS = int(os.environ.get('CHAT_BATCH_MAX_SESSIONS', 10))
+    
+    CONSULT_TOP_K = int(os.environ.get('CONSULT_TOP_K', 3))
+    CONSULT_MAX_AGENTS = int(os.environ.get('CONSULT_MAX_AGENTS', 5))
+    CONSULT_DEADLINE = float(os.environ.get('CONSULT_DEADLINE', 20))
+    CONSULT_WORKERS = int(os.environ.get('CONSULT_WORKERS', 16))
+    
+    RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'false').lower() == 'true'
+    RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'memory')
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 3600))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 1000))
+    RESPONSE_CACHE_MAX_HISTORY_CHARS = int(os.environ.get('RESPONSE_CACHE_MAX_HISTORY_CHARS', 600))
+    
+    STATIC_ROOT = os.environ.get('STATIC_ROOT')
+    STATIC_RELOAD_INTERVAL = float(os.environ.get('STATIC_RELOAD_INTERVAL', 0))
+    
     MAX_TOKENS = 2000
     TEMPERATURE = 0.7
     
@@ -1,73 +1,456 @@
-from langchain.memory import ConversationBufferMemory, ConversationSummaryMemory
 from langchain.schema import BaseMessage, HumanMessage, AIMessage
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import bisect
 import json
+import sys
+import threading
+import time
+import zlib
+from config import Config
+from utils.tokens import estimate_tokens, CHARS_PER_TOKEN
+
+class ChatRecord:
+    __slots__ = ('is_human', 'text', 'tokens')
+
+    def __init__(self, is_human: bool, text: str, tokens: Optional[int] = None):
+        self.is_human = is_human
+        self.text = text
+        self.tokens = estimate_tokens(self.render()) if tokens is None else tokens
+
+    def render(self) -> str:
+        return f"Client: {self.text}" if self.is_human else f"Attorney: {self.text}"
+
+    def to_message(self) -> BaseMessage:
+        return HumanMessage(content=self.text) if self.is_human else AIMessage(content=self.text)
+
+def select_window(token_counts: List[int], max_messages: Optional[int] = None, max_tokens: Optional[int] = None) -> int:
+    """Index of the first record that fits in the newest-first message and token budgets."""
+    start = len(token_counts)
+    total = 0
+    while start > 0:
+        if max_messages is not None and len(token_counts) - start >= max_messages:
+            break
+        if max_tokens is not None and total + token_counts[start - 1] > max_tokens:
+            break
+        total += token_counts[start - 1]
+        start -= 1
+    return start
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    return text if len(text) <= max_chars else "..." + text[-max_chars:]
+
+def history_budget(max_tokens: Optional[int], summary_tokens: int) -> Optional[int]:
+    # The running summary is paid for out of the same budget, but never takes more than half of it.
+    if max_tokens is None or not summary_tokens:
+        return max_tokens
+    return max(max_tokens - summary_tokens, max_tokens // 2)
+
+def with_summary(summary: Optional[str], transcript: str) -> str:
+    if not summary:
+        return transcript
+    return f"Summary of earlier conversation:\n{summary}\n\nRecent conversation:\n{transcript}"
+
+def summary_message(summary: str) -> HumanMessage:
+    return HumanMessage(content=f"Summary of earlier conversation:\n{summary}")
+
+def window_to_messages(records: List[ChatRecord], summary: Optional[str] = None,
+                       truncate_tokens: Optional[int] = None) -> List[BaseMessage]:
+    """Window records as Human/AI messages, after the running summary if there is one.
+
+    ``truncate_tokens`` cuts a single oversized record down to the budget.
+    """
+    messages = [summary_message(summary)] if summary else []
+    if truncate_tokens and records:
+        record = records[-1]
+        text = truncate_to_tokens(record.text, truncate_tokens)
+        return messages + [HumanMessage(content=text) if record.is_human else AIMessage(content=text)]
+    return messages + [record.to_message() for record in records]
+
+def format_records(records: List[ChatRecord], max_messages: Optional[int] = None, max_tokens: Optional[int] = None,
+                   summary: Optional[str] = None) -> str:
+    max_tokens = history_budget(max_tokens, estimate_tokens(summary) if summary else 0)
+    start = select_window([record.tokens for record in records], max_messages, max_tokens)
+    if start == len(records) and records and max_tokens:
+        return with_summary(summary, truncate_to_tokens(records[-1].render(), max_tokens))
+    return with_summary(summary, "\n".join(record.render() for record in records[start:]))
+
+def records_to_messages(records: List[ChatRecord], max_messages: Optional[int] = None, max_tokens: Optional[int] = None,
+                        summary: Optional[str] = None) -> List[BaseMessage]:
+    max_tokens = history_budget(max_tokens, estimate_tokens(summary) if summary else 0)
+    start = select_window([record.tokens for record in records], max_messages, max_tokens)
+    if start == len(records) and records and max_tokens:
+        return window_to_messages(records[-1:], summary, truncate_tokens=max_tokens)
+    return window_to_messages(records[start:], summary)
+
+def summary_work(records: List[ChatRecord], dropped: int, summarized_upto: int, max_tokens: int,
+                 summary: Optional[str], min_messages: int) -> Optional[Tuple[List[ChatRecord], int]]:
+    """Records that fell out of the context window and are not yet summarized.
+
+    Positions are absolute (``dropped`` records were trimmed from the front),
+    so the returned end position stays valid while new messages arrive.
+    """
+    budget = history_budget(max_tokens, estimate_tokens(summary) if summary else 0)
+    start = select_window([record.tokens for record in records], None, budget)
+    first = max(summarized_upto, dropped)
+    end = dropped + start
+    if end - first < min_messages:
+        return None
+    return records[first - dropped:start], end
+
+class SessionState:
+    """A session's records plus an incrementally maintained transcript.
+
+    ``transcript`` is the rendered "Client:/Attorney:" text of every record,
+    ``offsets[i]`` is where record i starts in it and ``cumulative_tokens[i]``
+    is the token count of the records before i, so a budgeted window is a
+    bisect and a slice instead of a re-render.
+    """
+
+    __slots__ = ('records', 'current_agent', 'metadata', 'last_access', 'transcript', 'offsets', 'cumulative_tokens',
+                 'dropped', 'summary', 'summary_tokens', 'summarized_upto')
+
+    def __init__(self, records: Optional[List[ChatRecord]] = None, current_agent: str = 'router',
+                 metadata: Optional[Dict] = None, last_access: float = 0.0, dropped: int = 0,
+                 summary: Optional[str] = None, summarized_upto: int = 0):
+        self.records = []
+        self.current_agent = current_agent
+        self.metadata = metadata if metadata is not None else {}
+        self.last_access = last_access
+        self.transcript = ""
+        self.offsets = []
+        self.cumulative_tokens = [0]
+        self.dropped = dropped
+        self.summary = summary
+        self.summary_tokens = estimate_tokens(summary) if summary else 0
+        self.summarized_upto = summarized_upto
+        for record in records or []:
+            self.append(record)
+
+    def append(self, record: ChatRecord):
+        if self.records:
+            self.transcript += "\n"
+        self.offsets.append(len(self.transcript))
+        self.transcript += record.render()
+        self.cumulative_tokens.append(self.cumulative_tokens[-1] + record.tokens)
+        self.records.append(record)
+
+    def trim(self, max_messages: int):
+        drop = len(self.records) - max_messages
+        if drop <= 0:
+            return
+        char_offset = self.offsets[drop]
+        token_offset = self.cumulative_tokens[drop]
+        del self.records[:drop]
+        self.dropped += drop
+        self.transcript = self.transcript[char_offset:]
+        self.offsets = [offset - char_offset for offset in self.offsets[drop:]]
+        self.cumulative_tokens = [tokens - token_offset for tokens in self.cumulative_tokens[drop:]]
+
+    def window_start(self, max_messages: Optional[int] = None, max_tokens: Optional[int] = None) -> int:
+        count = len(self.records)
+        start = 0
+        if max_tokens is not None:
+            start = bisect.bisect_left(self.cumulative_tokens, self.cumulative_tokens[-1] - max_tokens, 0, count + 1)
+        if max_messages is not None:
+            start = max(start, count - max_messages)
+        return start
+
+    def window(self, max_messages: Optional[int] = None, max_tokens: Optional[int] = None) -> str:
+        max_tokens = history_budget(max_tokens, self.summary_tokens)
+        count = len(self.records)
+        start = self.window_start(max_messages, max_tokens)
+        if start >= count:
+            if count and max_tokens:
+                return with_summary(self.summary, truncate_to_tokens(self.records[-1].render(), max_tokens))
+            return with_summary(self.summary, "") if self.summary else ""
+        return with_summary(self.summary, self.transcript[self.offsets[start]:])
+
+    def window_messages(self, max_messages: Optional[int] = None, max_tokens: Optional[int] = None) -> List[BaseMessage]:
+        max_tokens = history_budget(max_tokens, self.summary_tokens)
+        count = len(self.records)
+        start = self.window_start(max_messages, max_tokens)
+        if start >= count and count and max_tokens:
+            return window_to_messages(self.records[-1:], self.summary, truncate_tokens=max_tokens)
+        return window_to_messages(self.records[start:], self.summary)
+
+    def set_summary(self, summary: str, summarized_upto: int):
+        if summarized_upto > self.summarized_upto:
+            self.summary = summary
+            self.summary_tokens = estimate_tokens(summary)
+            self.summarized_upto = summarized_upto
+
+    def compress(self) -> bytes:
+        payload = {
+            'm': [[int(record.is_human), record.text, record.tokens] for record in self.records],
+            'a': self.current_agent,
+            'd': self.metadata,
+            'x': self.dropped,
+            's': self.summary,
+            'u': self.summarized_upto
+        }
+        return zlib.compress(json.dumps(payload).encode())
+
+    @classmethod
+    def decompress(cls, blob: bytes, last_access: float) -> 'SessionState':
+        payload = json.loads(zlib.decompress(blob))
+        records = [ChatRecord(bool(is_human), text, tokens) for is_human, text, tokens in payload['m']]
+        return cls(records, payload['a'], payload['d'], last_access, payload['x'], payload['s'], payload['u'])
+
+    def size_bytes(self) -> int:
+        size = (sys.getsizeof(self) + sys.getsizeof(self.records) + sys.getsizeof(self.metadata)
+                + sys.getsizeof(self.transcript) + sys.getsizeof(self.offsets) + sys.getsizeof(self.cumulative_tokens))
+        for record in self.records:
+            size += sys.getsizeof(record) + sys.getsizeof(record.text)
+        return size
 
 class ConversationManager:
-    def __init__(self):
-        self.sessions: Dict[str, Dict] = {}
-    
-    def get_or_create_memory(self, session_id: str, llm=None) -> ConversationBufferMemory:
-        if session_id not in self.sessions:
-            self.sessions[session_id] = {
-                'memory': ConversationBufferMemory(
-                    memory_key="chat_history",
-                    return_messages=True,
-                    output_key="response"
-                ),
-                'current_agent': 'router',
-                'metadata': {}
-            }
-        return self.sessions[session_id]['memory']
-    
+    """In-process conversation store with bounded memory.
+
+    Sessions hold compact slotted records instead of LangChain memory objects.
+    The store keeps at most ``max_sessions`` sessions (least recently used are
+    evicted first), moves sessions idle for ``cold_after`` seconds into a
+    zlib-compressed cold tier, and drops sessions idle for ``idle_ttl``
+    seconds. Sweeps run opportunistically at most every ``sweep_interval``.
+
+    With a ``store`` (SQLiteConversationStore), every change is also queued
+    for write-behind persistence, and a session missing from memory (after a
+    restart or an eviction) is reloaded from the store on first access.
+    """
+
+    def __init__(self, max_sessions: int = 10000, max_messages: int = 200, idle_ttl: float = 86400,
+                 cold_after: float = 900, sweep_interval: float = 60, store=None):
+        self.sessions: "OrderedDict[str, SessionState]" = OrderedDict()
+        self.cold_sessions: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self.idle_ttl = idle_ttl
+        self.cold_after = cold_after
+        self.sweep_interval = sweep_interval
+        self.last_sweep = time.monotonic()
+        self.evictions = 0
+        self.expirations = 0
+        self.store = store
+        self.lock = threading.RLock()
+
+    def _load(self, session_id: str) -> Optional[SessionState]:
+        """Reads a session missing from memory back from the store; never called under the lock."""
+        if not self.store:
+            return None
+        with self.lock:
+            missing = session_id not in self.sessions and session_id not in self.cold_sessions
+        return self.store.load_session(session_id) if missing else None
+
+    def _get_session(self, session_id: str, create: bool = False) -> Optional[SessionState]:
+        stored = self._load(session_id)
+        with self.lock:
+            return self._lookup(session_id, create, stored)
+
+    def _lookup(self, session_id: str, create: bool, stored: Optional[SessionState]) -> Optional[SessionState]:
+        now = time.monotonic()
+        self._maybe_sweep(now)
+        state = self.sessions.get(session_id)
+        if state is None and session_id in self.cold_sessions:
+            blob, last_access = self.cold_sessions.pop(session_id)
+            state = SessionState.decompress(blob, last_access)
+            self.sessions[session_id] = state
+
+        if state is None and stored is not None:
+            state = stored
+            self.sessions[session_id] = state
+            self._enforce_capacity()
+
+        if state is None:
+            if not create:
+                return None
+            state = SessionState()
+            self.sessions[session_id] = state
+            self._enforce_capacity()
+
+        state.last_access = now
+        self.sessions.move_to_end(session_id)
+        return state
+
+    def _enforce_capacity(self):
+        while len(self.sessions) + len(self.cold_sessions) > self.max_sessions:
+            if self.cold_sessions:
+                self.cold_sessions.popitem(last=False)
+            else:
+                self.sessions.popitem(last=False)
+            self.evictions += 1
+
+    def _maybe_sweep(self, now: float):
+        if now - self.last_sweep >= self.sweep_interval:
+            self.sweep(now)
+
+    def sweep(self, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            self.last_sweep = now
+
+            while self.cold_sessions:
+                session_id, (_, last_access) = next(iter(self.cold_sessions.items()))
+                if now - last_access < self.idle_ttl:
+                    break
+                del self.cold_sessions[session_id]
+                self.expirations += 1
+
+            while self.sessions:
+                session_id, state = next(iter(self.sessions.items()))
+                idle = now - state.last_access
+                if idle >= self.idle_ttl:
+                    del self.sessions[session_id]
+                    self.expirations += 1
+                elif self.cold_after and idle >= self.cold_after:
+                    del self.sessions[session_id]
+                    self.cold_sessions[session_id] = (state.compress(), state.last_access)
+                else:
+                    break
+
     def get_current_agent(self, session_id: str) -> str:
-        if session_id in self.sessions:
-            return self.sessions[session_id].get('current_agent', 'router')
-        return 'router'
-    
+        state = self._get_session(session_id)
+        return state.current_agent if state else 'router'
+
     def set_current_agent(self, session_id: str, agent_id: str):
-        if session_id in self.sessions:
-            self.sessions[session_id]['current_agent'] = agent_id
-    
+        state = self._get_session(session_id)
+        if state:
+            with self.lock:
+                state.current_agent = agent_id
+                self._persist(session_id, state)
+
+    def _persist(self, session_id: str, state: SessionState, new_records: List[ChatRecord] = ()):
+        if self.store:
+            self.store.save_session(session_id, state, new_records)
+
     def add_message(self, session_id: str, message: str, is_human: bool = True):
-        memory = self.get_or_create_memory(session_id)
-        if is_human:
-            memory.chat_memory.add_user_message(message)
-        else:
-            memory.chat_memory.add_ai_message(message)
-    
+        self.add_exchange_records(session_id, [ChatRecord(is_human, message)])
+
+    def add_exchange(self, session_id: str, human_message: str, *ai_messages: str, agent_id: Optional[str] = None):
+        records = [ChatRecord(True, human_message)] + [ChatRecord(False, message) for message in ai_messages]
+        self.add_exchange_records(session_id, records, agent_id)
+
+    def add_exchange_records(self, session_id: str, records: List[ChatRecord], agent_id: Optional[str] = None):
+        stored = self._load(session_id)
+        with self.lock:
+            state = self._lookup(session_id, True, stored)
+            for record in records:
+                state.append(record)
+            state.trim(self.max_messages)
+            if agent_id:
+                state.current_agent = agent_id
+            self._persist(session_id, state, records[-len(state.records):])
+
     def get_conversation_history(self, session_id: str) -> List[BaseMessage]:
-        if session_id in self.sessions:
-            memory = self.sessions[session_id]['memory']
-            return memory.chat_memory.messages
-        return []
-    
+        state = self._get_session(session_id)
+        return [record.to_message() for record in state.records] if state else []
+
     def clear_session(self, session_id: str):
-        if session_id in self.sessions:
-            del self.sessions[session_id]
-    
+        with self.lock:
+            self.sessions.pop(session_id, None)
+            self.cold_sessions.pop(session_id, None)
+        if self.store:
+            self.store.delete_session(session_id)
+
     def get_session_metadata(self, session_id: str) -> Dict:
-        if session_id in self.sessions:
-            return self.sessions[session_id].get('metadata', {})
-        return {}
-    
+        state = self._get_session(session_id)
+        return state.metadata if state else {}
+
     def set_session_metadata(self, session_id: str, key: str, value):
-        if session_id in self.sessions:
-            if 'metadata' not in self.sessions[session_id]:
-                self.sessions[session_id]['metadata'] = {}
-            self.sessions[session_id]['metadata'][key] = value
-    
-    def format_history_for_context(self, session_id: str, max_messages: int = 10) -> str:
-        messages = self.get_conversation_history(session_id)
-        recent_messages = messages[-max_messages:] if len(messages) > max_messages else messages
-        
-        formatted = []
-        for msg in recent_messages:
-            if isinstance(msg, HumanMessage):
-                formatted.append(f"Client: {msg.content}")
-            elif isinstance(msg, AIMessage):
-                formatted.append(f"Attorney: {msg.content}")
-        
-        return "\n".join(formatted)
-
-conversation_manager = ConversationManager()
\ No newline at end of file
+        state = self._get_session(session_id)
+        if state:
+            with self.lock:
+                state.metadata[key] = value
+                self._persist(session_id, state)
+
+    def format_history_for_context(self, session_id: str, max_messages: Optional[int] = None,
+                                   max_tokens: Optional[int] = None) -> str:
+        if max_messages is None and max_tokens is None:
+            max_messages = 10
+        state = self._get_session(session_id)
+        if not state:
+            return ""
+        with self.lock:
+            return state.window(max_messages, max_tokens)
+
+    def history_messages_for_context(self, session_id: str, max_messages: Optional[int] = None,
+                                     max_tokens: Optional[int] = None) -> List[BaseMessage]:
+        """The same window as format_history_for_context, as Human/AI messages for a native multi-turn prompt."""
+        if max_messages is None and max_tokens is None:
+            max_messages = 10
+        state = self._get_session(session_id)
+        if not state:
+            return []
+        with self.lock:
+            return state.window_messages(max_messages, max_tokens)
+
+    def get_summary_work(self, session_id: str, max_tokens: int, min_messages: int = 4):
+        """Return (summary, records, summarized_upto) for turns that fell out of the window, or None."""
+        with self.lock:
+            state = self.sessions.get(session_id)
+            if not state:
+                return None
+            work = summary_work(state.records, state.dropped, state.summarized_upto, max_tokens,
+                                state.summary, min_messages)
+            if not work:
+                return None
+            records, summarized_upto = work
+            return state.summary, list(records), summarized_upto
+
+    def set_summary(self, session_id: str, summary: str, summarized_upto: int):
+        with self.lock:
+            state = self.sessions.get(session_id)
+            if state:
+                state.set_summary(summary, summarized_upto)
+                self._persist(session_id, state)
+
+    def session_count(self) -> int:
+        return len(self.sessions) + len(self.cold_sessions)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            hot_bytes = sum(state.size_bytes() for state in self.sessions.values())
+            cold_bytes = sum(len(blob) for blob, _ in self.cold_sessions.values())
+            hot, cold = len(self.sessions), len(self.cold_sessions)
+        total = hot + cold
+        return {
+            'backend': 'memory',
+            'sessions': total,
+            'hot_sessions': hot,
+            'cold_sessions': cold,
+            'max_sessions': self.max_sessions,
+            'hot_bytes': hot_bytes,
+            'cold_bytes': cold_bytes,
+            'avg_bytes_per_session': (hot_bytes + cold_bytes) // total if total else 0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'persistence': self.store.stats() if self.store else None
+        }
+
+def create_conversation_manager():
+    if Config.CONVERSATION_BACKEND == 'redis':
+        from .redis_memory import RedisConversationManager
+        return RedisConversationManager.from_url(
+            Config.REDIS_URL,
+            max_messages=Config.CONVERSATION_MAX_MESSAGES,
+            ttl=Config.CONVERSATION_TTL
+        )
+    store = None
+    if Config.CONVERSATION_BACKEND == 'sqlite':
+        from .sqlite_store import SQLiteConversationStore
+        store = SQLiteConversationStore(
+            Config.CONVERSATION_SQLITE_PATH,
+            ttl=Config.CONVERSATION_TTL,
+            flush_interval=Config.CONVERSATION_FLUSH_INTERVAL,
+            batch_size=Config.CONVERSATION_FLUSH_BATCH,
+            purge_interval=Config.CONVERSATION_PURGE_INTERVAL
+        )
+    return ConversationManager(
+        max_sessions=Config.CONVERSATION_MAX_SESSIONS,
+        max_messages=Config.CONVERSATION_MAX_MESSAGES,
+        idle_ttl=Config.CONVERSATION_TTL,
+        cold_after=Config.CONVERSATION_COLD_AFTER,
+        store=store
+    )
+
+conversation_manager = create_conversation_manager()
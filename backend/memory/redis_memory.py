@@ -0,0 +1,150 @@
+from langchain.schema import BaseMessage
+from typing import Dict, List, Optional
+import json
+import time
+import redis
+
+from .conversation_memory import ChatRecord, format_records, records_to_messages, summary_work
+
+class RedisConversationManager:
+    """ConversationManager backed by Redis so every worker sees the same history.
+
+    Each session is a capped message list plus a small hash for the current
+    agent and metadata. Writes are pipelined and refresh the session TTL, so
+    recording a full exchange costs a single round-trip. A sorted set of
+    last-write times backs the live session count.
+    """
+
+    def __init__(self, client: redis.Redis, max_messages: int = 200, ttl: int = 86400, prefix: str = 'vrg_law:conv:'):
+        self.redis = client
+        self.max_messages = max_messages
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> 'RedisConversationManager':
+        return cls(redis.Redis.from_url(url, decode_responses=True), **kwargs)
+
+    def _messages_key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}:messages"
+
+    def _meta_key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}:meta"
+
+    def _encode(self, message: str, is_human: bool) -> str:
+        record = ChatRecord(is_human, message)
+        return json.dumps({'r': 'h' if is_human else 'a', 't': message, 'k': record.tokens})
+
+    def _decode(self, raw: str) -> ChatRecord:
+        record = json.loads(raw)
+        return ChatRecord(record['r'] == 'h', record['t'], record.get('k'))
+
+    def _touch(self, pipe, session_id: str):
+        pipe.expire(self._messages_key(session_id), self.ttl)
+        pipe.expire(self._meta_key(session_id), self.ttl)
+        pipe.zadd(f"{self.prefix}active", {session_id: time.time()})
+
+    def get_current_agent(self, session_id: str) -> str:
+        return self.redis.hget(self._meta_key(session_id), 'current_agent') or 'router'
+
+    def set_current_agent(self, session_id: str, agent_id: str):
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hset(self._meta_key(session_id), 'current_agent', agent_id)
+        self._touch(pipe, session_id)
+        pipe.execute()
+
+    def add_message(self, session_id: str, message: str, is_human: bool = True):
+        self.add_messages(session_id, [(message, is_human)])
+
+    def add_exchange(self, session_id: str, human_message: str, *ai_messages: str, agent_id: Optional[str] = None):
+        messages = [(human_message, True)] + [(message, False) for message in ai_messages]
+        self.add_messages(session_id, messages, agent_id=agent_id)
+
+    def add_messages(self, session_id: str, messages: List, agent_id: Optional[str] = None):
+        messages_key = self._messages_key(session_id)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.rpush(messages_key, *[self._encode(message, is_human) for message, is_human in messages])
+        pipe.ltrim(messages_key, -self.max_messages, -1)
+        pipe.hincrby(self._meta_key(session_id), 'total', len(messages))
+        if agent_id:
+            pipe.hset(self._meta_key(session_id), 'current_agent', agent_id)
+        self._touch(pipe, session_id)
+        pipe.execute()
+
+    def get_conversation_history(self, session_id: str) -> List[BaseMessage]:
+        return [self._decode(raw).to_message() for raw in self.redis.lrange(self._messages_key(session_id), 0, -1)]
+
+    def clear_session(self, session_id: str):
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.delete(self._messages_key(session_id), self._meta_key(session_id))
+        pipe.zrem(f"{self.prefix}active", session_id)
+        pipe.execute()
+
+    def get_session_metadata(self, session_id: str) -> Dict:
+        raw = self.redis.hget(self._meta_key(session_id), 'metadata')
+        return json.loads(raw) if raw else {}
+
+    def set_session_metadata(self, session_id: str, key: str, value):
+        metadata = self.get_session_metadata(session_id)
+        metadata[key] = value
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hset(self._meta_key(session_id), 'metadata', json.dumps(metadata))
+        self._touch(pipe, session_id)
+        pipe.execute()
+
+    def _recent(self, session_id: str, max_messages: Optional[int]):
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.lrange(self._messages_key(session_id), -(max_messages or self.max_messages), -1)
+        pipe.hget(self._meta_key(session_id), 'summary')
+        raw_messages, summary = pipe.execute()
+        return [self._decode(raw) for raw in raw_messages], summary
+
+    def format_history_for_context(self, session_id: str, max_messages: Optional[int] = None,
+                                   max_tokens: Optional[int] = None) -> str:
+        if max_messages is None and max_tokens is None:
+            max_messages = 10
+        records, summary = self._recent(session_id, max_messages)
+        return format_records(records, max_messages, max_tokens, summary)
+
+    def history_messages_for_context(self, session_id: str, max_messages: Optional[int] = None,
+                                     max_tokens: Optional[int] = None) -> List[BaseMessage]:
+        if max_messages is None and max_tokens is None:
+            max_messages = 10
+        records, summary = self._recent(session_id, max_messages)
+        return records_to_messages(records, max_messages, max_tokens, summary)
+
+    def get_summary_work(self, session_id: str, max_tokens: int, min_messages: int = 4):
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.lrange(self._messages_key(session_id), 0, -1)
+        pipe.hmget(self._meta_key(session_id), 'summary', 'summarized_upto', 'total')
+        raw_messages, (summary, summarized_upto, total) = pipe.execute()
+        records = [self._decode(raw) for raw in raw_messages]
+        dropped = int(total or len(records)) - len(records)
+        work = summary_work(records, dropped, int(summarized_upto or 0), max_tokens, summary, min_messages)
+        if not work:
+            return None
+        return summary, work[0], work[1]
+
+    def set_summary(self, session_id: str, summary: str, summarized_upto: int):
+        meta_key = self._meta_key(session_id)
+        if int(self.redis.hget(meta_key, 'summarized_upto') or 0) >= summarized_upto:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hset(meta_key, mapping={'summary': summary, 'summarized_upto': summarized_upto})
+        self._touch(pipe, session_id)
+        pipe.execute()
+
+    def session_count(self) -> int:
+        active_key = f"{self.prefix}active"
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zremrangebyscore(active_key, '-inf', time.time() - self.ttl)
+        pipe.zcard(active_key)
+        return pipe.execute()[1]
+
+    def stats(self) -> Dict:
+        return {
+            'backend': 'redis',
+            'sessions': self.session_count(),
+            'max_messages': self.max_messages,
+            'ttl': self.ttl
+        }
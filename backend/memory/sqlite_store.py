@@ -0,0 +1,246 @@
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .conversation_memory import ChatRecord, SessionState
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    current_agent TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    summary TEXT,
+    summarized_upto INTEGER NOT NULL DEFAULT 0,
+    dropped INTEGER NOT NULL DEFAULT 0,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_last_access ON sessions (last_access);
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT NOT NULL REFERENCES sessions (session_id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    is_human INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    tokens INTEGER NOT NULL,
+    PRIMARY KEY (session_id, position)
+) WITHOUT ROWID;
+"""
+
+UPSERT_SESSION = """
+INSERT INTO sessions (session_id, current_agent, metadata, summary, summarized_upto, dropped, last_access)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (session_id) DO UPDATE SET
+    current_agent = excluded.current_agent, metadata = excluded.metadata, summary = excluded.summary,
+    summarized_upto = excluded.summarized_upto, dropped = excluded.dropped, last_access = excluded.last_access
+"""
+
+MAX_RETRY_DELAY = 30
+
+def connect(path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute("PRAGMA foreign_keys=ON")
+    return connection
+
+class SQLiteConversationStore:
+    """Write-behind SQLite persistence for the in-memory ConversationManager.
+
+    Mutations are queued and applied by one writer thread, batched into a
+    transaction every ``flush_interval`` seconds (or sooner once
+    ``batch_size`` operations are waiting), so requests never wait on disk.
+    Sessions are read back only when the manager misses one in memory, e.g.
+    on first access after a restart; a session whose writes are still queued
+    is answered from the state that was queued, so reads never wait on the
+    writer. A batch that fails is retried, in order and with backoff, until
+    it commits. Sessions idle for longer than ``ttl``
+    are purged with one indexed DELETE; their messages go with them through
+    ON DELETE CASCADE.
+    """
+
+    def __init__(self, path: str, ttl: float = 86400, flush_interval: float = 1.0, batch_size: int = 500,
+                 purge_interval: float = 300):
+        self.path = path
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.purge_interval = purge_interval
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self.writer = connect(path)
+        self.writer.executescript(SCHEMA)
+        self.readers = threading.local()
+
+        self.queue: "queue.Queue[Tuple]" = queue.Queue()
+        self.lock = threading.Lock()
+        self.pending: Dict[str, int] = {}
+        # Latest state of every session with writes still queued (None once cleared), so a
+        # session evicted or cleared before its writes land is answered without touching disk.
+        self.unflushed: Dict[str, Optional[SessionState]] = {}
+        self.flushed = threading.Condition(self.lock)
+        self.counts = {'queued': 0, 'written': 0, 'batches': 0, 'errors': 0, 'retries': 0, 'rehydrated': 0,
+                       'purged': 0, 'flush_ms': 0.0}
+        self.next_purge = time.time() + purge_interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='conversation-writer', daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def _reader(self) -> sqlite3.Connection:
+        connection = getattr(self.readers, 'connection', None)
+        if connection is None:
+            connection = self.readers.connection = connect(self.path)
+        return connection
+
+    def _enqueue(self, session_id: str, operation: Tuple, state: Optional[SessionState]):
+        with self.lock:
+            self.pending[session_id] = self.pending.get(session_id, 0) + 1
+            self.unflushed[session_id] = state
+            self.counts['queued'] += 1
+        self.queue.put(operation)
+
+    def save_session(self, session_id: str, state: SessionState, new_records: List[ChatRecord] = ()):
+        """Queues the session's header row and any records appended since the last save."""
+        header = (session_id, state.current_agent, json.dumps(state.metadata), state.summary,
+                  state.summarized_upto, state.dropped, time.time())
+        first = state.dropped + len(state.records) - len(new_records)
+        rows = [(session_id, first + index, int(record.is_human), record.text, record.tokens)
+                for index, record in enumerate(new_records)]
+        self._enqueue(session_id, ('save', session_id, header, rows), state)
+
+    def delete_session(self, session_id: str):
+        self._enqueue(session_id, ('delete', session_id), None)
+
+    def load_session(self, session_id: str) -> Optional[SessionState]:
+        with self.lock:
+            if session_id in self.unflushed:
+                return self.unflushed[session_id]
+        connection = self._reader()
+        row = connection.execute(
+            "SELECT current_agent, metadata, summary, summarized_upto, dropped, last_access FROM sessions "
+            "WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None or row[5] < time.time() - self.ttl:
+            return None
+        current_agent, metadata, summary, summarized_upto, dropped, _ = row
+        records = [ChatRecord(bool(is_human), text, tokens) for is_human, text, tokens in connection.execute(
+            "SELECT is_human, text, tokens FROM messages WHERE session_id = ? AND position >= ? ORDER BY position",
+            (session_id, dropped))]
+        with self.lock:
+            self.counts['rehydrated'] += 1
+        return SessionState(records, current_agent, json.loads(metadata), time.monotonic(), dropped,
+                            summary, summarized_upto)
+
+    def _apply(self, operation: Tuple):
+        if operation[0] == 'delete':
+            self.writer.execute("DELETE FROM sessions WHERE session_id = ?", (operation[1],))
+            return
+        _, session_id, header, rows = operation
+        self.writer.execute(UPSERT_SESSION, header)
+        if rows:
+            self.writer.executemany(
+                "INSERT OR REPLACE INTO messages (session_id, position, is_human, text, tokens) VALUES (?, ?, ?, ?, ?)",
+                rows)
+        # header[5] is the session's trim offset: records before it fell out of the capped window.
+        self.writer.execute("DELETE FROM messages WHERE session_id = ? AND position < ?", (session_id, header[5]))
+
+    def _write(self, batch: List[Tuple]) -> bool:
+        started = time.perf_counter()
+        try:
+            self.writer.execute("BEGIN")
+            for operation in batch:
+                self._apply(operation)
+            self.writer.execute("COMMIT")
+        except sqlite3.Error as e:
+            if self.writer.in_transaction:
+                self.writer.execute("ROLLBACK")
+            print(f"Conversation persistence error, will retry: {str(e)}")
+            with self.lock:
+                self.counts['errors'] += 1
+            return False
+        with self.lock:
+            for operation in batch:
+                remaining = self.pending.get(operation[1], 0) - 1
+                if remaining > 0:
+                    self.pending[operation[1]] = remaining
+                else:
+                    self.pending.pop(operation[1], None)
+                    self.unflushed.pop(operation[1], None)
+            self.counts['written'] += len(batch)
+            self.counts['batches'] += 1
+            self.counts['flush_ms'] += (time.perf_counter() - started) * 1000
+            self.flushed.notify_all()
+        return True
+
+    def _drain(self, batch: List[Tuple]) -> List[Tuple]:
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0 and not self.stopped.is_set():
+                    batch.append(self.queue.get(timeout=remaining))
+                else:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _purge(self, now: float) -> int:
+        self.next_purge = now + self.purge_interval
+        deleted = self.writer.execute("DELETE FROM sessions WHERE last_access < ?", (now - self.ttl,)).rowcount
+        with self.lock:
+            self.counts['purged'] += deleted
+        return deleted
+
+    def _run(self):
+        failed: List[Tuple] = []
+        delay = 0.0
+        while not (self.stopped.is_set() and self.queue.empty() and not failed):
+            batch = None
+            if failed:
+                # A failed batch is retried whole and ahead of anything queued since, so the order holds.
+                time.sleep(delay)
+                with self.lock:
+                    self.counts['retries'] += 1
+                batch = self._drain(failed)
+            else:
+                try:
+                    batch = self._drain([self.queue.get(timeout=self.flush_interval)])
+                except queue.Empty:
+                    pass
+            if batch is not None:
+                if self._write(batch):
+                    failed, delay = [], 0.0
+                else:
+                    failed, delay = batch, min(max(delay * 2, self.flush_interval), MAX_RETRY_DELAY)
+            now = time.time()
+            if now >= self.next_purge:
+                try:
+                    self._purge(now)
+                except sqlite3.Error as e:
+                    print(f"Conversation purge error: {str(e)}")
+
+    def flush(self, timeout: float = 10.0):
+        """Blocks until everything queued so far is committed."""
+        with self.lock:
+            self.flushed.wait_for(lambda: not self.pending, timeout)
+
+    def close(self):
+        if self.stopped.is_set():
+            return
+        self.stopped.set()
+        self.thread.join(timeout=10)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            counts = dict(self.counts)
+            pending = sum(self.pending.values())
+        batches = counts.pop('batches')
+        flush_ms = counts.pop('flush_ms')
+        return dict(counts, path=self.path, pending=pending, batches=batches,
+                    avg_batch_size=round(counts['written'] / batches, 1) if batches else 0,
+                    avg_flush_ms=round(flush_ms / batches, 2) if batches else 0)
@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor
+from langchain.memory.prompt import SUMMARY_PROMPT
+from langchain.schema import HumanMessage
+from typing import Dict
+import threading
+
+from config import Config
+from utils.metrics import agent_scope
+from .conversation_memory import conversation_manager, format_records
+
+class ConversationSummarizer:
+    """Folds turns that fell out of the context window into a running summary.
+
+    Work runs on a small thread pool after the response has been produced, so
+    summarization never sits on a request's critical path. At most one job per
+    session is in flight; turns arriving meanwhile are picked up next time.
+    """
+
+    def __init__(self, manager, max_workers: int = 2, min_messages: int = 4):
+        self.manager = manager
+        self.min_messages = min_messages
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='summarizer')
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.counts = {'scheduled': 0, 'completed': 0, 'failed': 0}
+
+    def schedule(self, session_id: str, llm, max_tokens: int) -> bool:
+        with self.lock:
+            if session_id in self.pending:
+                return False
+            self.pending.add(session_id)
+            self.counts['scheduled'] += 1
+        self.executor.submit(self._summarize, session_id, llm, max_tokens)
+        return True
+
+    def _summarize(self, session_id: str, llm, max_tokens: int):
+        outcome = None
+        try:
+            work = self.manager.get_summary_work(session_id, max_tokens, self.min_messages)
+            if not work:
+                return
+            summary, records, summarized_upto = work
+
+            prompt = SUMMARY_PROMPT.format(summary=summary or "", new_lines=format_records(records))
+            with agent_scope('summarizer'):
+                response = llm.invoke([HumanMessage(content=prompt)])
+            new_summary = response.content if hasattr(response, 'content') else str(response)
+
+            self.manager.set_summary(session_id, new_summary.strip(), summarized_upto)
+            outcome = 'completed'
+        except Exception as e:
+            print(f"Summarization error for session {session_id}: {str(e)}")
+            outcome = 'failed'
+        finally:
+            with self.lock:
+                self.pending.discard(session_id)
+                if outcome:
+                    self.counts[outcome] += 1
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return dict(self.counts, in_flight=len(self.pending))
+
+conversation_summarizer = ConversationSummarizer(
+    conversation_manager,
+    max_workers=Config.SUMMARY_WORKERS,
+    min_messages=Config.SUMMARY_MIN_MESSAGES
+)
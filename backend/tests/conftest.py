@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND not in sys.path:
+    sys.path.insert(0, BACKEND)
+
+# Keep imports of app-level singletons self-contained: no Redis, no disk sessions, no background summaries.
+os.environ.setdefault('SESSION_BACKEND', 'memory')
+os.environ.setdefault('CONVERSATION_BACKEND', 'memory')
+os.environ.setdefault('SUMMARY_ENABLED', 'false')
+os.environ.setdefault('LLM_RATE_LIMIT_ENABLED', 'false')
+
+@pytest.fixture(scope='session')
+def app_module():
+    """The Flask app, with the benchmark's stub provider registered as 'stub'."""
+    from benchmarks.stub_provider import register_stub_provider
+    # Uneven per-call latency, so turns that ran concurrently would finish out of order.
+    register_stub_provider(latency='uniform:0,0.03', token_rate=0, seed=7)
+    import app
+    return app
+
+@pytest.fixture
+def client(app_module):
+    """A Flask test client activated with the stub provider."""
+    client = app_module.app.test_client()
+    response = client.post('/api/activate', json={'apiKey': 'test-key', 'provider': 'stub'},
+                           base_url='https://localhost')
+    assert response.get_json()['success']
+    response.close()
+    return client
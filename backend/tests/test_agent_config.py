@@ -0,0 +1,66 @@
+import json
+import os
+import shutil
+
+from agents.agent_config import AGENT_CONFIG_PATH, RegistryLoader
+from utils.static_assets import AssetManifest
+
+def copy_config(tmp_path):
+    path = tmp_path / 'agents.json'
+    shutil.copy(AGENT_CONFIG_PATH, path)
+    return str(path)
+
+def rewrite(path, change, mtime_step=1):
+    with open(path) as f:
+        config = json.load(f)
+    change(config)
+    with open(path, 'w') as f:
+        json.dump(config, f)
+    # Filesystem mtimes can be coarse; make the change visible regardless.
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + mtime_step))
+
+def rename_first_agent(name):
+    def change(config):
+        config['agents'][0]['name'] = name
+    return change
+
+def test_reload_picks_up_a_changed_file(tmp_path):
+    path = copy_config(tmp_path)
+    loader = RegistryLoader(path, reload_interval=0)
+    version = loader.get().version
+
+    rewrite(path, rename_first_agent('Renamed'))
+    assert loader.check()
+    registry = loader.get()
+    assert registry.version != version
+    assert registry.agents[0]['name'] == 'Renamed'
+    assert registry.agents[0]['name'] in registry.agent_list_for_router
+    assert loader.stats()['reloads'] == 1
+    assert not loader.check()
+
+def test_unparseable_file_keeps_the_previous_registry(tmp_path):
+    path = copy_config(tmp_path)
+    loader = RegistryLoader(path, reload_interval=0)
+    registry = loader.get()
+
+    with open(path, 'w') as f:
+        f.write('{"router": ')
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 1))
+    assert not loader.check()
+    assert loader.get() is registry
+    assert not loader.check()
+
+def test_served_agents_json_follows_registry_reloads(tmp_path):
+    path = copy_config(tmp_path)
+    loader = RegistryLoader(path, reload_interval=0)
+    manifest = AssetManifest(str(tmp_path), reload_interval=0)
+    loader.on_reload(lambda registry: manifest.refresh())
+    version = manifest.assets['agents.json'].version
+
+    rewrite(path, rename_first_agent('Renamed'))
+    loader.check()
+    asset = manifest.assets['agents.json']
+    assert asset.version != version
+    assert json.loads(asset.variants['identity'])['agents'][0]['name'] == 'Renamed'
@@ -0,0 +1,52 @@
+import pytest
+from starlette.testclient import TestClient
+
+@pytest.fixture
+def asgi_client(app_module):
+    import asgi
+    with TestClient(asgi.app, base_url='https://localhost') as client:
+        yield client
+
+def activate(client):
+    response = client.post('/api/activate', json={'apiKey': 'test-key', 'provider': 'stub'})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_activate_sets_a_session_cookie_flask_routes_accept(asgi_client):
+    assert activate(asgi_client)['provider'] == 'stub'
+    # Served by the Flask half, through the same cookie.
+    status = asgi_client.get('/api/session/status').json()
+    assert status['authenticated']
+
+def test_activate_requires_a_key(asgi_client):
+    response = asgi_client.post('/api/activate', json={'provider': 'stub'})
+    assert response.status_code == 400
+
+def test_route_and_chat_require_authentication(asgi_client):
+    for path in ('/api/route', '/api/chat'):
+        assert asgi_client.post(path, json={'message': 'hi'}).status_code == 401
+
+def test_route_returns_the_router_reply(asgi_client):
+    activate(asgi_client)
+    response = asgi_client.post('/api/route', json={'message': 'I have had chest pain since this morning'})
+    body = response.json()
+    assert response.status_code == 200, body
+    assert body['success']
+    assert body['response']
+
+def test_chat_with_a_specialist_and_the_router(asgi_client, app_module):
+    from agents.agent_config import get_all_agents
+
+    activate(asgi_client)
+    agent_id = get_all_agents()[0]['id']
+    response = asgi_client.post('/api/chat', json={'message': 'What should I do next?', 'agent_id': agent_id})
+    body = response.json()
+    assert response.status_code == 200, body
+    assert body['success'] and body['response']
+
+    routed = asgi_client.post('/api/chat', json={'message': 'My skin has a rash'}).json()
+    assert routed['success']
+
+def test_chat_rejects_an_empty_message(asgi_client):
+    activate(asgi_client)
+    assert asgi_client.post('/api/chat', json={'message': ''}).status_code == 400
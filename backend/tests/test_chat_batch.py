@@ -0,0 +1,54 @@
+import json
+
+def post_batch(client, items):
+    response = client.post('/api/chat/batch', json={'items': items}, base_url='https://localhost')
+    body = response.get_data(as_text=True)
+    response.close()
+    if response.status_code != 200:
+        return response, [json.loads(body)]
+    return response, [json.loads(line) for line in body.splitlines()]
+
+def test_items_of_one_session_run_in_order(app_module, client):
+    items = [{'session': label, 'agent_id': 'cardiology', 'message': f'{label} question {turn}'}
+             for turn in range(4) for label in ('a', 'b', 'c')]
+    response, lines = post_batch(client, items)
+
+    assert response.mimetype == 'application/x-ndjson'
+    *results, done = lines
+    assert done['done'] and done['items'] == len(items) and done['errors'] == 0
+    assert sorted(line['index'] for line in results) == list(range(len(items)))
+
+    by_session = {}
+    for line in results:
+        by_session.setdefault(line['session'], []).append(line['index'])
+    for indexes in by_session.values():
+        assert indexes == sorted(indexes)
+
+    sessions = app_module.conversation_manager.sessions
+    for label in ('a', 'b', 'c'):
+        [session_id] = [key for key in sessions if key.endswith(f':{label}')]
+        asked = [record.text for record in sessions[session_id].records if record.is_human]
+        assert asked == [f'{label} question {turn}' for turn in range(4)]
+
+def test_item_errors_are_reported_inline(client):
+    response, lines = post_batch(client, [{'message': 'hello', 'agent_id': 'no_such_agent'},
+                                          {'message': 'hello', 'agent_id': 'cardiology', 'session': 'ok'}])
+    assert response.status_code == 200
+    failed, succeeded, done = sorted(lines[:-1], key=lambda line: line['index']) + lines[-1:]
+    assert not failed['success'] and 'no_such_agent' in failed['error']
+    assert succeeded['success'] and succeeded['current_agent'] == 'cardiology'
+    assert done['errors'] == 1
+
+def test_invalid_items_are_rejected(client):
+    response, [body] = post_batch(client, [{'message': 'hi'}, {'session': 'x'}])
+    assert response.status_code == 400
+    assert body['error'] == 'Item 1: message is required'
+
+def test_distinct_sessions_per_batch_are_capped(app_module, client):
+    limit = app_module.Config.CHAT_BATCH_MAX_SESSIONS
+    before = len(app_module.conversation_manager.sessions)
+    items = [{'session': f's{index}', 'agent_id': 'cardiology', 'message': 'hi'} for index in range(limit + 1)]
+    response, [body] = post_batch(client, items)
+    assert response.status_code == 400
+    assert body['error'] == f'At most {limit} sessions per batch'
+    assert len(app_module.conversation_manager.sessions) == before
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import time
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from agents.consultation import MIN_DEADLINE, Consultation
+from utils.metrics import current_agent
+
+DELAYS = {'cardiology': 0.0, 'dermatology': 0.05, 'orthopedics': 2.0, 'consult_synopsis': 0.0}
+
+class PanelLLM:
+    """Answers after a per-specialist delay; orthopedics always misses the deadline."""
+    model_name = 'fake'
+
+    def invoke(self, messages):
+        agent_id = current_agent.get()
+        time.sleep(DELAYS.get(agent_id, 0))
+        return AIMessage(content=f'{agent_id} answer')
+
+    async def ainvoke(self, messages):
+        agent_id = current_agent.get()
+        await asyncio.sleep(DELAYS.get(agent_id, 0))
+        return AIMessage(content=f'{agent_id} answer')
+
+AGENTS = ['cardiology', 'dermatology', 'orthopedics']
+
+def check_events(events, elapsed):
+    kinds = [event['type'] for event in events]
+    assert kinds[0] == 'consult' and kinds[-1] == 'done'
+    assert elapsed < 1.5, 'a straggler held up the consultation'
+
+    answers = {event['agent_id']: event for event in events if event['type'] == 'answer'}
+    assert set(answers) == {'cardiology', 'dermatology'}
+    assert answers['cardiology']['response'] == 'cardiology answer'
+    assert [event['agent_id'] for event in events if event['type'] == 'timeout'] == ['orthopedics']
+    assert kinds.index('timeout') > kinds.index('answer')
+
+    synopsis = [event for event in events if event['type'] == 'synopsis']
+    assert synopsis and synopsis[0]['response'] == 'consult_synopsis answer'
+    assert events[-1]['answered'] == ['cardiology', 'dermatology']
+    assert events[-1]['timed_out'] == ['orthopedics']
+
+def test_sync_consultation_reports_stragglers_at_the_deadline():
+    consultation = Consultation(max_workers=4)
+    started = time.perf_counter()
+    events = list(consultation.stream(PanelLLM(), 'consult-sync', 'knee and chest pain', AGENTS, 0.5,
+                                      with_synopsis=True))
+    check_events(events, time.perf_counter() - started)
+    assert consultation.stats()['timeouts'] == 1
+
+def test_async_consultation_reports_stragglers_at_the_deadline():
+    consultation = Consultation(max_workers=4)
+
+    async def run():
+        return [event async for event in consultation.astream(PanelLLM(), 'consult-async', 'knee and chest pain',
+                                                              AGENTS, 0.5, with_synopsis=True)]
+
+    started = time.perf_counter()
+    events = asyncio.run(run())
+    check_events(events, time.perf_counter() - started)
+    assert consultation.stats() == {'consultations': 1, 'answers': 2, 'timeouts': 1, 'synopses': 1}
+
+def test_requested_deadline_is_clamped_to_the_allowed_range():
+    consultation = Consultation(deadline=5)
+    assert consultation.deadline_for(None) == 5
+    assert consultation.deadline_for(2) == 2
+    assert consultation.deadline_for(60) == 5
+    assert consultation.deadline_for(0.01) == MIN_DEADLINE
+
+@pytest.mark.parametrize('deadline', ['abc', '3', 0, -1, True, float('nan')])
+def test_invalid_deadlines_are_rejected(deadline):
+    with pytest.raises(ValueError):
+        Consultation().deadline_for(deadline)
+
+@pytest.mark.parametrize('top_k', ['3', 0, -2, 1.5, True])
+def test_invalid_top_k_is_rejected(top_k):
+    with pytest.raises(ValueError):
+        Consultation().select('chest pain', None, top_k)
+
+def test_top_k_is_capped_by_max_agents():
+    assert len(Consultation(max_agents=2).select('chest pain and a skin rash and knee pain', None, 10)) <= 2
+
+def test_requested_agents_must_be_a_list_of_ids():
+    with pytest.raises(ValueError):
+        Consultation().select('chest pain', {'cardiology': True})
+    assert Consultation().select('chest pain', ['cardiology', 'router', 'nope', 'cardiology']) == ['cardiology']
+
+def consult(client, **options):
+    response = client.post('/api/chat', json=dict(options, message='chest pain', mode='consult'),
+                           base_url='https://localhost')
+    body = response.get_data(as_text=True)
+    response.close()
+    return response, body
+
+@pytest.mark.parametrize('options', [{'deadline': 'abc'}, {'deadline': -1}, {'top_k': '3'}, {'agents': 'cardiology'}])
+def test_consult_endpoint_rejects_bad_options(client, options):
+    response, body = consult(client, **options)
+    assert response.status_code == 400
+    assert not json.loads(body)['success']
+
+def test_consult_stream_ends_with_an_error_line_when_it_fails(app_module, client, monkeypatch):
+    def failing_stream(*args, **kwargs):
+        yield {'type': 'consult', 'agents': []}
+        raise RuntimeError('provider exploded')
+
+    monkeypatch.setattr(app_module.consultation, 'stream', failing_stream)
+    response, body = consult(client, agents=['cardiology'])
+    lines = [json.loads(line) for line in body.splitlines()]
+    assert response.status_code == 200
+    assert lines[0]['type'] == 'consult'
+    assert lines[-1] == {'type': 'error', 'success': False, 'error': 'provider exploded'}
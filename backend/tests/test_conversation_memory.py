@@ -0,0 +1,57 @@
+import pytest
+
+from memory.conversation_memory import ChatRecord, ConversationManager, SessionState, select_window
+
+def state(*tokens, summary=None) -> SessionState:
+    records = [ChatRecord(index % 2 == 0, f"m{index}", count) for index, count in enumerate(tokens)]
+    return SessionState(records, summary=summary)
+
+def contents(messages):
+    return [message.content for message in messages]
+
+@pytest.mark.parametrize('counts, max_messages, max_tokens, expected', [
+    ([10, 10, 10, 10], None, None, 0),
+    ([10, 10, 10, 10], 2, None, 2),
+    ([10, 10, 10, 10], None, 25, 2),
+    ([10, 10, 10, 10], None, 30, 1),
+    ([10, 10, 10, 10], 1, 100, 3),
+    ([50, 5, 5], None, 20, 1),
+    ([50], None, 20, 1),
+    ([], None, 20, 0),
+])
+def test_select_window(counts, max_messages, max_tokens, expected):
+    assert select_window(counts, max_messages, max_tokens) == expected
+
+def test_token_window_keeps_the_newest_records_that_fit():
+    session = state(40, 30, 20, 10)
+    assert contents(session.window_messages(max_tokens=30)) == ['m2', 'm3']
+    assert contents(session.window_messages(max_tokens=60)) == ['m1', 'm2', 'm3']
+    assert contents(session.window_messages(max_messages=1, max_tokens=60)) == ['m3']
+
+def test_window_start_agrees_with_select_window():
+    counts = [7, 3, 12, 1, 9, 4, 4, 20, 2]
+    session = state(*counts)
+    for max_tokens in range(0, sum(counts) + 2):
+        assert session.window_start(max_tokens=max_tokens) == select_window(counts, max_tokens=max_tokens)
+
+def test_oversized_newest_record_is_truncated_to_the_budget():
+    session = SessionState([ChatRecord(True, "x" * 4000, 1000)])
+    messages = session.window_messages(max_tokens=10)
+    assert len(messages) == 1
+    assert len(messages[0].content) <= 10 * 4 + 3
+
+def test_summary_is_paid_for_out_of_the_budget():
+    session = state(10, 10, 10, 10)
+    session.set_summary("patient reported chest pain " * 4, 2)
+    messages = session.window_messages(max_tokens=40)
+    assert messages[0].content.startswith("Summary of earlier conversation:")
+    assert len(messages) - 1 < 4
+
+def test_manager_history_respects_the_token_budget():
+    conversations = ConversationManager()
+    for turn in range(10):
+        conversations.add_exchange('s1', f"question {turn} " * 10, f"answer {turn} " * 10)
+    everything = conversations.history_messages_for_context('s1', max_messages=100)
+    budgeted = conversations.history_messages_for_context('s1', max_tokens=100)
+    assert 0 < len(budgeted) < len(everything)
+    assert contents(budgeted) == contents(everything)[-len(budgeted):]
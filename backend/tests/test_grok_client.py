@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from utils.grok_client import GrokAPIError, GrokConnectionPool, GrokLLM, parse_sse_line
+
+USAGE = {'prompt_tokens': 30, 'completion_tokens': 3, 'total_tokens': 33,
+         'prompt_tokens_details': {'cached_tokens': 16}}
+
+def sse_lines():
+    events = [{'choices': [{'delta': {'content': text}}]} for text in ('Hel', 'lo', '!')]
+    events.append({'choices': [], 'usage': USAGE})
+    lines = [f"data: {json.dumps(event)}" for event in events]
+    return [': keep-alive', ''] + lines + ['data: [DONE]']
+
+class FakeStreamResponse:
+    def __init__(self, lines, status_code=200):
+        self.lines = lines
+        self.status_code = status_code
+        self.encoding = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise httpx.HTTPError(f"HTTP {self.status_code}")
+
+    def iter_lines(self, decode_unicode=False):
+        return iter(self.lines)
+
+class FakeSession:
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.requests = []
+
+    def post(self, url, json=None, headers=None, timeout=None, stream=False):
+        self.requests.append(json)
+        return FakeStreamResponse(sse_lines(), self.status_code)
+
+def grok(status_code=200):
+    pool = GrokConnectionPool()
+    pool.session = FakeSession(status_code)
+    return GrokLLM('xai-key', pool=pool), pool
+
+def test_parse_sse_line_skips_comments_and_done():
+    assert parse_sse_line(': keep-alive') is None
+    assert parse_sse_line('data: [DONE]') is None
+    assert parse_sse_line('data: {"a": 1}') == {'a': 1}
+
+def test_stream_yields_content_then_a_usage_chunk():
+    llm, pool = grok()
+    chunks = list(llm.stream([{'role': 'user', 'content': 'hi'}]))
+
+    assert pool.session.requests[0]['stream_options'] == {'include_usage': True}
+    assert [chunk.content for chunk in chunks] == ['Hel', 'lo', '!', '']
+    final = chunks[-1]
+    assert final.usage_metadata['input_tokens'] == 30
+    assert final.usage_metadata['input_token_details'] == {'cache_read': 16}
+    assert final.response_metadata['first_token_ms'] is not None
+    stats = pool.stats()
+    assert (stats['streams'], stats['input_tokens'], stats['output_tokens']) == (1, 30, 3)
+
+def test_stream_errors_keep_the_status():
+    llm, pool = grok(status_code=503)
+    with pytest.raises(GrokAPIError) as error:
+        list(llm.stream([{'role': 'user', 'content': 'hi'}]))
+    assert error.value.status_code == 503
+    assert pool.stats()['errors'] == 1
+
+def test_astream_reads_the_same_events():
+    llm, pool = grok()
+    body = "\n".join(sse_lines()) + "\n"
+
+    def handler(request):
+        assert json.loads(request.content)['stream'] is True
+        return httpx.Response(200, text=body, headers={'content-type': 'text/event-stream'})
+
+    async def collect():
+        pool.async_clients[asyncio.get_running_loop()] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return [chunk async for chunk in llm.astream([{'role': 'user', 'content': 'hi'}])]
+
+    chunks = asyncio.run(collect())
+    assert "".join(chunk.content for chunk in chunks) == 'Hello!'
+    assert chunks[-1].usage_metadata['output_tokens'] == 3
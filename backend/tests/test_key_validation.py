@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from utils.key_validation import InvalidAPIKey, KeyValidator
+
+class FakeResponse:
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+
+class FakeHTTP:
+    def __init__(self, status_code=200, error=None, delay=0.0):
+        self.status_code = status_code
+        self.error = error
+        self.delay = delay
+        self.calls = 0
+
+    def get(self, url, headers=None, timeout=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return FakeResponse(self.status_code)
+
+class FakeLLM:
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        if self.error:
+            raise self.error
+
+def validator(http: FakeHTTP, ttl: float = 60) -> KeyValidator:
+    validator = KeyValidator(ttl=ttl)
+    validator.http = http
+    return validator
+
+def test_valid_key_is_remembered_without_a_completion():
+    http, llm = FakeHTTP(200), FakeLLM()
+    keys = validator(http)
+    keys.validate('openai', 'sk-good', llm)
+    keys.validate('gpt-4o-mini', 'sk-good', llm)  # same provider family, same fingerprint
+    assert (http.calls, llm.calls) == (1, 0)
+    stats = keys.stats()
+    assert (stats['hits'], stats['misses'], stats['cached_keys']) == (1, 1, 1)
+
+def test_rejected_key_is_not_cached():
+    http, llm = FakeHTTP(401), FakeLLM()
+    keys = validator(http)
+    for _ in range(2):
+        with pytest.raises(InvalidAPIKey):
+            keys.validate('openai', 'sk-bad', llm)
+    assert http.calls == 2
+    assert llm.calls == 0
+    assert keys.stats()['rejected'] == 2
+
+def test_unclear_endpoint_answer_falls_back_to_a_completion():
+    http, llm = FakeHTTP(error=requests.ConnectionError('unreachable')), FakeLLM()
+    keys = validator(http)
+    keys.validate('anthropic', 'key', llm)
+    assert llm.calls == 1
+    assert keys.stats()['completion_checks'] == 1
+
+def test_expired_and_forgotten_keys_are_checked_again():
+    http, llm = FakeHTTP(200), FakeLLM()
+    keys = validator(http, ttl=0.05)
+    keys.validate('openai', 'sk-good', llm)
+    time.sleep(0.06)
+    keys.validate('openai', 'sk-good', llm)
+    keys.forget('openai', 'sk-good')
+    keys.validate('openai', 'sk-good', llm)
+    assert http.calls == 3
+
+def test_concurrent_activations_share_one_check():
+    http, llm = FakeHTTP(200, delay=0.1), FakeLLM()
+    keys = validator(http)
+    threads = [threading.Thread(target=keys.validate, args=('openai', 'sk-good', llm)) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert http.calls == 1
+    assert keys.stats()['shared'] == 4
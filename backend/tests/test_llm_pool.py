@@ -0,0 +1,44 @@
+import time
+
+from benchmarks.stub_provider import register_stub_provider
+from utils.llm_pool import LLMClientPool
+
+register_stub_provider('pool-stub', latency='zero', token_rate=0)
+
+def test_repeat_lookups_reuse_the_client():
+    pool = LLMClientPool(max_size=4)
+    first = pool.get('pool-stub', 'key-a')
+    assert pool.get('pool-stub', 'key-a') is first
+    assert pool.get('pool-stub', 'key-b') is not first
+    stats = pool.stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 2, 2)
+
+def test_least_recently_used_client_is_evicted_at_capacity():
+    pool = LLMClientPool(max_size=2)
+    a = pool.get('pool-stub', 'key-a')
+    b = pool.get('pool-stub', 'key-b')
+    assert pool.get('pool-stub', 'key-a') is a  # b is now the least recently used
+    pool.get('pool-stub', 'key-c')
+
+    assert pool.stats()['evictions'] == 1
+    assert pool.get('pool-stub', 'key-a') is a
+    assert pool.get('pool-stub', 'key-b') is not b
+
+def test_idle_clients_and_decrypted_keys_expire():
+    pool = LLMClientPool(max_size=4, idle_ttl=0.05)
+    decrypted = []
+
+    def decrypt(token):
+        decrypted.append(token)
+        return token.replace('enc-', '')
+
+    idle = pool.get('pool-stub', 'key-a')
+    assert pool.decrypt_key('enc-key-a', decrypt) == 'key-a'
+    assert pool.decrypt_key('enc-key-a', decrypt) == 'key-a'
+    assert decrypted == ['enc-key-a']
+
+    time.sleep(0.06)
+    assert pool.get('pool-stub', 'key-a') is not idle
+    pool.decrypt_key('enc-key-a', decrypt)
+    assert decrypted == ['enc-key-a', 'enc-key-a']
+    assert pool.stats()['key_hits'] == 1
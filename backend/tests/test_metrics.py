@@ -0,0 +1,42 @@
+import gc
+import threading
+
+from utils.metrics import MetricsRegistry
+
+def registry() -> MetricsRegistry:
+    metrics = MetricsRegistry()
+    metrics.counter('jobs_total', 'Jobs.')
+    metrics.histogram('job_seconds', 'Job latency.', buckets=(0.1, 1))
+    return metrics
+
+def record(metrics: MetricsRegistry, count: int):
+    for _ in range(count):
+        metrics.inc('jobs_total', {'kind': 'a'})
+        metrics.observe('job_seconds', {'kind': 'a'}, 0.5)
+
+def test_shards_of_finished_threads_are_folded_into_the_total():
+    metrics = registry()
+    for _ in range(20):
+        thread = threading.Thread(target=record, args=(metrics, 5))
+        thread.start()
+        thread.join()
+    gc.collect()
+
+    assert metrics.shards == {}
+    rendered = metrics.render()
+    assert 'jobs_total{kind="a"} 100' in rendered
+    assert 'job_seconds_bucket{kind="a",le="1"} 100' in rendered
+    assert 'job_seconds_sum{kind="a"} 50' in rendered
+
+def test_live_and_retired_shards_are_merged():
+    metrics = registry()
+    record(metrics, 3)
+    thread = threading.Thread(target=record, args=(metrics, 2))
+    thread.start()
+    thread.join()
+    gc.collect()
+
+    assert len(metrics.shards) == 1
+    assert 'jobs_total{kind="a"} 5' in metrics.render()
+    # Rendering never mutates the retired total.
+    assert 'jobs_total{kind="a"} 5' in metrics.render()
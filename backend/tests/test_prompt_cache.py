@@ -0,0 +1,82 @@
+import asyncio
+
+from langchain_core.messages import HumanMessage
+
+from utils.metrics import InstrumentedLLM, prompt_cache_stats
+from utils.prompt_cache import UsageChatOpenAI
+
+USAGE = {'prompt_tokens': 1200, 'completion_tokens': 2, 'total_tokens': 1202,
+         'prompt_tokens_details': {'cached_tokens': 1024}}
+
+def completion_chunks():
+    chunks = [
+        {'id': 'c', 'object': 'chat.completion.chunk', 'created': 0, 'model': 'gpt-4o-mini', 'usage': None,
+         'choices': [{'index': 0, 'delta': {'role': 'assistant', 'content': text}, 'finish_reason': None}]}
+        for text in ('Hel', 'lo')
+    ]
+    # With include_usage the API sends usage on a final chunk that has no choices.
+    chunks.append({'id': 'c', 'object': 'chat.completion.chunk', 'created': 0, 'model': 'gpt-4o-mini',
+                   'choices': [], 'usage': USAGE})
+    return chunks
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def __enter__(self):
+        return iter(self.chunks)
+
+    def __exit__(self, *exc):
+        return False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            yield chunk
+
+class FakeCompletions:
+    def __init__(self):
+        self.params = None
+
+    def create(self, messages, **params):
+        self.params = params
+        return FakeStream(completion_chunks())
+
+class FakeAsyncCompletions(FakeCompletions):
+    async def create(self, messages, **params):
+        return super().create(messages, **params)
+
+def openai_llm():
+    llm = UsageChatOpenAI(api_key='test-key', model='gpt-4o-mini')
+    llm.client = FakeCompletions()
+    llm.async_client = FakeAsyncCompletions()
+    return llm
+
+def test_streamed_response_records_cached_tokens():
+    llm = openai_llm()
+    before = prompt_cache_stats.stats()
+
+    chunks = list(InstrumentedLLM(llm, 'openai', 'gpt-4o-mini').stream([HumanMessage(content='hi')]))
+
+    assert llm.client.params['stream_options'] == {'include_usage': True}
+    assert "".join(chunk.content for chunk in chunks) == 'Hello'
+    assert chunks[-1].response_metadata['token_usage'] == USAGE
+    after = prompt_cache_stats.stats()
+    assert after['cache_read_tokens'] - before['cache_read_tokens'] == 1024
+    assert after['prompt_tokens'] - before['prompt_tokens'] == 1200
+
+def test_async_stream_keeps_the_usage_chunk():
+    llm = openai_llm()
+
+    async def collect():
+        return [chunk async for chunk in llm.astream([HumanMessage(content='hi')])]
+
+    chunks = asyncio.run(collect())
+    assert llm.async_client.params['stream_options'] == {'include_usage': True}
+    assert "".join(chunk.content for chunk in chunks) == 'Hello'
+    assert chunks[-1].response_metadata['token_usage'] == USAGE
@@ -0,0 +1,22 @@
+from langchain.schema import AIMessage, HumanMessage, SystemMessage
+
+from agents.prompt_layout import EARLIER_TURN, build_prompt, merge_turns
+
+def contents(messages):
+    return [(message.type, message.content) for message in messages]
+
+def test_same_role_runs_are_merged():
+    turns = merge_turns([HumanMessage(content='chest pain'), AIMessage(content='Routing you.'),
+                         AIMessage(content='Hi, cardiology here.'), HumanMessage(content='thanks')])
+    assert contents(turns) == [('human', 'chest pain'), ('ai', 'Routing you.\n\nHi, cardiology here.'),
+                               ('human', 'thanks')]
+
+def test_leading_assistant_reply_is_kept_behind_a_placeholder():
+    turns = merge_turns([AIMessage(content='Take it with food.'), HumanMessage(content='how often?')])
+    assert contents(turns) == [('human', EARLIER_TURN), ('ai', 'Take it with food.'), ('human', 'how often?')]
+
+def test_build_prompt_alternates_after_the_system_prompt():
+    prompt = build_prompt(SystemMessage(content='You are a cardiologist.'),
+                          [AIMessage(content='Hello.'), AIMessage(content='Any symptoms?')], 'palpitations')
+    assert contents(prompt) == [('system', 'You are a cardiologist.'), ('human', EARLIER_TURN),
+                                ('ai', 'Hello.\n\nAny symptoms?'), ('human', 'palpitations')]
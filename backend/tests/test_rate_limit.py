@@ -0,0 +1,107 @@
+import time
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from utils.rate_limit import (RateLimitedLLM, RateLimiter, RateLimitTimeout, TokenBucket, _parse_duration,
+                              retry_after_seconds)
+
+class Response:
+    def __init__(self, headers):
+        self.headers = headers
+
+class ProviderError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = Response(headers or {})
+
+class FlakyLLM:
+    model_name = 'fake'
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return AIMessage(content='ok')
+
+def test_bucket_allows_a_burst_then_queues_in_order():
+    bucket = TokenBucket(rate=10, capacity=3)
+    assert [bucket.reserve(max_wait=1) for _ in range(3)] == [0, 0, 0]
+    waits = [bucket.reserve(max_wait=1) for _ in range(3)]
+    assert waits == sorted(waits)
+    assert waits[0] == pytest.approx(0.1, abs=0.02)
+    assert waits[2] == pytest.approx(0.3, abs=0.02)
+
+def test_bucket_rejects_waits_over_the_limit():
+    bucket = TokenBucket(rate=1, capacity=1)
+    bucket.reserve(max_wait=0)
+    with pytest.raises(RateLimitTimeout):
+        bucket.reserve(max_wait=0.5)
+
+def test_pause_holds_every_caller():
+    bucket = TokenBucket(rate=100, capacity=10)
+    bucket.pause(0.5)
+    assert bucket.reserve(max_wait=1) == pytest.approx(0.5, abs=0.02)
+
+def test_buckets_are_shared_per_provider_family_and_key():
+    limiter = RateLimiter(default_rpm=60, max_buckets=2)
+    assert limiter.bucket('openai', 'a') is limiter.bucket('openai', 'a')
+    assert limiter.bucket('openai', 'a') is not limiter.bucket('openai', 'b')
+    limiter.bucket('anthropic', 'a')
+    assert limiter.stats()['buckets'] == 2
+
+@pytest.mark.parametrize('value, seconds', [('20', 20), ('1.5s', 1.5), ('6m0s', 360), ('250ms', 0.25), ('1h', 3600)])
+def test_parse_duration(value, seconds):
+    assert _parse_duration(value) == pytest.approx(seconds)
+
+def test_retry_after_prefers_milliseconds_header():
+    error = ProviderError(429, {'retry-after-ms': '1500', 'retry-after': '30'})
+    assert retry_after_seconds(error) == 1.5
+
+def test_throttled_call_is_retried_after_the_server_delay():
+    limiter = RateLimiter(default_rpm=6000, burst=10, max_wait=2, base_delay=0.001)
+    llm = FlakyLLM(ProviderError(429, {'retry-after': '0.2'}))
+    started = time.monotonic()
+    response = RateLimitedLLM(llm, 'openai', 'k', limiter).invoke([])
+    assert response.content == 'ok'
+    assert llm.calls == 2
+    assert time.monotonic() - started >= 0.2
+    assert limiter.stats()['retries'] == 1
+
+def test_client_errors_are_not_retried():
+    limiter = RateLimiter(default_rpm=6000, burst=10)
+    llm = FlakyLLM(ProviderError(400))
+    with pytest.raises(ProviderError):
+        RateLimitedLLM(llm, 'openai', 'k', limiter).invoke([])
+    assert llm.calls == 1
+    assert limiter.stats()['throttled'] == 0
+
+def test_gives_up_after_max_retries():
+    limiter = RateLimiter(default_rpm=6000, burst=10, max_retries=2, base_delay=0.001)
+    llm = FlakyLLM(*[ProviderError(503) for _ in range(5)])
+    with pytest.raises(ProviderError):
+        RateLimitedLLM(llm, 'openai', 'k', limiter).invoke([])
+    assert llm.calls == 3
+
+def test_server_delay_beyond_max_wait_fails_fast():
+    limiter = RateLimiter(default_rpm=6000, burst=10, max_wait=1)
+    llm = FlakyLLM(ProviderError(429, {'retry-after': '30'}))
+    with pytest.raises(ProviderError):
+        RateLimitedLLM(llm, 'openai', 'k', limiter).invoke([])
+    assert llm.calls == 1
+
+def test_pooled_client_shares_the_bucket_recreated_after_eviction():
+    limiter = RateLimiter(default_rpm=60, burst=1, max_wait=0, max_buckets=1)
+    pooled = RateLimitedLLM(FlakyLLM(), 'openai', 'k', limiter)
+    limiter.bucket('anthropic', 'other')  # evicts ('openai', 'k')
+
+    fresh = RateLimitedLLM(FlakyLLM(), 'openai', 'k', limiter)
+    assert fresh.invoke([]).content == 'ok'
+    # One token per key: the pooled client draws from the same recreated bucket and has to wait.
+    with pytest.raises(RateLimitTimeout):
+        pooled.invoke([])
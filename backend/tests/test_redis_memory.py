@@ -0,0 +1,46 @@
+import pytest
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from memory.redis_memory import RedisConversationManager
+
+@pytest.fixture
+def manager():
+    return RedisConversationManager(fakeredis.FakeRedis(decode_responses=True), max_messages=4, ttl=60)
+
+def test_exchange_is_stored_in_order_with_the_agent(manager):
+    manager.add_exchange('s1', 'I have a cough', 'Let me connect you.', 'Hello, primary care here.',
+                         agent_id='primary_care')
+    history = manager.get_conversation_history('s1')
+    assert [m.type for m in history] == ['human', 'ai', 'ai']
+    assert history[0].content == 'I have a cough'
+    assert manager.get_current_agent('s1') == 'primary_care'
+    assert manager.get_current_agent('other') == 'router'
+
+def test_history_is_capped_and_sessions_expire(manager):
+    for i in range(6):
+        manager.add_message('s1', f"message {i}", is_human=i % 2 == 0)
+    assert [m.content for m in manager.get_conversation_history('s1')] == [f"message {i}" for i in range(2, 6)]
+    assert 0 < manager.redis.ttl(manager._messages_key('s1')) <= 60
+    assert manager.session_count() == 1
+
+def test_context_window_and_summary(manager):
+    for i in range(3):
+        manager.add_exchange('s1', f"question {i}", f"answer {i}")
+    assert [m.content for m in manager.history_messages_for_context('s1', max_messages=2)] == ['question 2', 'answer 2']
+
+    summary, records, upto = manager.get_summary_work('s1', max_tokens=10, min_messages=2)
+    assert summary is None and records and upto > 0
+    manager.set_summary('s1', 'Earlier: questions 0 and 1.', upto)
+    manager.set_summary('s1', 'stale', upto - 1)
+    assert manager.redis.hget(manager._meta_key('s1'), 'summary') == 'Earlier: questions 0 and 1.'
+    assert 'Earlier: questions 0 and 1.' in manager.format_history_for_context('s1', max_messages=2)
+
+def test_metadata_and_clear(manager):
+    manager.add_message('s1', 'hi')
+    manager.set_session_metadata('s1', 'name', 'Sam')
+    assert manager.get_session_metadata('s1') == {'name': 'Sam'}
+    manager.clear_session('s1')
+    assert manager.get_conversation_history('s1') == []
+    assert manager.get_session_metadata('s1') == {}
+    assert manager.session_count() == 0
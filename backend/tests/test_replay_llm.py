@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+import pytest
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, SystemMessage
+
+from utils.llm_factory import LLMFactory
+from utils.replay_llm import (Cassette, CassetteMissError, RecordingLLM, ReplayLLM, prompt_hash,
+                              register_replay_provider)
+
+PROMPT = [SystemMessage(content='You are a cardiologist.'), HumanMessage(content='Is 140/90 high?')]
+USAGE = {'input_tokens': 12, 'output_tokens': 4, 'total_tokens': 16}
+
+class UpstreamLLM:
+    model_name = 'upstream-model'
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        return AIMessage(content='It is stage 2 hypertension.', usage_metadata=USAGE)
+
+    def stream(self, messages):
+        self.calls += 1
+        for word in ('It is', ' stage 2', ' hypertension.'):
+            yield AIMessageChunk(content=word)
+        yield AIMessageChunk(content='', usage_metadata=USAGE)
+
+def test_prompt_hash_ignores_the_message_representation():
+    as_dicts = [{'role': 'system', 'content': 'You are a cardiologist.'},
+                {'role': 'human', 'content': 'Is 140/90 high?'}]
+    assert prompt_hash(PROMPT) == prompt_hash(as_dicts)
+    assert prompt_hash(PROMPT) != prompt_hash(PROMPT[:1])
+
+def test_recorded_exchange_replays_from_disk(tmp_path):
+    path = str(tmp_path / 'cassette.json')
+    upstream = UpstreamLLM()
+    RecordingLLM(upstream, Cassette(path)).invoke(PROMPT)
+
+    with open(path) as f:
+        assert json.load(f)['version'] == 1
+    replay = ReplayLLM(Cassette(path), timing='zero')
+    response = replay.invoke(PROMPT)
+    assert response.content == 'It is stage 2 hypertension.'
+    assert response.usage_metadata == USAGE
+    assert response.response_metadata['model_name'] == 'upstream-model'
+    assert asyncio.run(replay.ainvoke(PROMPT)).content == response.content
+    assert replay.stats() == {'hits': 2, 'misses': 0, 'entries': 1}
+
+def test_first_recording_wins(tmp_path):
+    cassette = Cassette(str(tmp_path / 'cassette.json'))
+    cassette.record('k', 'first', 0.1, None, 'm')
+    cassette.record('k', 'second', 0.1, None, 'm')
+    assert cassette.get('k')['content'] == 'first'
+
+def test_recorded_stream_replays_word_by_word(tmp_path):
+    cassette = Cassette(str(tmp_path / 'cassette.json'))
+    chunks = list(RecordingLLM(UpstreamLLM(), cassette).stream(PROMPT))
+    assert chunks[-1].usage_metadata == USAGE
+
+    replayed = list(ReplayLLM(cassette, timing='zero').stream(PROMPT))
+    assert "".join(chunk.content for chunk in replayed) == 'It is stage 2 hypertension.'
+    assert replayed[-1].usage_metadata == USAGE
+
+def test_original_timing_replays_the_recorded_latency(tmp_path):
+    cassette = Cassette(str(tmp_path / 'cassette.json'))
+    cassette.record(prompt_hash(PROMPT), 'ok', 0.05, None, 'm')
+    replay = ReplayLLM(cassette)
+
+    async def timed():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await replay.ainvoke(PROMPT)
+        return loop.time() - started
+
+    assert asyncio.run(timed()) >= 0.05
+
+def test_unrecorded_prompt_is_a_miss(tmp_path):
+    replay = ReplayLLM(Cassette(str(tmp_path / 'empty.json')), timing='zero')
+    with pytest.raises(CassetteMissError):
+        replay.invoke(PROMPT)
+    assert replay.stats()['misses'] == 1
+
+def test_registered_provider_replays_through_the_factory(tmp_path):
+    path = str(tmp_path / 'cassette.json')
+    Cassette(path).record(prompt_hash(PROMPT), 'From the cassette.', 0.0, None, 'm')
+    register_replay_provider(path, timing='zero', name='replay-test')
+    assert LLMFactory.create_llm('replay-test', 'unused-key').invoke(PROMPT).content == 'From the cassette.'
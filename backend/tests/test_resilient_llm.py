@@ -0,0 +1,201 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from utils.resilient_llm import CircuitOpenError, ProviderHealthRegistry, ResilientLLM
+
+class ProviderError(Exception):
+    def __init__(self, status_code=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+class FakeLLM:
+    model_name = 'fake'
+
+    def __init__(self, delay: float = 0.0, error: Exception = None, chunks=('a', 'b', 'c')):
+        self.delay = delay
+        self.error = error
+        self.chunks = chunks
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return AIMessage(content='ok')
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return AIMessage(content='ok')
+
+    def stream(self, messages):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        for chunk in self.chunks:
+            yield AIMessageChunk(content=chunk)
+
+def registry(threshold=2, reset=0.05):
+    return ProviderHealthRegistry(failure_threshold=threshold, reset_timeout=reset)
+
+def open_circuit(health_registry, provider='openai'):
+    llm = ResilientLLM([(provider, FakeLLM(error=ProviderError(503)))], health=health_registry)
+    for _ in range(health_registry.failure_threshold):
+        with pytest.raises(ProviderError):
+            llm.invoke([])
+    assert health_registry.get(provider).stats()['state'] == 'open'
+
+def test_circuit_opens_after_threshold_and_fails_fast():
+    health = registry(reset=60)
+    open_circuit(health)
+    healthy = FakeLLM()
+    with pytest.raises(CircuitOpenError):
+        ResilientLLM([('openai', healthy)], health=health).invoke([])
+    assert healthy.calls == 0
+
+def test_half_open_trial_success_closes_circuit():
+    health = registry()
+    open_circuit(health)
+    time.sleep(0.06)
+    assert ResilientLLM([('openai', FakeLLM())], health=health).invoke([]).content == 'ok'
+    assert health.get('openai').stats()['state'] == 'closed'
+
+def test_client_errors_do_not_trip_the_breaker():
+    health = registry(threshold=1)
+    llm = ResilientLLM([('openai', FakeLLM(error=ProviderError(401)))], health=health)
+    with pytest.raises(ProviderError):
+        llm.invoke([])
+    assert health.get('openai').stats()['state'] == 'closed'
+
+def test_falls_back_to_next_provider_on_transient_error():
+    health = registry(threshold=5)
+    fallback = FakeLLM()
+    llm = ResilientLLM([('openai', FakeLLM(error=ProviderError(503))), ('anthropic', fallback)], health=health)
+    assert llm.invoke([]).content == 'ok'
+    assert fallback.calls == 1
+    assert health.stats()['fallbacks'] == 1
+
+def test_closing_stream_during_half_open_trial_releases_the_slot():
+    health = registry()
+    open_circuit(health)
+    time.sleep(0.06)
+
+    stream = ResilientLLM([('openai', FakeLLM())], health=health).stream([])
+    assert next(stream).content == 'a'
+    stream.close()
+
+    assert ResilientLLM([('openai', FakeLLM())], health=health).invoke([]).content == 'ok'
+    assert health.get('openai').stats()['state'] == 'closed'
+
+def test_cancelling_ainvoke_during_half_open_trial_releases_the_slot():
+    health = registry()
+    open_circuit(health)
+    time.sleep(0.06)
+
+    async def cancel_trial():
+        task = asyncio.ensure_future(ResilientLLM([('openai', FakeLLM(delay=5))], health=health).ainvoke([]))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return await ResilientLLM([('openai', FakeLLM())], health=health).ainvoke([])
+
+    assert asyncio.run(cancel_trial()).content == 'ok'
+    assert health.get('openai').stats()['state'] == 'closed'
+
+def test_hedged_invoke_uses_the_faster_request():
+    health = registry()
+    slow_then_fast = FakeLLM(delay=0.01)
+    llm = ResilientLLM([('openai', slow_then_fast)], health=health, hedge=True,
+                       hedge_min_samples=5, hedge_min_delay=0.05)
+    for _ in range(5):
+        llm.invoke([])
+    slow_then_fast.delay = 0.3
+    started = time.monotonic()
+    llm.invoke([])
+    assert health.stats()['hedges'] == 1
+    assert slow_then_fast.calls == 7
+    assert time.monotonic() - started < 0.6
+
+def test_async_hedge_cancels_the_losing_request():
+    health = registry()
+    llm_client = FakeLLM(delay=0.01)
+    llm = ResilientLLM([('openai', llm_client)], health=health, hedge=True,
+                       hedge_min_samples=5, hedge_min_delay=0.05)
+
+    async def run():
+        for _ in range(5):
+            await llm.ainvoke([])
+        llm_client.delay = 0.2
+        return await llm.ainvoke([])
+
+    assert asyncio.run(run()).content == 'ok'
+    assert health.stats()['hedges'] == 1
+
+def test_only_the_trial_holder_releases_the_half_open_slot():
+    health = registry(reset=0.05).get('openai')
+    for _ in range(2):
+        health.record_failure()
+    time.sleep(0.06)
+    assert health.allow() is True
+    # A call admitted before the circuit opened finishes with a client error or a 429.
+    health.release(False)
+    health.record_failure(False)
+    assert health.allow() is None
+    assert health.stats()['state'] == 'half_open'
+
+def test_programming_errors_are_not_transient():
+    health = registry(threshold=1)
+    fallback = FakeLLM()
+    llm = ResilientLLM([('openai', FakeLLM(error=KeyError('choices'))), ('anthropic', fallback)], health=health)
+    with pytest.raises(KeyError):
+        llm.invoke([])
+    assert fallback.calls == 0
+    assert health.get('openai').stats()['state'] == 'closed'
+
+def test_connection_errors_wrapped_by_a_client_are_transient():
+    class ClientError(Exception):
+        pass
+
+    try:
+        try:
+            raise ConnectionResetError('peer reset')
+        except ConnectionResetError as e:
+            raise ClientError('request failed') from e
+    except ClientError as wrapped:
+        error = wrapped
+
+    health = registry(threshold=5)
+    fallback = FakeLLM()
+    llm = ResilientLLM([('openai', FakeLLM(error=error)), ('anthropic', fallback)], health=health)
+    assert llm.invoke([]).content == 'ok'
+    assert fallback.calls == 1
+
+def test_hedge_is_skipped_rather_than_queued_when_the_pool_is_busy():
+    from utils import resilient_llm
+
+    health = registry()
+    llm_client = FakeLLM(delay=0.01)
+    llm = ResilientLLM([('openai', llm_client)], health=health, hedge=True,
+                       hedge_min_samples=5, hedge_min_delay=0.05)
+    for _ in range(5):
+        llm.invoke([])
+
+    held = 0
+    while resilient_llm.hedge_slots.acquire(blocking=False):
+        held += 1
+    try:
+        llm_client.delay = 0.1
+        assert llm.invoke([]).content == 'ok'
+    finally:
+        for _ in range(held):
+            resilient_llm.hedge_slots.release()
+    assert health.stats()['hedges'] == 0
+    assert health.stats()['hedges_skipped'] == 1
+    assert llm_client.calls == 6
@@ -0,0 +1,53 @@
+import time
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from utils.response_cache import MemoryResponseCache, RedisResponseCache, normalize_message
+
+class ModelLLM:
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+GPT = ModelLLM('gpt-4o-mini')
+
+def test_normalization_ignores_case_whitespace_and_trailing_punctuation():
+    assert normalize_message("  What IS   a fever?? ") == normalize_message("what is a fever")
+
+def test_key_separates_agents_models_and_conversations():
+    cache = MemoryResponseCache()
+    key = cache.make_key('cardiology', 'Is 140/90 high?', [], GPT)
+    assert cache.make_key('cardiology', 'is 140/90 high', [], GPT) == key
+    assert cache.make_key('primary_care', 'Is 140/90 high?', [], GPT) != key
+    assert cache.make_key('cardiology', 'Is 140/90 high?', [], ModelLLM('claude')) != key
+    history = [HumanMessage(content='I am 70'), AIMessage(content='Noted.')]
+    assert cache.make_key('cardiology', 'Is 140/90 high?', history, GPT) != key
+
+def test_long_conversations_are_not_cached():
+    cache = MemoryResponseCache(max_history_chars=20)
+    assert cache.make_key('cardiology', 'hi', [HumanMessage(content='x' * 50)], GPT) is None
+    assert cache.get(None) is None
+    cache.set(None, 'reply')
+    assert cache.stats()['skipped'] == 1
+    assert cache.stats()['stores'] == 0
+
+def test_memory_cache_expires_and_evicts_least_recently_used():
+    cache = MemoryResponseCache(max_entries=2, ttl=0.05)
+    cache.set('a', 'A')
+    cache.set('b', 'B')
+    assert cache.get('a') == 'A'
+    cache.set('c', 'C')
+    assert cache.get('b') is None
+    assert cache.get('a') == 'A'
+    time.sleep(0.06)
+    assert cache.get('c') is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['stores']) == (2, 2, 3)
+
+def test_redis_cache_round_trips_values():
+    fakeredis = pytest.importorskip('fakeredis')
+    client = fakeredis.FakeRedis(decode_responses=True)
+    cache = RedisResponseCache(client, ttl=60)
+    cache.set('k', ['Hello', 'cardiology'])
+    assert cache.get('k') == ['Hello', 'cardiology']
+    assert 0 < client.ttl(cache.prefix + 'k') <= 60
@@ -0,0 +1,51 @@
+import copy
+
+from agents import route_classifier as route_classifier_module
+from agents.agent_config import AgentRegistry, get_registry
+from agents.route_classifier import RouteClassifier, tokenize
+
+def classifier(**kwargs) -> RouteClassifier:
+    return RouteClassifier(get_registry(), **kwargs)
+
+def test_tokenize_drops_stopwords_and_plurals():
+    assert tokenize("My knees and the joints hurt") == ['knee', 'joint', 'hurt']
+
+def test_clear_messages_are_routed_confidently():
+    routes = classifier()
+    for message, agent_id in [
+        ("I get chest pain and palpitations when I climb stairs", 'cardiology'),
+        ("There is an itchy rash and a new mole on my skin", 'dermatology'),
+        ("My toddler and my baby both need their vaccinations", 'pediatrics'),
+    ]:
+        prediction = routes.classify(message)
+        assert prediction.agent_id == agent_id, (message, prediction)
+        assert routes.is_confident(prediction)
+
+def test_vague_messages_are_left_to_the_llm():
+    routes = classifier()
+    prediction = routes.classify("Hello, I'd like some advice")
+    assert not routes.is_confident(prediction)
+
+def test_index_is_rebuilt_when_the_registry_reloads(monkeypatch):
+    routes = classifier()
+    config = copy.deepcopy(get_registry().config)
+    for agent in config['agents']:
+        if agent['id'] == 'dermatology':
+            agent['keywords'].append('sunburn')
+    reloaded = AgentRegistry(config, mtime=1.0)
+    monkeypatch.setattr(route_classifier_module, 'get_registry', lambda: reloaded)
+
+    assert routes.rank("A bad sunburn after the beach")[0][0] == 'dermatology'
+    assert routes.index.registry is reloaded
+
+def test_stats_track_direct_routes_and_llm_agreement():
+    routes = classifier()
+    routes.record_direct()
+    prediction = routes.classify("chest pain and high blood pressure")
+    routes.record_llm_route(prediction, 'cardiology')
+    routes.record_llm_route(prediction, 'primary_care')
+    stats = routes.stats()
+    assert stats['predictions'] == 3
+    assert stats['direct_routes'] == 1
+    assert stats['compared_with_llm'] == 2
+    assert stats['agreement_rate'] == 0.5
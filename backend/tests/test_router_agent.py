@@ -0,0 +1,46 @@
+import pytest
+
+from agents.router_agent import ROUTE_MARKER, RouteMarkerParser
+
+def parse(chunks):
+    parser = RouteMarkerParser()
+    streamed = "".join(parser.feed(chunk) for chunk in chunks)
+    remainder, response, specialist_id = parser.finish()
+    return streamed + remainder, response, specialist_id
+
+def split_at(text, *cuts):
+    bounds = [0, *cuts, len(text)]
+    return [text[start:end] for start, end in zip(bounds, bounds[1:])]
+
+REPLY = "I'll connect you with our cardiologist. ROUTE_TO: cardiology"
+
+@pytest.mark.parametrize('cut', range(1, len(REPLY)))
+def test_marker_split_across_two_chunks(cut):
+    parser = RouteMarkerParser()
+    streamed = "".join(parser.feed(chunk) for chunk in split_at(REPLY, cut))
+    assert ROUTE_MARKER not in streamed and 'cardiology' not in streamed
+    _, response, specialist_id = parser.finish()
+    assert response == "I'll connect you with our cardiologist."
+    assert specialist_id == 'cardiology'
+
+def test_marker_streamed_one_character_at_a_time():
+    streamed, response, specialist_id = parse(list(REPLY))
+    assert specialist_id == 'cardiology'
+    assert response == "I'll connect you with our cardiologist."
+    assert ROUTE_MARKER not in streamed
+
+def test_partial_marker_prefix_is_released_when_it_does_not_complete():
+    streamed, response, specialist_id = parse(["Please see ROUTE", " 66 signs ", "ROU", "TE"])
+    assert specialist_id is None
+    assert streamed == response == "Please see ROUTE 66 signs ROUTE"
+
+def test_unknown_specialist_keeps_the_text():
+    streamed, response, specialist_id = parse(["Hmm. ROUTE_", "TO: astrology"])
+    assert specialist_id is None
+    assert streamed == response == "Hmm. ROUTE_TO: astrology"
+
+def test_text_after_the_specialist_id_is_kept():
+    _, response, specialist_id = parse(["Sending you on. ROUTE_TO:", " dermatology", " (skin)"])
+    assert specialist_id == 'dermatology'
+    assert response.startswith("Sending you on.") and response.endswith("(skin)")
+    assert ROUTE_MARKER not in response and 'dermatology' not in response
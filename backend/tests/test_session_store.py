@@ -0,0 +1,97 @@
+from datetime import timedelta
+
+import pytest
+from flask import Flask, jsonify, session
+
+from utils.session_store import MemorySessionStore, RedisSessionStore, ServerSessionInterface
+
+def make_app(store, lifetime=timedelta(hours=1)) -> Flask:
+    app = Flask(__name__)
+    app.secret_key = 'test-secret'
+    app.permanent_session_lifetime = lifetime
+    app.session_interface = ServerSessionInterface(store)
+
+    @app.route('/login')
+    def login():
+        session['user'] = 'sam'
+        session.permanent = True
+        return jsonify(ok=True)
+
+    @app.route('/whoami')
+    def whoami():
+        return jsonify(user=session.get('user'))
+
+    @app.route('/logout')
+    def logout():
+        session.clear()
+        return jsonify(ok=True)
+
+    return app
+
+def session_cookie(response):
+    return next((c for c in response.headers.getlist('Set-Cookie') if c.startswith('session=')), None)
+
+def test_only_changed_sessions_are_written():
+    app = make_app(MemorySessionStore())
+    client = app.test_client()
+    assert session_cookie(client.get('/login'))
+    for _ in range(3):
+        response = client.get('/whoami')
+        assert response.get_json() == {'user': 'sam'}
+        assert session_cookie(response) is None
+    stats = app.session_interface.stats()
+    assert (stats['writes'], stats['unchanged'], stats['refreshes'], stats['sessions']) == (1, 3, 0, 1)
+
+def test_empty_sessions_are_not_stored():
+    app = make_app(MemorySessionStore())
+    client = app.test_client()
+    assert session_cookie(client.get('/whoami')) is None
+    assert app.session_interface.stats()['sessions'] == 0
+
+def test_tampered_cookie_starts_a_new_session():
+    app = make_app(MemorySessionStore())
+    client = app.test_client()
+    client.get('/login')
+    cookie = client.get_cookie('session')
+    client.set_cookie('session', cookie.value[:-2] + 'xx')
+    assert client.get('/whoami').get_json() == {'user': None}
+
+def test_logout_deletes_the_stored_session():
+    store = MemorySessionStore()
+    app = make_app(store)
+    client = app.test_client()
+    client.get('/login')
+    client.get('/logout')
+    assert store.sessions == {}
+    assert client.get('/whoami').get_json() == {'user': None}
+
+def test_sessions_near_expiry_are_touched_not_rewritten():
+    store = MemorySessionStore()
+    app = make_app(store, lifetime=timedelta(seconds=10))
+    client = app.test_client()
+    client.get('/login')
+    sid = next(iter(store.sessions))
+    expires_at, data = store.sessions[sid]
+    store.sessions[sid] = (expires_at - 8, data)
+
+    assert session_cookie(client.get('/whoami'))
+    assert store.sessions[sid][0] > expires_at - 8
+    assert app.session_interface.stats()['refreshes'] == 1
+
+def test_sweep_drops_expired_sessions():
+    store = MemorySessionStore(sweep_interval=60)
+    store.set('live', {'a': 1}, ttl=60)
+    store.set('gone', {'a': 1}, ttl=-1)
+    assert store.get('gone') is None
+    assert store.sweep() == 1
+    assert list(store.sessions) == ['live']
+
+def test_redis_store_round_trips_through_flask():
+    fakeredis = pytest.importorskip('fakeredis')
+    client_redis = fakeredis.FakeRedis()
+    app = make_app(RedisSessionStore(client_redis, prefix='test_'))
+    client = app.test_client()
+    client.get('/login')
+    assert client.get('/whoami').get_json() == {'user': 'sam'}
+    key = client_redis.keys('test_*')[0]
+    assert 0 < client_redis.ttl(key) <= 3600
@@ -0,0 +1,48 @@
+import asyncio
+
+from langchain_core.messages import HumanMessage
+
+from agents.speculation import Draft, Speculator
+
+async def cancelled_draft(agent_id='cardiology') -> Draft:
+    draft = Draft(agent_id, [HumanMessage(content='my chest hurts')])
+    draft.task = asyncio.ensure_future(asyncio.sleep(10))
+    draft.task.cancel()
+    await asyncio.sleep(0)
+    return draft
+
+def test_aresolve_miss_with_a_cancelled_draft():
+    speculator = Speculator(max_workers=1)
+
+    async def run():
+        draft = await cancelled_draft()
+        assert draft.task.cancelled()
+        return await speculator.aresolve(draft, 'dermatology')
+
+    assert asyncio.run(run()) is None
+    stats = speculator.stats()
+    assert stats['misses'] == 1
+    assert stats['wasted_completion_tokens'] == 0
+
+def test_aresolve_hit_with_a_cancelled_draft_counts_as_failed():
+    speculator = Speculator(max_workers=1)
+
+    async def run():
+        draft = await cancelled_draft()
+        return await speculator.aresolve(draft, 'cardiology')
+
+    assert asyncio.run(run()) is None
+    assert speculator.stats()['failed'] == 1
+
+def test_aresolve_miss_cancels_a_running_draft():
+    speculator = Speculator(max_workers=1)
+
+    async def run():
+        draft = Draft('cardiology', [HumanMessage(content='my chest hurts')])
+        draft.task = asyncio.ensure_future(asyncio.sleep(10))
+        assert await speculator.aresolve(draft, None) is None
+        await asyncio.sleep(0)
+        return draft
+
+    assert asyncio.run(run()).task.cancelled()
+    assert speculator.stats()['wasted_prompt_tokens'] > 0
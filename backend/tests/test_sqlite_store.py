@@ -0,0 +1,131 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from memory.conversation_memory import ConversationManager
+from memory.sqlite_store import SQLiteConversationStore
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteConversationStore(str(tmp_path / 'conversations.db'), flush_interval=0.05)
+    yield store
+    store.close()
+
+def manager(store, **kwargs):
+    return ConversationManager(store=store, **kwargs)
+
+def texts(conversations, session_id):
+    return [message.content for message in conversations.get_conversation_history(session_id)]
+
+def test_sessions_rehydrate_after_restart(store):
+    first = manager(store)
+    first.add_exchange('s1', 'hello', 'hi there', agent_id='cardiology')
+    first.set_session_metadata('s1', 'language', 'en')
+    store.flush()
+
+    restarted = manager(store)
+    assert texts(restarted, 's1') == ['hello', 'hi there']
+    assert restarted.get_current_agent('s1') == 'cardiology'
+    assert restarted.get_session_metadata('s1') == {'language': 'en'}
+    assert store.stats()['rehydrated'] == 1
+
+def test_trimmed_records_are_not_rehydrated(store):
+    conversations = manager(store, max_messages=4)
+    for turn in range(5):
+        conversations.add_exchange('s1', f'q{turn}', f'a{turn}')
+    store.flush()
+    assert texts(manager(store), 's1') == ['q3', 'a3', 'q4', 'a4']
+
+def test_cleared_session_is_not_resurrected_before_the_delete_lands(store):
+    conversations = manager(store)
+    conversations.add_exchange('s1', 'hello', 'hi')
+    store.flush()
+
+    store.stopped.set()  # park the writer so the delete stays queued
+    store.thread.join()
+    conversations.clear_session('s1')
+    started = time.monotonic()
+    assert texts(conversations, 's1') == []
+    assert time.monotonic() - started < 0.5
+
+def test_evicted_session_with_queued_writes_is_answered_from_memory(store):
+    store.stopped.set()
+    store.thread.join()
+    conversations = manager(store, max_sessions=1)
+    conversations.add_exchange('s1', 'hello', 'hi')
+    conversations.add_exchange('s2', 'other', 'reply')  # evicts s1 before anything is on disk
+
+    started = time.monotonic()
+    assert texts(conversations, 's1') == ['hello', 'hi']
+    assert time.monotonic() - started < 0.5
+    assert store.stats()['rehydrated'] == 0
+
+def test_store_reads_happen_outside_the_manager_lock(store):
+    first = manager(store)
+    first.add_exchange('s1', 'hello', 'hi')
+    store.flush()
+
+    conversations = manager(store)
+    loading = threading.Event()
+    release = threading.Event()
+    load_session = store.load_session
+
+    def slow_load(session_id):
+        loading.set()
+        release.wait(5)
+        return load_session(session_id)
+
+    store.load_session = slow_load
+    reader = threading.Thread(target=conversations.add_exchange, args=('s1', 'again', 'sure'))
+    reader.start()
+    assert loading.wait(5)
+    # The manager lock is free while s1 is being read, so another session is not stalled.
+    assert conversations.lock.acquire(timeout=0.5)
+    conversations.lock.release()
+    release.set()
+    reader.join(5)
+    assert texts(conversations, 's1') == ['hello', 'hi', 'again', 'sure']
+
+def test_failed_batch_is_retried_so_rehydrated_history_has_no_gaps(store):
+    apply = store._apply
+    failures = []
+
+    def flaky_apply(operation):
+        if not failures:
+            failures.append(operation)
+            raise sqlite3.OperationalError('disk I/O error')
+        apply(operation)
+
+    store._apply = flaky_apply
+    conversations = manager(store)
+    conversations.add_exchange('s1', 'first', 'reply one')
+    store.flush()
+    conversations.add_exchange('s1', 'second', 'reply two')
+    store.flush()
+
+    assert failures
+    assert store.stats()['errors'] == 1 and store.stats()['retries'] >= 1
+    assert store.stats()['pending'] == 0
+    assert texts(manager(store), 's1') == ['first', 'reply one', 'second', 'reply two']
+
+def test_flush_waits_for_a_failing_batch(store):
+    apply = store._apply
+    locked = threading.Event()
+    locked.set()
+
+    def locked_apply(operation):
+        if locked.is_set():
+            raise sqlite3.OperationalError('database is locked')
+        apply(operation)
+
+    store._apply = locked_apply
+    manager(store).add_exchange('s1', 'hello', 'hi')
+    store.flush(timeout=0.3)
+    assert store.stats()['pending'] == 1
+
+    locked.clear()
+    store.flush()
+    assert store.stats()['pending'] == 0
+    assert texts(manager(store), 's1') == ['hello', 'hi']
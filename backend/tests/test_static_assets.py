@@ -0,0 +1,80 @@
+import gzip
+import os
+
+import pytest
+from flask import Flask, request
+
+from utils.static_assets import IMMUTABLE, REVALIDATE, AssetManifest, brotli
+
+INDEX = '<html><head><link href="styles.css"><script src="app.js"></script>' \
+        '<script src="https://cdn.example/x.js"></script></head></html>'
+STYLES = 'body { margin: 0; }\n' * 100
+
+@pytest.fixture
+def site(tmp_path):
+    (tmp_path / 'index.html').write_text(INDEX)
+    (tmp_path / 'styles.css').write_text(STYLES)
+    (tmp_path / 'app.js').write_text('console.log(1);')
+    (tmp_path / 'notes.py').write_text('secret = 1')
+    (tmp_path / '.env').write_text('KEY=1')
+    return tmp_path
+
+def serve(manifest: AssetManifest, path: str, headers=None):
+    app = Flask(__name__)
+    with app.test_request_context(path, headers=headers or {}):
+        return manifest.response(request.path.lstrip('/') or 'index.html', request)
+
+def test_only_known_web_files_are_loaded(site):
+    manifest = AssetManifest(str(site))
+    assert {'index.html', 'styles.css', 'app.js'} == set(manifest.assets)
+
+def test_index_links_carry_content_hashes(site):
+    manifest = AssetManifest(str(site))
+    index = manifest.assets['index.html'].variants['identity'].decode()
+    assert f'href="styles.css?v={manifest.assets["styles.css"].version}"' in index
+    assert f'src="app.js?v={manifest.assets["app.js"].version}"' in index
+    assert 'src="https://cdn.example/x.js"' in index
+
+def test_large_text_files_are_precompressed(site):
+    manifest = AssetManifest(str(site))
+    styles = manifest.assets['styles.css']
+    assert gzip.decompress(styles.variants['gzip']).decode() == STYLES
+    assert ('br' in styles.variants) == (brotli is not None)
+    assert set(manifest.assets['app.js'].variants) == {'identity'}
+
+def test_versioned_urls_are_immutable_and_negotiate_encoding(site):
+    manifest = AssetManifest(str(site))
+    version = manifest.assets['styles.css'].version
+    response = serve(manifest, f'/styles.css?v={version}', {'Accept-Encoding': 'gzip'})
+    assert response.headers['Cache-Control'] == IMMUTABLE
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Vary'] == 'Accept-Encoding'
+
+    plain = serve(manifest, '/styles.css')
+    assert plain.headers['Cache-Control'] == REVALIDATE
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.get_data(as_text=True) == STYLES
+
+def test_matching_etag_gets_a_304(site):
+    manifest = AssetManifest(str(site))
+    etag = serve(manifest, '/app.js').headers['ETag']
+    response = serve(manifest, '/app.js', {'If-None-Match': etag})
+    assert response.status_code == 304
+    assert manifest.stats()['not_modified'] == 1
+
+def test_unknown_paths_fall_back_to_index(site):
+    manifest = AssetManifest(str(site))
+    response = serve(manifest, '/chat/123')
+    assert response.status_code == 200
+    assert b'<html>' in response.get_data()
+    assert serve(manifest, '/notes.py').get_data() == response.get_data()
+    assert manifest.stats()['fallbacks'] == 2
+
+def test_changes_are_picked_up_with_a_reload_interval(site):
+    manifest = AssetManifest(str(site), reload_interval=0.01)
+    (site / 'app.js').write_text('console.log(2);')
+    stat = os.stat(site / 'app.js')
+    os.utime(site / 'app.js', ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    manifest.next_check = 0
+    assert serve(manifest, '/app.js').get_data(as_text=True) == 'console.log(2);'
+    assert manifest.stats()['reloads'] == 1
@@ -0,0 +1,37 @@
+import threading
+import time
+
+import pytest
+
+from utils import tokens
+
+@pytest.fixture
+def fresh_tokenizer(monkeypatch):
+    monkeypatch.setattr(tokens, '_encoding', None)
+    monkeypatch.setattr(tokens, '_encoding_loaded', threading.Event())
+
+def test_slow_tokenizer_download_falls_back_to_the_estimate(fresh_tokenizer, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(tokens, '_fetch_encoding', lambda: release.wait(5))
+    started = time.monotonic()
+    try:
+        assert tokens.load_encoding(timeout=0.1) is None
+        assert tokens.estimate_tokens("x" * 40) == 10
+    finally:
+        release.set()
+    assert time.monotonic() - started < 1
+
+def test_encoding_is_loaded_once(fresh_tokenizer, monkeypatch):
+    class Encoding:
+        def encode(self, text, disallowed_special=()):
+            return text.split()
+
+    loads = []
+    monkeypatch.setattr(tokens, '_fetch_encoding', lambda: loads.append(1) or Encoding())
+    threads = [threading.Thread(target=tokens.estimate_tokens, args=('a b c',)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loads == [1]
+    assert tokens.estimate_tokens('one two three four') == 4
@@ -0,0 +1,63 @@
+import contextvars
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from config import Config
+
+class OrderedBatch:
+    """Runs a batch on a shared executor, yielding (index, result, error) as each item finishes.
+
+    Items with the same key run one after another in submission order; items
+    with different keys run in parallel, bounded by the executor's workers.
+    If the consumer stops iterating (e.g. the client disconnected), items that
+    have not started yet are skipped.
+    """
+
+    def __init__(self, executor: Executor):
+        self.executor = executor
+        self.lock = threading.Lock()
+        self.counts = {'batches': 0, 'items': 0, 'errors': 0, 'skipped': 0}
+
+    def _count(self, name: str, value: int = 1):
+        with self.lock:
+            self.counts[name] += value
+
+    def run(self, items: List[Dict], worker: Callable[[Dict], object],
+            key: Callable[[Dict], Hashable]) -> Iterator[Tuple[int, Optional[object], Optional[Exception]]]:
+        groups: "OrderedDict[Hashable, List[Tuple[int, Dict]]]" = OrderedDict()
+        for index, item in enumerate(items):
+            groups.setdefault(key(item), []).append((index, item))
+
+        results = queue.Queue()
+        stopped = threading.Event()
+
+        def run_group(entries: List[Tuple[int, Dict]]):
+            for position, (index, item) in enumerate(entries):
+                if stopped.is_set():
+                    self._count('skipped', len(entries) - position)
+                    return
+                try:
+                    results.put((index, worker(item), None))
+                except Exception as e:
+                    self._count('errors')
+                    results.put((index, None, e))
+
+        self._count('batches')
+        self._count('items', len(items))
+        for entries in groups.values():
+            self.executor.submit(contextvars.copy_context().run, run_group, entries)
+
+        try:
+            for _ in range(len(items)):
+                yield results.get()
+        finally:
+            stopped.set()
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return dict(self.counts)
+
+chat_batches = OrderedBatch(ThreadPoolExecutor(max_workers=Config.CHAT_BATCH_WORKERS, thread_name_prefix='chat-batch'))
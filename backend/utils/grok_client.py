@@ -0,0 +1,254 @@
+import asyncio
+import json
+import threading
+import time
+import weakref
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+
+from config import Config
+
+GROK_BASE_URL = "https://api.x.ai/v1"
+
+ROLES = {'system': 'system', 'human': 'user', 'ai': 'assistant'}
+
+class GrokAPIError(Exception):
+    """Grok request failure; keeps the HTTP status and response for retry handling."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, response=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = response
+
+class GrokConnectionPool:
+    """Keep-alive HTTP pools shared by every GrokLLM instance in the process.
+
+    The API key travels in a per-request header, so one requests.Session and
+    one httpx.AsyncClient per event loop serve every user. Call counts, token
+    usage and latency are aggregated here for /api/health.
+    """
+
+    def __init__(self, max_connections: int = 32, timeout: float = 30):
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections)
+        self.session.mount('https://', adapter)
+        self.async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+        self.lock = threading.Lock()
+        self.counts = {'requests': 0, 'streams': 0, 'errors': 0, 'input_tokens': 0, 'output_tokens': 0}
+        self.latency_total = 0.0
+
+    def async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self.async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+            )
+            with self.lock:
+                client = self.async_clients.setdefault(loop, client)
+        return client
+
+    def record(self, latency: float, usage: Optional[Dict], streamed: bool = False):
+        with self.lock:
+            self.counts['streams' if streamed else 'requests'] += 1
+            self.latency_total += latency
+            if usage:
+                self.counts['input_tokens'] += usage.get('input_tokens', 0)
+                self.counts['output_tokens'] += usage.get('output_tokens', 0)
+
+    def record_error(self):
+        with self.lock:
+            self.counts['errors'] += 1
+
+    def stats(self) -> Dict:
+        with self.lock:
+            calls = self.counts['requests'] + self.counts['streams']
+            return dict(
+                self.counts,
+                avg_latency_ms=round(self.latency_total / calls * 1000) if calls else 0,
+                async_clients=len(self.async_clients)
+            )
+
+grok_pool = GrokConnectionPool(max_connections=Config.GROK_MAX_CONNECTIONS, timeout=Config.GROK_TIMEOUT)
+
+def usage_metadata(usage: Optional[Dict]) -> Optional[Dict]:
+    if not usage:
+        return None
+    return {
+        'input_tokens': usage.get('prompt_tokens', 0),
+        'output_tokens': usage.get('completion_tokens', 0),
+        'total_tokens': usage.get('total_tokens', 0),
+        'input_token_details': {'cache_read': (usage.get('prompt_tokens_details') or {}).get('cached_tokens', 0) or 0}
+    }
+
+def parse_sse_line(line: str) -> Optional[Dict]:
+    """Returns the JSON payload of an SSE ``data:`` line, or None for comments, blanks and [DONE]."""
+    if not line or not line.startswith('data:'):
+        return None
+    data = line[len('data:'):].strip()
+    if not data or data == '[DONE]':
+        return None
+    return json.loads(data)
+
+class GrokStreamParser:
+    """Turns SSE lines into content chunks, then a final usage/latency chunk."""
+
+    def __init__(self, model: str, pool: GrokConnectionPool):
+        self.model = model
+        self.pool = pool
+        self.started = time.perf_counter()
+        self.first_token = None
+        self.usage = None
+
+    def feed(self, line: str) -> Optional[AIMessageChunk]:
+        event = parse_sse_line(line)
+        if event is None:
+            return None
+        if event.get('usage'):
+            self.usage = usage_metadata(event['usage'])
+        content = "".join((choice.get('delta') or {}).get('content') or '' for choice in event.get('choices') or [])
+        if not content:
+            return None
+        if self.first_token is None:
+            self.first_token = time.perf_counter() - self.started
+        return AIMessageChunk(content=content)
+
+    def finish(self) -> AIMessageChunk:
+        latency = time.perf_counter() - self.started
+        self.pool.record(latency, self.usage, streamed=True)
+        return AIMessageChunk(
+            content="",
+            usage_metadata=self.usage,
+            response_metadata={
+                'model_name': self.model,
+                'latency_ms': round(latency * 1000),
+                'first_token_ms': round(self.first_token * 1000) if self.first_token is not None else None
+            }
+        )
+
+class GrokLLM:
+    """Chat client for the x.ai API with the LangChain chat-model call surface.
+
+    invoke/ainvoke return an AIMessage and stream/astream yield AIMessageChunks,
+    each carrying ``usage_metadata`` and latency in ``response_metadata``, so the
+    client drops into the same router and specialist code as ChatOpenAI.
+    """
+
+    def __init__(self, api_key: str, model: str = 'grok-beta', temperature: float = 0.7,
+                 max_tokens: Optional[int] = None, pool: GrokConnectionPool = grok_pool):
+        self.api_key = api_key
+        self.model = model
+        self.model_name = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.pool = pool
+        self.url = f"{GROK_BASE_URL}/chat/completions"
+        self.headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}"
+        }
+
+    def _format_messages(self, messages) -> List[Dict]:
+        formatted = []
+        for message in messages:
+            if isinstance(message, dict):
+                formatted.append(message)
+            elif isinstance(message, BaseMessage):
+                formatted.append({"role": ROLES.get(message.type, 'assistant'), "content": message.content})
+            else:
+                formatted.append({"role": "user", "content": str(message)})
+        return formatted
+
+    def _payload(self, messages, stream: bool = False) -> Dict:
+        payload = {
+            "messages": self._format_messages(messages),
+            "model": self.model,
+            "stream": stream,
+            "temperature": self.temperature
+        }
+        if self.max_tokens:
+            payload["max_tokens"] = self.max_tokens
+        if stream:
+            payload["stream_options"] = {"include_usage": True}
+        return payload
+
+    def _error(self, error: Exception, response=None) -> GrokAPIError:
+        self.pool.record_error()
+        status = getattr(response, 'status_code', None)
+        return GrokAPIError(f"Grok API error: {str(error)}", status, response)
+
+    def _message(self, result: Dict, started: float) -> AIMessage:
+        latency = time.perf_counter() - started
+        usage = usage_metadata(result.get('usage'))
+        self.pool.record(latency, usage)
+        return AIMessage(
+            content=result['choices'][0]['message']['content'],
+            usage_metadata=usage,
+            response_metadata={
+                'model_name': result.get('model', self.model),
+                'finish_reason': result['choices'][0].get('finish_reason'),
+                'latency_ms': round(latency * 1000)
+            }
+        )
+
+    def invoke(self, messages) -> AIMessage:
+        started = time.perf_counter()
+        response = None
+        try:
+            response = self.pool.session.post(self.url, json=self._payload(messages), headers=self.headers,
+                                              timeout=self.pool.timeout)
+            response.raise_for_status()
+            return self._message(response.json(), started)
+        except Exception as e:
+            raise self._error(e, response) from e
+
+    async def ainvoke(self, messages) -> AIMessage:
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await self.pool.async_client().post(self.url, json=self._payload(messages), headers=self.headers)
+            response.raise_for_status()
+            return self._message(response.json(), started)
+        except Exception as e:
+            raise self._error(e, response) from e
+
+    def stream(self, messages) -> Iterator[AIMessageChunk]:
+        parser = GrokStreamParser(self.model, self.pool)
+        response = None
+        try:
+            with self.pool.session.post(self.url, json=self._payload(messages, stream=True), headers=self.headers,
+                                        timeout=self.pool.timeout, stream=True) as response:
+                response.raise_for_status()
+                response.encoding = 'utf-8'
+                for line in response.iter_lines(decode_unicode=True):
+                    chunk = parser.feed(line)
+                    if chunk is not None:
+                        yield chunk
+        except Exception as e:
+            raise self._error(e, response) from e
+        yield parser.finish()
+
+    async def astream(self, messages) -> AsyncIterator[AIMessageChunk]:
+        parser = GrokStreamParser(self.model, self.pool)
+        response = None
+        try:
+            async with self.pool.async_client().stream('POST', self.url, json=self._payload(messages, stream=True),
+                                                       headers=self.headers) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    chunk = parser.feed(line)
+                    if chunk is not None:
+                        yield chunk
+        except Exception as e:
+            raise self._error(e, response) from e
+        yield parser.finish()
+
+    def __call__(self, messages) -> AIMessage:
+        return self.invoke(messages)
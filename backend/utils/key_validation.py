@@ -0,0 +1,118 @@
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict
+
+import requests
+
+from config import Config
+from .llm_factory import provider_family
+from .metrics import agent_scope
+
+# Free, non-billed endpoints that only succeed with a valid key.
+VALIDATION_ENDPOINTS = {
+    'openai': ('https://api.openai.com/v1/models', lambda key: {'Authorization': f'Bearer {key}'}),
+    'anthropic': ('https://api.anthropic.com/v1/models', lambda key: {'x-api-key': key, 'anthropic-version': '2023-06-01'}),
+    'grok': ('https://api.x.ai/v1/models', lambda key: {'Authorization': f'Bearer {key}'})
+}
+
+class InvalidAPIKey(Exception):
+    pass
+
+class KeyValidator:
+    """Validates provider API keys, remembering good keys by HMAC fingerprint.
+
+    A miss first tries the provider's model-listing endpoint, which costs no
+    tokens, and only falls back to a one-message completion when that endpoint
+    gives no clear answer. Concurrent activations of the same key share one
+    validation call.
+    """
+
+    def __init__(self, ttl: int = 3600, timeout: float = 10):
+        self.ttl = ttl
+        self.timeout = timeout
+        self.secret = secrets.token_bytes(32)
+        self.http = requests.Session()
+        self.validated: Dict[str, float] = {}
+        self.in_flight: Dict[str, Future] = {}
+        self.lock = threading.Lock()
+        self.counts = {'hits': 0, 'misses': 0, 'shared': 0, 'endpoint_checks': 0, 'completion_checks': 0, 'rejected': 0}
+
+    def fingerprint(self, provider: str, api_key: str) -> str:
+        message = f"{provider_family(provider)}:{api_key}".encode()
+        return hmac.new(self.secret, message, hashlib.sha256).hexdigest()
+
+    def validate(self, provider: str, api_key: str, llm):
+        fingerprint = self.fingerprint(provider, api_key)
+        now = time.monotonic()
+
+        with self.lock:
+            expires_at = self.validated.get(fingerprint)
+            if expires_at and expires_at > now:
+                self.counts['hits'] += 1
+                return
+            future = self.in_flight.get(fingerprint)
+            owner = future is None
+            if owner:
+                future = Future()
+                self.in_flight[fingerprint] = future
+                self.counts['misses'] += 1
+            else:
+                self.counts['shared'] += 1
+
+        if not owner:
+            future.result()
+            return
+
+        try:
+            self._check(provider, api_key, llm)
+        except Exception as e:
+            with self.lock:
+                self.in_flight.pop(fingerprint, None)
+                self.counts['rejected'] += 1
+            future.set_exception(e)
+            raise
+
+        with self.lock:
+            self.validated[fingerprint] = time.monotonic() + self.ttl
+            self.in_flight.pop(fingerprint, None)
+            self._prune(time.monotonic())
+        future.set_result(True)
+
+    def _check(self, provider: str, api_key: str, llm):
+        endpoint = VALIDATION_ENDPOINTS.get(provider_family(provider))
+        if endpoint:
+            url, headers = endpoint
+            try:
+                response = self.http.get(url, headers=headers(api_key), timeout=self.timeout)
+                with self.lock:
+                    self.counts['endpoint_checks'] += 1
+                if response.status_code == 200:
+                    return
+                if response.status_code in (401, 403):
+                    raise InvalidAPIKey(f"{provider} rejected the API key (HTTP {response.status_code})")
+            except requests.RequestException:
+                pass
+
+        with self.lock:
+            self.counts['completion_checks'] += 1
+        with agent_scope('key_validation'):
+            llm.invoke([{"role": "user", "content": "test"}])
+
+    def _prune(self, now: float):
+        expired = [fingerprint for fingerprint, expires_at in self.validated.items() if expires_at <= now]
+        for fingerprint in expired:
+            del self.validated[fingerprint]
+
+    def forget(self, provider: str, api_key: str):
+        with self.lock:
+            self.validated.pop(self.fingerprint(provider, api_key), None)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return dict(self.counts, cached_keys=len(self.validated))
+
+key_validator = KeyValidator(ttl=Config.KEY_VALIDATION_TTL)
@@ -1,16 +1,43 @@
-from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
 from langchain.schema import HumanMessage, SystemMessage
 import os
 import requests
-from typing import Optional, Dict, Any
+from typing import Callable, Optional, Dict, Any
+from config import Config
+from .grok_client import GrokLLM
+from .prompt_cache import CachingChatAnthropic, UsageChatOpenAI
+
+OPENAI_PROVIDERS = ['openai', 'gpt-4', 'gpt-3.5', 'gpt-4o', 'gpt-4o-mini']
+ANTHROPIC_PROVIDERS = ['anthropic', 'claude', 'claude-sonnet', 'claude-opus']
+GROK_PROVIDERS = ['grok', 'xai']
+
+# Extra providers (benchmark stubs, replay) registered at runtime: name -> factory(api_key, model).
+REGISTERED_PROVIDERS: Dict[str, Callable[[str, Optional[str]], Any]] = {}
+
+def provider_family(provider: str) -> str:
+    provider = provider.lower()
+    if provider in REGISTERED_PROVIDERS:
+        return provider
+    if provider in OPENAI_PROVIDERS:
+        return 'openai'
+    if provider in ANTHROPIC_PROVIDERS:
+        return 'anthropic'
+    if provider in GROK_PROVIDERS:
+        return 'grok'
+    raise ValueError(f"Unsupported provider: {provider}")
 
 class LLMFactory:
+    @staticmethod
+    def register_provider(name: str, factory: Callable[[str, Optional[str]], Any]):
+        REGISTERED_PROVIDERS[name.lower()] = factory
+    
     @staticmethod
     def create_llm(provider: str, api_key: str, model: Optional[str] = None):
         provider = provider.lower()
         
-        if provider in ['openai', 'gpt-4', 'gpt-3.5', 'gpt-4o', 'gpt-4o-mini']:
+        if provider in REGISTERED_PROVIDERS:
+            return REGISTERED_PROVIDERS[provider](api_key, model)
+        
+        elif provider in OPENAI_PROVIDERS:
             model_map = {
                 'gpt-4': 'gpt-4-turbo-preview',
                 'gpt-4o': 'gpt-4o',
@@ -20,7 +47,7 @@ class LLMFactory:
             }
             model_name = model_map.get(provider, model or 'gpt-4-turbo-preview')
             
-            return ChatOpenAI(
+            return UsageChatOpenAI(
                 api_key=api_key,
                 model=model_name,
                 temperature=0.7,
@@ -28,7 +55,7 @@ class LLMFactory:
                 model_kwargs={"response_format": {"type": "text"}}
             )
             
-        elif provider in ['anthropic', 'claude', 'claude-sonnet', 'claude-opus']:
+        elif provider in ANTHROPIC_PROVIDERS:
             model_map = {
                 'claude-sonnet': 'claude-3-5-sonnet-20241022',
                 'claude-opus': 'claude-3-opus-20240229',
@@ -37,69 +64,19 @@ class LLMFactory:
             }
             model_name = model_map.get(provider, model or 'claude-3-5-sonnet-20241022')
             
-            return ChatAnthropic(
+            return CachingChatAnthropic(
                 api_key=api_key,
                 model=model_name,
                 temperature=0.7,
-                max_tokens=2000
+                max_tokens=2000,
+                cache_prompts=Config.PROMPT_CACHE_ENABLED
             )
             
-        elif provider in ['grok', 'xai']:
-            return GrokLLM(api_key=api_key, model=model or 'grok-beta')
+        elif provider in GROK_PROVIDERS:
+            return GrokLLM(api_key=api_key, model=model or 'grok-beta', max_tokens=2000)
             
         else:
             raise ValueError(f"Unsupported provider: {provider}")
 
-class GrokLLM:
-    def __init__(self, api_key: str, model: str = 'grok-beta'):
-        self.api_key = api_key
-        self.model = model
-        self.base_url = "https://api.x.ai/v1"
-        
-    def invoke(self, messages):
-        formatted_messages = []
-        for msg in messages:
-            if isinstance(msg, SystemMessage):
-                formatted_messages.append({"role": "system", "content": msg.content})
-            elif isinstance(msg, HumanMessage):
-                formatted_messages.append({"role": "user", "content": msg.content})
-            elif isinstance(msg, dict):
-                formatted_messages.append(msg)
-            else:
-                formatted_messages.append({"role": "assistant", "content": str(msg.content)})
-        
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
-        
-        payload = {
-            "messages": formatted_messages,
-            "model": self.model,
-            "stream": False,
-            "temperature": 0.7
-        }
-        
-        try:
-            response = requests.post(
-                f"{self.base_url}/chat/completions",
-                json=payload,
-                headers=headers,
-                timeout=30
-            )
-            response.raise_for_status()
-            
-            result = response.json()
-            content = result['choices'][0]['message']['content']
-            
-            class GrokResponse:
-                def __init__(self, content):
-                    self.content = content
-                    
-            return GrokResponse(content)
-            
-        except Exception as e:
-            raise Exception(f"Grok API error: {str(e)}")
-    
-    def __call__(self, messages):
-        return self.invoke(messages)
\ No newline at end of file
+def llm_model_name(llm) -> str:
+    return getattr(llm, 'model_name', None) or getattr(llm, 'model', None) or type(llm).__name__
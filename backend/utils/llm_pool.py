@@ -0,0 +1,146 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import Config
+from .llm_factory import LLMFactory, llm_model_name, provider_family
+from .metrics import InstrumentedLLM
+from .resilient_llm import ResilientLLM
+from .rate_limit import RateLimitedLLM, rate_limiter
+
+def key_fingerprint(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+class LLMClientPool:
+    """Bounded LRU pool of LLM clients keyed by (provider, model, key fingerprint).
+
+    Reusing a client keeps its HTTP connection pool warm, so repeat requests in a
+    session skip the TCP/TLS handshake to the provider. Entries idle for longer
+    than ``idle_ttl`` seconds are evicted, as are decrypted API keys.
+    """
+
+    def __init__(self, max_size: int = 256, idle_ttl: float = 1800):
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self.clients: "OrderedDict[Tuple[str, str, str], Tuple[object, float]]" = OrderedDict()
+        self.decrypted_keys: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.key_hits = 0
+        self.key_misses = 0
+
+    def get(self, provider: str, api_key: str, model: Optional[str] = None):
+        fingerprint = key_fingerprint(api_key)
+        pool_key = (provider.lower(), model or '', fingerprint)
+        now = time.monotonic()
+
+        with self.lock:
+            entry = self.clients.get(pool_key)
+            if entry and now - entry[1] <= self.idle_ttl:
+                self.clients[pool_key] = (entry[0], now)
+                self.clients.move_to_end(pool_key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        llm = LLMFactory.create_llm(provider, api_key, model)
+        llm = InstrumentedLLM(llm, provider_family(provider), llm_model_name(llm))
+        if Config.LLM_RATE_LIMIT_ENABLED:
+            llm = RateLimitedLLM(llm, provider, fingerprint, rate_limiter)
+
+        with self.lock:
+            self.clients[pool_key] = (llm, now)
+            self.clients.move_to_end(pool_key)
+            self._evict(now)
+        return llm
+
+    def fallback_candidates(self, provider: str, api_key: str) -> List[Tuple[str, object]]:
+        """Clients for LLM_FALLBACK_CHAIN: the user's key within their provider, server keys elsewhere."""
+        family = provider_family(provider)
+        candidates = []
+        for fallback in Config.LLM_FALLBACK_CHAIN:
+            if fallback.lower() == provider.lower():
+                continue
+            try:
+                fallback_family = provider_family(fallback)
+            except ValueError:
+                continue
+            key = api_key if fallback_family == family else Config.FALLBACK_API_KEYS.get(fallback_family)
+            if key:
+                candidates.append((fallback, self.get(fallback, key)))
+        return candidates
+
+    def get_resilient(self, provider: str, api_key: str, model: Optional[str] = None):
+        if not Config.LLM_RESILIENCE_ENABLED:
+            return self.get(provider, api_key, model)
+        return ResilientLLM(
+            [(provider, self.get(provider, api_key, model))] + self.fallback_candidates(provider, api_key),
+            hedge=Config.LLM_HEDGE_ENABLED,
+            hedge_min_samples=Config.LLM_HEDGE_MIN_SAMPLES,
+            hedge_min_delay=Config.LLM_HEDGE_MIN_DELAY
+        )
+
+    def get_for_encrypted_key(self, provider: str, encrypted_key: str, decrypt: Callable[[str], str], model: Optional[str] = None):
+        return self.get_resilient(provider, self.decrypt_key(encrypted_key, decrypt), model)
+
+    def decrypt_key(self, encrypted_key: str, decrypt: Callable[[str], str]) -> str:
+        now = time.monotonic()
+
+        with self.lock:
+            entry = self.decrypted_keys.get(encrypted_key)
+            if entry and now - entry[1] <= self.idle_ttl:
+                self.decrypted_keys[encrypted_key] = (entry[0], now)
+                self.decrypted_keys.move_to_end(encrypted_key)
+                self.key_hits += 1
+                return entry[0]
+            self.key_misses += 1
+
+        api_key = decrypt(encrypted_key)
+
+        with self.lock:
+            self.decrypted_keys[encrypted_key] = (api_key, now)
+            self.decrypted_keys.move_to_end(encrypted_key)
+            while len(self.decrypted_keys) > self.max_size:
+                self.decrypted_keys.popitem(last=False)
+        return api_key
+
+    def _evict(self, now: float):
+        while self.clients:
+            pool_key, (_, last_used) = next(iter(self.clients.items()))
+            if len(self.clients) <= self.max_size and now - last_used <= self.idle_ttl:
+                break
+            del self.clients[pool_key]
+            self.evictions += 1
+
+        while self.decrypted_keys:
+            encrypted_key, (_, last_used) = next(iter(self.decrypted_keys.items()))
+            if now - last_used <= self.idle_ttl:
+                break
+            del self.decrypted_keys[encrypted_key]
+
+    def clear(self):
+        with self.lock:
+            self.clients.clear()
+            self.decrypted_keys.clear()
+
+    def stats(self) -> Dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.clients),
+                'max_size': self.max_size,
+                'idle_ttl': self.idle_ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'decrypted_keys': len(self.decrypted_keys),
+                'key_hits': self.key_hits,
+                'key_misses': self.key_misses
+            }
+
+llm_pool = LLMClientPool(max_size=Config.LLM_POOL_MAX_SIZE, idle_ttl=Config.LLM_POOL_IDLE_TTL)
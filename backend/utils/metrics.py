@@ -0,0 +1,299 @@
+import bisect
+import contextvars
+import math
+import threading
+import time
+import weakref
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+current_agent = contextvars.ContextVar('current_agent', default='unknown')
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+def _fold(total: Dict, shard: Dict):
+    for key, value in list(shard.items()):
+        if isinstance(value, list):
+            into = total.setdefault(key, [0] * len(value))
+            for index, item in enumerate(list(value)):
+                into[index] += item
+        else:
+            total[key] = total.get(key, 0) + value
+
+class _ShardOwner:
+    """Lives in a thread's local storage; when the thread exits it is freed and its shard retired."""
+    __slots__ = ('__weakref__',)
+
+class MetricsRegistry:
+    """Counters, histograms and scrape-time gauges rendered in Prometheus text format.
+
+    Each thread records into its own shard, so the hot path is a dict update
+    with no lock; shards are only merged when /api/metrics is scraped. When a
+    thread exits its shard is folded into a shared total, so short-lived
+    threads don't accumulate. Values are per process, so scrape every worker
+    (or run one worker with threads).
+    """
+
+    def __init__(self):
+        self.local = threading.local()
+        self.shards: Dict[int, Dict] = {}
+        self.retired: Dict = {}
+        # Reentrant: a shard can be retired by a finalizer on a thread that already holds it.
+        self.lock = threading.RLock()
+        self.families: Dict[str, Tuple[str, str, Tuple[float, ...]]] = {}
+        self.gauges: List[Tuple[str, str, Callable[[], Iterable[Tuple[Dict, float]]]]] = []
+
+    def counter(self, name: str, help_text: str):
+        self.families[name] = ('counter', help_text, ())
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.families[name] = ('histogram', help_text, tuple(buckets) + (math.inf,))
+
+    def gauge(self, name: str, help_text: str, collect: Callable[[], Iterable[Tuple[Dict, float]]]):
+        """Registers a gauge whose samples are produced by ``collect`` at scrape time."""
+        self.gauges.append((name, help_text, collect))
+
+    def _shard(self) -> Dict:
+        shard = getattr(self.local, 'shard', None)
+        if shard is None:
+            shard = {}
+            owner = _ShardOwner()
+            with self.lock:
+                self.shards[id(shard)] = shard
+            self.local.owner, self.local.shard = owner, shard
+            weakref.finalize(owner, self._retire, shard).atexit = False
+        return shard
+
+    def _retire(self, shard: Dict):
+        with self.lock:
+            self.shards.pop(id(shard), None)
+            _fold(self.retired, shard)
+
+    def inc(self, name: str, labels: Dict[str, str], value: float = 1):
+        shard = self._shard()
+        key = (name, tuple(labels.items()))
+        shard[key] = shard.get(key, 0) + value
+
+    def observe(self, name: str, labels: Dict[str, str], value: float):
+        shard = self._shard()
+        key = (name, tuple(labels.items()))
+        series = shard.get(key)
+        if series is None:
+            series = shard[key] = [0] * len(self.families[name][2]) + [0.0]
+        buckets = self.families[name][2]
+        series[bisect.bisect_left(buckets, value)] += 1
+        series[-1] += value
+
+    def _merged(self) -> Dict[Tuple[str, Labels], object]:
+        merged = {}
+        with self.lock:
+            shards = list(self.shards.values())
+            _fold(merged, self.retired)
+        for shard in shards:
+            _fold(merged, shard)
+        return merged
+
+    def render(self) -> str:
+        by_family: Dict[str, List[Tuple[Labels, object]]] = {}
+        for (name, labels), value in self._merged().items():
+            by_family.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name, (kind, help_text, buckets) in self.families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(by_family.get(name, []), key=lambda item: item[0]):
+                if kind == 'counter':
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets, value):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', _format_value(bound)))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(round(value[-1], 6))}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+
+        for name, help_text, collect in self.gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            try:
+                samples = list(collect())
+            except Exception as e:
+                print(f"Metrics gauge {name} failed: {str(e)}")
+                continue
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(tuple(labels.items()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+metrics.histogram('http_request_duration_seconds', 'HTTP request latency by route, including streamed bodies.')
+metrics.counter('http_requests_total', 'HTTP requests by route, method and status.')
+metrics.histogram('llm_request_duration_seconds', 'Provider call latency by provider, model and agent.')
+metrics.counter('llm_requests_total', 'Provider calls by provider, model, agent and outcome.')
+metrics.counter('llm_tokens_total', 'Tokens reported by the provider, by direction (prompt/completion).')
+metrics.counter('llm_cached_tokens_total', 'Prompt tokens served from (read) or written to (write) the provider prompt cache.')
+metrics.counter('router_turns_total', 'Router turns by how they were decided and whether they handed off.')
+
+def record_request(route: str, method: str, status: int, duration: float):
+    metrics.observe('http_request_duration_seconds', {'route': route, 'method': method}, duration)
+    metrics.inc('http_requests_total', {'route': route, 'method': method, 'status': str(status)})
+
+def record_route(source: str, specialist_id: Optional[str]):
+    metrics.inc('router_turns_total', {'source': source, 'outcome': 'handoff' if specialist_id else 'no_handoff'})
+
+class agent_scope:
+    """Labels provider calls made inside the block with ``agent_id``."""
+
+    def __init__(self, agent_id: str):
+        self.agent_id = agent_id
+
+    def __enter__(self):
+        self.previous = current_agent.get()
+        current_agent.set(self.agent_id)
+        return self
+
+    def __exit__(self, *exc):
+        current_agent.set(self.previous)
+        return False
+
+def token_usage(message) -> Optional[Tuple[int, int]]:
+    """(prompt, completion) tokens from a LangChain message's usage or response metadata.
+
+    Prompt tokens include cached ones; Anthropic reports those separately from
+    ``input_tokens``, so they are added back here.
+    """
+    usage = getattr(message, 'usage_metadata', None)
+    if usage:
+        return usage.get('input_tokens', 0), usage.get('output_tokens', 0)
+    metadata = getattr(message, 'response_metadata', None) or {}
+    usage = metadata.get('token_usage') or metadata.get('usage')
+    if usage:
+        prompt = usage.get('prompt_tokens', usage.get('input_tokens', 0)) or 0
+        prompt += (usage.get('cache_read_input_tokens') or 0) + (usage.get('cache_creation_input_tokens') or 0)
+        return prompt, usage.get('completion_tokens', usage.get('output_tokens', 0)) or 0
+    return None
+
+def cached_token_usage(message) -> Optional[Tuple[int, int]]:
+    """(cache read, cache write) prompt tokens, from whichever usage shape the provider client reports."""
+    details = (getattr(message, 'usage_metadata', None) or {}).get('input_token_details')
+    if details:
+        return details.get('cache_read', 0) or 0, details.get('cache_creation', 0) or 0
+    metadata = getattr(message, 'response_metadata', None) or {}
+    usage = metadata.get('usage') or {}
+    if 'cache_read_input_tokens' in usage or 'cache_creation_input_tokens' in usage:
+        return usage.get('cache_read_input_tokens') or 0, usage.get('cache_creation_input_tokens') or 0
+    details = (metadata.get('token_usage') or {}).get('prompt_tokens_details')
+    if details:
+        return details.get('cached_tokens') or 0, 0
+    return None
+
+class PromptCacheStats:
+    """Process-wide prompt-cache totals for /api/health (per-label detail is in llm_cached_tokens_total)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {'calls': 0, 'cache_hits': 0, 'prompt_tokens': 0, 'cache_read_tokens': 0, 'cache_write_tokens': 0}
+
+    def record(self, usage: Optional[Tuple[int, int]], cached: Optional[Tuple[int, int]]):
+        with self.lock:
+            self.counts['calls'] += 1
+            if usage:
+                self.counts['prompt_tokens'] += usage[0]
+            if cached:
+                self.counts['cache_hits'] += 1 if cached[0] else 0
+                self.counts['cache_read_tokens'] += cached[0]
+                self.counts['cache_write_tokens'] += cached[1]
+
+    def stats(self) -> Dict:
+        with self.lock:
+            counts = dict(self.counts)
+        prompt = counts['prompt_tokens']
+        return dict(counts, cached_ratio=round(counts['cache_read_tokens'] / prompt, 3) if prompt else 0.0)
+
+prompt_cache_stats = PromptCacheStats()
+
+class InstrumentedLLM:
+    """Records latency, outcome and token usage for every call to a provider client."""
+
+    def __init__(self, llm, provider: str, model: str):
+        self.llm = llm
+        self.provider = provider
+        self.model_name = model
+
+    def _record(self, started: float, outcome: str, usage: Optional[Tuple[int, int]] = None,
+                cached: Optional[Tuple[int, int]] = None):
+        labels = {'provider': self.provider, 'model': self.model_name, 'agent': current_agent.get()}
+        metrics.observe('llm_request_duration_seconds', labels, time.perf_counter() - started)
+        metrics.inc('llm_requests_total', dict(labels, outcome=outcome))
+        if usage:
+            metrics.inc('llm_tokens_total', dict(labels, direction='prompt'), usage[0])
+            metrics.inc('llm_tokens_total', dict(labels, direction='completion'), usage[1])
+        if cached:
+            metrics.inc('llm_cached_tokens_total', dict(labels, kind='read'), cached[0])
+            metrics.inc('llm_cached_tokens_total', dict(labels, kind='write'), cached[1])
+        if outcome == 'success':
+            prompt_cache_stats.record(usage, cached)
+
+    def invoke(self, messages):
+        started = time.perf_counter()
+        try:
+            response = self.llm.invoke(messages)
+        except Exception:
+            self._record(started, 'error')
+            raise
+        self._record(started, 'success', token_usage(response), cached_token_usage(response))
+        return response
+
+    async def ainvoke(self, messages):
+        started = time.perf_counter()
+        try:
+            response = await self.llm.ainvoke(messages)
+        except Exception:
+            self._record(started, 'error')
+            raise
+        self._record(started, 'success', token_usage(response), cached_token_usage(response))
+        return response
+
+    def stream(self, messages):
+        started = time.perf_counter()
+        prompt = completion = cache_read = cache_write = 0
+        cached_seen = False
+        try:
+            for chunk in self.llm.stream(messages):
+                usage = token_usage(chunk)
+                if usage:
+                    prompt, completion = prompt + usage[0], completion + usage[1]
+                cached = cached_token_usage(chunk)
+                if cached:
+                    cache_read, cache_write, cached_seen = cache_read + cached[0], cache_write + cached[1], True
+                yield chunk
+        except GeneratorExit:
+            self._record(started, 'cancelled')
+            raise
+        except Exception:
+            self._record(started, 'error')
+            raise
+        self._record(started, 'success', (prompt, completion) if prompt or completion else None,
+                     (cache_read, cache_write) if cached_seen else None)
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+    def __call__(self, messages):
+        return self.invoke(messages)
@@ -0,0 +1,147 @@
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_anthropic import ChatAnthropic
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_openai import ChatOpenAI
+from langchain_openai.chat_models.base import _convert_delta_to_message_chunk
+
+EPHEMERAL = {"type": "ephemeral"}
+STREAM_USAGE = {"include_usage": True}
+
+def _text_blocks(content) -> List[Dict]:
+    if isinstance(content, str):
+        return [{"type": "text", "text": content}]
+    return [dict(block) for block in content]
+
+def with_cache_breakpoints(params: Dict) -> Dict:
+    """Adds Anthropic ``cache_control`` breakpoints to formatted Messages API params.
+
+    One breakpoint closes the system prompt, which is identical for every call
+    to an agent. A second closes the last history turn, so the next turn of the
+    same conversation reads the whole earlier conversation from cache too.
+    """
+    if params.get('system'):
+        params['system'] = _text_blocks(params['system'])
+        params['system'][-1]['cache_control'] = EPHEMERAL
+    messages = params.get('messages') or []
+    if len(messages) >= 2:
+        history_end = dict(messages[-2], content=_text_blocks(messages[-2]['content']))
+        history_end['content'][-1]['cache_control'] = EPHEMERAL
+        messages[-2] = history_end
+    return params
+
+def _usage_chunk(usage) -> ChatGenerationChunk:
+    return ChatGenerationChunk(message=AIMessageChunk(content="", response_metadata={'usage': usage.model_dump()}))
+
+class CachingChatAnthropic(ChatAnthropic):
+    """ChatAnthropic that marks prompt-cache breakpoints and reports token usage.
+
+    The pinned langchain-anthropic only accepts a plain-string system prompt
+    and drops extra keys from text blocks, so the breakpoints are added after
+    it has formatted the request. Usage (including cache reads and writes) is
+    copied into ``response_metadata['usage']``, with a final empty chunk
+    carrying it when streaming.
+    """
+
+    cache_prompts: bool = True
+
+    def _format_params(self, *, messages, stop: Optional[List[str]] = None, **kwargs) -> Dict:
+        params = super()._format_params(messages=messages, stop=stop, **kwargs)
+        return with_cache_breakpoints(params) if self.cache_prompts else params
+
+    def _format_output(self, data: Any, **kwargs: Any) -> ChatResult:
+        result = super()._format_output(data, **kwargs)
+        usage = (result.llm_output or {}).get('usage')
+        if usage:
+            result.generations[0].message.response_metadata['usage'] = usage
+        return result
+
+    def _stream(self, messages, stop: Optional[List[str]] = None, run_manager=None,
+                **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        params = self._format_params(messages=messages, stop=stop, **kwargs)
+        with self._client.messages.stream(**params) as stream:
+            for text in stream.text_stream:
+                chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+                if run_manager:
+                    run_manager.on_llm_new_token(text, chunk=chunk)
+                yield chunk
+            yield _usage_chunk(stream.get_final_message().usage)
+
+    async def _astream(self, messages, stop: Optional[List[str]] = None, run_manager=None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        params = self._format_params(messages=messages, stop=stop, **kwargs)
+        async with self._async_client.messages.stream(**params) as stream:
+            async for text in stream.text_stream:
+                chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+                if run_manager:
+                    await run_manager.on_llm_new_token(text, chunk=chunk)
+                yield chunk
+            yield _usage_chunk((await stream.get_final_message()).usage)
+
+class UsageChatOpenAI(ChatOpenAI):
+    """ChatOpenAI that copies token usage onto the returned message.
+
+    OpenAI caches long prompt prefixes automatically; the only thing to do
+    is keep the prefix stable and read ``prompt_tokens_details.cached_tokens``,
+    which the pinned langchain-openai leaves in ``llm_output`` only. Streams
+    request ``stream_options.include_usage`` and end with an empty chunk
+    carrying the usage, which the pinned client would otherwise drop.
+    """
+
+    def _create_chat_result(self, response) -> ChatResult:
+        result = super()._create_chat_result(response)
+        usage = (result.llm_output or {}).get('token_usage')
+        if usage:
+            for generation in result.generations:
+                generation.message.response_metadata['token_usage'] = usage
+        return result
+
+    def _stream_request(self, messages, stop: Optional[List[str]], kwargs: Dict):
+        message_dicts, params = self._create_message_dicts(messages, stop)
+        return message_dicts, {**params, **kwargs, "stream": True, "stream_options": STREAM_USAGE}
+
+    def _stream_chunks(self, response_chunk, default_chunk_class) -> List[ChatGenerationChunk]:
+        if not isinstance(response_chunk, dict):
+            response_chunk = response_chunk.model_dump()
+        chunks = []
+        choices = response_chunk.get('choices') or []
+        if choices and choices[0].get('delta') is not None:
+            choice = choices[0]
+            generation_info = {}
+            if choice.get('finish_reason'):
+                generation_info['finish_reason'] = choice['finish_reason']
+            if choice.get('logprobs'):
+                generation_info['logprobs'] = choice['logprobs']
+            message = _convert_delta_to_message_chunk(choice['delta'], default_chunk_class)
+            chunks.append(ChatGenerationChunk(message=message, generation_info=generation_info or None))
+        if response_chunk.get('usage'):
+            chunks.append(ChatGenerationChunk(
+                message=AIMessageChunk(content="", response_metadata={'token_usage': response_chunk['usage']})
+            ))
+        return chunks
+
+    def _stream(self, messages, stop: Optional[List[str]] = None, run_manager=None,
+                **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        message_dicts, params = self._stream_request(messages, stop, kwargs)
+        default_chunk_class = AIMessageChunk
+        with self.client.create(messages=message_dicts, **params) as response:
+            for response_chunk in response:
+                for chunk in self._stream_chunks(response_chunk, default_chunk_class):
+                    default_chunk_class = chunk.message.__class__
+                    if run_manager:
+                        run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                    yield chunk
+
+    async def _astream(self, messages, stop: Optional[List[str]] = None, run_manager=None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        message_dicts, params = self._stream_request(messages, stop, kwargs)
+        default_chunk_class = AIMessageChunk
+        response = await self.async_client.create(messages=message_dicts, **params)
+        async with response:
+            async for response_chunk in response:
+                for chunk in self._stream_chunks(response_chunk, default_chunk_class):
+                    default_chunk_class = chunk.message.__class__
+                    if run_manager:
+                        await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                    yield chunk
@@ -0,0 +1,282 @@
+import asyncio
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, Optional, Tuple
+
+from config import Config
+from .llm_factory import llm_model_name, provider_family
+from .resilient_llm import error_status
+
+THROTTLE_STATUSES = {429, 503, 529}
+
+RESET_HEADERS = (
+    'x-ratelimit-reset-requests',
+    'x-ratelimit-reset-tokens',
+    'anthropic-ratelimit-requests-reset',
+    'anthropic-ratelimit-tokens-reset'
+)
+
+class RateLimitTimeout(Exception):
+    """Raised when a request would have to queue longer than the limiter allows."""
+    status_code = 429
+
+def _parse_duration(value: str) -> Optional[float]:
+    """Parses '20', '1.5s', '6m0s', '250ms' or an RFC 3339 / HTTP date into seconds from now."""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    parts = re.findall(r'(\d+(?:\.\d+)?)(ms|h|m|s)', value)
+    if parts and "".join(number + unit for number, unit in parts) == value:
+        scale = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+        return sum(float(number) * scale[unit] for number, unit in parts)
+
+    try:
+        reset_at = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        try:
+            reset_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if reset_at.tzinfo is None:
+        reset_at = reset_at.replace(tzinfo=timezone.utc)
+    return (reset_at - datetime.now(timezone.utc)).total_seconds()
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Server-requested delay from Retry-After or provider rate-limit reset headers."""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        headers = getattr(getattr(error, 'response', None), 'headers', None)
+        if headers:
+            if headers.get('retry-after-ms'):
+                try:
+                    return max(0.0, float(headers['retry-after-ms']) / 1000)
+                except ValueError:
+                    pass
+            for name in ('retry-after',) + RESET_HEADERS:
+                if headers.get(name):
+                    seconds = _parse_duration(headers[name])
+                    if seconds is not None:
+                        return max(0.0, seconds)
+        error = error.__cause__ or error.__context__
+    return None
+
+class TokenBucket:
+    """Reservation-based token bucket for one (provider, key).
+
+    Callers take a token immediately, letting the balance go negative, and
+    sleep off the deficit outside the lock, so waiters are served in arrival
+    order without polling. A provider Retry-After pauses the whole bucket.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self, max_wait: float) -> float:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            wait = max(0.0, self.paused_until - now)
+            if self.tokens < 1:
+                wait = max(wait, (1 - self.tokens) / self.rate)
+            if wait > max_wait:
+                raise RateLimitTimeout(f"Rate limit queue wait of {wait:.1f}s exceeds {max_wait:.1f}s")
+            self.tokens -= 1
+            return wait
+
+    def pause(self, seconds: float):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+class RateLimiter:
+    """Token buckets per (provider, key fingerprint), plus queueing and retry metrics."""
+
+    def __init__(self, default_rpm: float = 300, limits: Optional[Dict[str, float]] = None, burst: float = 20,
+                 max_wait: float = 10, max_retries: int = 3, base_delay: float = 0.5, max_buckets: int = 1024):
+        self.default_rpm = default_rpm
+        self.limits = limits or {}
+        self.burst = burst
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_buckets = max_buckets
+        self.buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.waiting = 0
+        self.counts = {'requests': 0, 'queued': 0, 'timeouts': 0, 'throttled': 0, 'retries': 0}
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def bucket(self, provider: str, fingerprint: str) -> TokenBucket:
+        family = provider_family(provider)
+        key = (family, fingerprint)
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                rate = self.limits.get(family, self.default_rpm) / 60
+                bucket = self.buckets[key] = TokenBucket(rate, self.burst)
+                while len(self.buckets) > self.max_buckets:
+                    self.buckets.popitem(last=False)
+            self.buckets.move_to_end(key)
+            return bucket
+
+    def _reserve(self, bucket: TokenBucket) -> float:
+        try:
+            wait = bucket.reserve(self.max_wait)
+        except RateLimitTimeout:
+            self._count('timeouts')
+            raise
+        with self.lock:
+            self.counts['requests'] += 1
+            if wait > 0:
+                self.counts['queued'] += 1
+                self.waiting += 1
+                self.wait_total += wait
+                self.wait_max = max(self.wait_max, wait)
+        return wait
+
+    def _done_waiting(self):
+        with self.lock:
+            self.waiting -= 1
+
+    def acquire(self, bucket: TokenBucket):
+        wait = self._reserve(bucket)
+        if wait > 0:
+            try:
+                time.sleep(wait)
+            finally:
+                self._done_waiting()
+
+    async def aacquire(self, bucket: TokenBucket):
+        wait = self._reserve(bucket)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                self._done_waiting()
+
+    def backoff(self, bucket: TokenBucket, error: Exception, attempt: int) -> bool:
+        """Pauses the bucket before retrying a throttled call; False means give up.
+
+        The pause is the larger of the server's Retry-After and a full-jitter
+        exponential delay, and applies to every caller sharing the key.
+        """
+        if isinstance(error, RateLimitTimeout) or error_status(error) not in THROTTLE_STATUSES:
+            return False
+        self._count('throttled')
+        if attempt >= self.max_retries:
+            return False
+
+        delay = random.uniform(0, self.base_delay * (2 ** attempt))
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        if delay > self.max_wait:
+            return False
+        bucket.pause(delay)
+        self._count('retries')
+        return True
+
+    def _count(self, name: str):
+        with self.lock:
+            self.counts[name] += 1
+
+    def stats(self) -> Dict:
+        with self.lock:
+            queued = self.counts['queued']
+            return dict(
+                self.counts,
+                buckets=len(self.buckets),
+                queue_depth=self.waiting,
+                avg_wait_ms=round(self.wait_total / queued * 1000) if queued else 0,
+                max_wait_ms=round(self.wait_max * 1000)
+            )
+
+class RateLimitedLLM:
+    """Queues calls through a TokenBucket and retries provider throttling with jittered backoff.
+
+    The bucket is looked up on every call rather than held, so a pooled client
+    keeps sharing the key's one bucket even after the limiter evicts and
+    recreates it.
+    """
+
+    def __init__(self, llm, provider: str, fingerprint: str, limiter: RateLimiter):
+        self.llm = llm
+        self.provider = provider
+        self.fingerprint = fingerprint
+        self.limiter = limiter
+        self.model_name = llm_model_name(llm)
+
+    @property
+    def bucket(self) -> TokenBucket:
+        return self.limiter.bucket(self.provider, self.fingerprint)
+
+    def invoke(self, messages):
+        attempt = 0
+        while True:
+            bucket = self.bucket
+            self.limiter.acquire(bucket)
+            try:
+                return self.llm.invoke(messages)
+            except Exception as e:
+                if not self.limiter.backoff(bucket, e, attempt):
+                    raise
+            attempt += 1
+
+    async def ainvoke(self, messages):
+        attempt = 0
+        while True:
+            bucket = self.bucket
+            await self.limiter.aacquire(bucket)
+            try:
+                return await self.llm.ainvoke(messages)
+            except Exception as e:
+                if not self.limiter.backoff(bucket, e, attempt):
+                    raise
+            attempt += 1
+
+    def stream(self, messages) -> Iterator:
+        attempt = 0
+        while True:
+            bucket = self.bucket
+            self.limiter.acquire(bucket)
+            emitted = False
+            try:
+                for chunk in self.llm.stream(messages):
+                    emitted = True
+                    yield chunk
+                return
+            except Exception as e:
+                if emitted or not self.limiter.backoff(bucket, e, attempt):
+                    raise
+            attempt += 1
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+    def __call__(self, messages):
+        return self.invoke(messages)
+
+rate_limiter = RateLimiter(
+    default_rpm=Config.LLM_RATE_LIMIT_RPM,
+    limits=Config.LLM_RATE_LIMITS,
+    burst=Config.LLM_RATE_LIMIT_BURST,
+    max_wait=Config.LLM_RATE_LIMIT_MAX_WAIT,
+    max_retries=Config.LLM_MAX_RETRIES,
+    base_delay=Config.LLM_RETRY_BASE_DELAY
+)
@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+
+from .llm_factory import LLMFactory, llm_model_name
+
+CASSETTE_VERSION = 1
+
+class CassetteMissError(Exception):
+    """No recorded response for a prompt. Not retryable, so failover leaves it alone."""
+    status_code = 404
+
+def prompt_hash(messages) -> str:
+    """Stable key for a prompt: message roles and text, independent of the client that sends it."""
+    normalized = []
+    for message in messages:
+        if isinstance(message, BaseMessage):
+            normalized.append([message.type, message.content])
+        elif isinstance(message, dict):
+            normalized.append([message.get('role', 'user'), message.get('content', '')])
+        else:
+            normalized.append(['human', str(message)])
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+def response_text(response) -> str:
+    return response.content if hasattr(response, 'content') else str(response)
+
+class Cassette:
+    """Recorded exchanges keyed by prompt hash, stored as one JSON file.
+
+    The first response recorded for a prompt wins, so re-recording over an
+    existing cassette only fills in prompts it has not seen.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            if data.get('version') != CASSETTE_VERSION:
+                raise ValueError(f"Unsupported cassette version in {path}: {data.get('version')}")
+            self.entries = data.get('entries', {})
+
+    def get(self, key: str) -> Optional[Dict]:
+        return self.entries.get(key)
+
+    def record(self, key: str, content: str, latency: float, usage: Optional[Dict], model: str):
+        with self.lock:
+            if key in self.entries:
+                return
+            self.entries[key] = {
+                'content': content,
+                'latency': round(latency, 4),
+                'usage': usage,
+                'model': model
+            }
+            self._save()
+
+    def _save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({'version': CASSETTE_VERSION, 'entries': self.entries}, f, indent=1, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+class RecordingLLM:
+    """Passes calls to a real provider client and writes each exchange to the cassette."""
+
+    def __init__(self, llm, cassette: Cassette):
+        self.llm = llm
+        self.cassette = cassette
+        self.model_name = llm_model_name(llm)
+
+    def _record(self, messages, content: str, started: float, usage: Optional[Dict]):
+        self.cassette.record(prompt_hash(messages), content, time.perf_counter() - started, usage, self.model_name)
+
+    def invoke(self, messages):
+        started = time.perf_counter()
+        response = self.llm.invoke(messages)
+        self._record(messages, response_text(response), started, getattr(response, 'usage_metadata', None))
+        return response
+
+    async def ainvoke(self, messages):
+        started = time.perf_counter()
+        response = await self.llm.ainvoke(messages)
+        self._record(messages, response_text(response), started, getattr(response, 'usage_metadata', None))
+        return response
+
+    def stream(self, messages) -> Iterator:
+        started = time.perf_counter()
+        parts = []
+        usage = None
+        for chunk in self.llm.stream(messages):
+            parts.append(response_text(chunk))
+            usage = getattr(chunk, 'usage_metadata', None) or usage
+            yield chunk
+        self._record(messages, "".join(parts), started, usage)
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+    def __call__(self, messages):
+        return self.invoke(messages)
+
+class ReplayLLM:
+    """Answers from a cassette, either with the recorded latency or immediately."""
+
+    def __init__(self, cassette: Cassette, timing: str = 'original', model: Optional[str] = None):
+        if timing not in ('original', 'zero'):
+            raise ValueError(f"Unsupported replay timing: {timing}")
+        self.cassette = cassette
+        self.timing = timing
+        self.model_name = model or 'replay'
+        self.lock = threading.Lock()
+        self.counts = {'hits': 0, 'misses': 0}
+
+    def _lookup(self, messages) -> Dict:
+        key = prompt_hash(messages)
+        entry = self.cassette.get(key)
+        with self.lock:
+            self.counts['hits' if entry else 'misses'] += 1
+        if entry is None:
+            raise CassetteMissError(f"No recorded response for prompt {key[:12]}")
+        return entry
+
+    def _delay(self, entry: Dict) -> float:
+        return entry['latency'] if self.timing == 'original' else 0.0
+
+    def _message(self, entry: Dict) -> AIMessage:
+        return AIMessage(content=entry['content'], usage_metadata=entry.get('usage'),
+                         response_metadata={'model_name': entry.get('model'), 'replayed': True})
+
+    def invoke(self, messages) -> AIMessage:
+        entry = self._lookup(messages)
+        time.sleep(self._delay(entry))
+        return self._message(entry)
+
+    async def ainvoke(self, messages) -> AIMessage:
+        entry = self._lookup(messages)
+        await asyncio.sleep(self._delay(entry))
+        return self._message(entry)
+
+    def stream(self, messages) -> Iterator[AIMessageChunk]:
+        entry = self._lookup(messages)
+        words: List[str] = entry['content'].split(' ')
+        delay = self._delay(entry) / len(words)
+        for index, word in enumerate(words):
+            time.sleep(delay)
+            yield AIMessageChunk(content=word if index == 0 else " " + word)
+        if entry.get('usage'):
+            yield AIMessageChunk(content="", usage_metadata=entry['usage'])
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return dict(self.counts, entries=len(self.cassette))
+
+    def __call__(self, messages) -> AIMessage:
+        return self.invoke(messages)
+
+def register_replay_provider(cassette_path: str, mode: str = 'replay', timing: str = 'original',
+                             upstream: str = 'openai', name: str = 'replay') -> Cassette:
+    """Registers ``name`` in LLMFactory.
+
+    In 'record' mode clients wrap the ``upstream`` provider (using the key the
+    session activated with) and save every exchange; in 'replay' mode they
+    answer from the cassette without touching the network.
+    """
+    if mode not in ('record', 'replay'):
+        raise ValueError(f"Unsupported replay mode: {mode}")
+    cassette = Cassette(cassette_path)
+
+    def factory(api_key: str, model: Optional[str] = None):
+        if mode == 'record':
+            return RecordingLLM(LLMFactory.create_llm(upstream, api_key, model), cassette)
+        return ReplayLLM(cassette, timing, model)
+
+    LLMFactory.register_provider(name, factory)
+    return cassette
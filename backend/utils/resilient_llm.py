@@ -0,0 +1,371 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config import Config
+from .llm_factory import llm_model_name, provider_family
+
+RETRYABLE_STATUSES = {408, 409, 425, 429}
+
+def _transport_errors() -> tuple:
+    errors = [TimeoutError, ConnectionError, concurrent.futures.TimeoutError]
+    try:
+        import httpx
+        errors += [httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError]
+    except ImportError:
+        pass
+    try:
+        import requests
+        errors += [requests.exceptions.ConnectionError, requests.exceptions.Timeout]
+    except ImportError:
+        pass
+    for module in ('openai', 'anthropic'):
+        try:
+            # APITimeoutError subclasses APIConnectionError in both SDKs.
+            errors.append(__import__(module).APIConnectionError)
+        except (ImportError, AttributeError):
+            pass
+    return tuple(errors)
+
+TRANSPORT_ERRORS = _transport_errors()
+
+class CircuitOpenError(Exception):
+    pass
+
+def _chain(error: BaseException) -> Iterator[BaseException]:
+    """The error and the exceptions it wraps, innermost last."""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+def error_status(error: BaseException) -> Optional[int]:
+    """HTTP status behind a provider error, following wrapped exceptions."""
+    for cause in _chain(error):
+        status = getattr(cause, 'status_code', None)
+        if status is None:
+            response = getattr(cause, 'response', None)
+            status = getattr(response, 'status_code', None)
+        if isinstance(status, int):
+            return status
+    return None
+
+def is_transient(error: BaseException) -> bool:
+    """Timeouts, connection errors, overload and 5xx; not bad requests, bad keys or bugs in our own code."""
+    status = error_status(error)
+    if status is not None:
+        return status >= 500 or status in RETRYABLE_STATUSES
+    return any(isinstance(cause, TRANSPORT_ERRORS) for cause in _chain(error))
+
+class ProviderHealth:
+    """Circuit breaker and latency window for one provider family.
+
+    After ``failure_threshold`` consecutive transient failures the circuit opens
+    and calls fail fast for ``reset_timeout`` seconds; then a single trial call
+    is let through and its outcome closes or re-opens the circuit. Only the
+    caller holding the trial (``allow()`` returned True) may re-open or release it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30, window: int = 200):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.latencies = deque(maxlen=window)
+        self.lock = threading.Lock()
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.counts = {'successes': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+
+    def allow(self) -> Optional[bool]:
+        """None if the circuit rejects the call, else whether the caller holds the half-open trial."""
+        with self.lock:
+            if self.opened_at is None:
+                return False
+            if time.monotonic() - self.opened_at >= self.reset_timeout and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            self.counts['rejected'] += 1
+            return None
+
+    def record_success(self, latency: Optional[float] = None):
+        with self.lock:
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+            self.counts['successes'] += 1
+            if latency is not None:
+                self.latencies.append(latency)
+
+    def record_failure(self, trial: bool = False):
+        with self.lock:
+            self.consecutive_failures += 1
+            self.counts['failures'] += 1
+            if trial or (self.opened_at is None and self.consecutive_failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                self.counts['opened'] += 1
+            if trial:
+                self.trial_in_flight = False
+
+    def release(self, trial: bool):
+        """Give back the trial slot of a call that neither succeeded nor failed transiently."""
+        if trial:
+            with self.lock:
+                self.trial_in_flight = False
+
+    def percentile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        with self.lock:
+            if len(self.latencies) < max(1, min_samples):
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def stats(self) -> Dict:
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        with self.lock:
+            return dict(
+                self.counts,
+                state=self._state(),
+                samples=len(self.latencies),
+                p50_ms=round(p50 * 1000) if p50 is not None else None,
+                p95_ms=round(p95 * 1000) if p95 is not None else None
+            )
+
+    def _state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        return 'half_open' if time.monotonic() - self.opened_at >= self.reset_timeout else 'open'
+
+class ProviderHealthRegistry:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.providers: Dict[str, ProviderHealth] = {}
+        self.lock = threading.Lock()
+        self.counts = {'fallbacks': 0, 'hedges': 0, 'hedge_wins': 0, 'hedges_skipped': 0}
+
+    def get(self, provider: str) -> ProviderHealth:
+        health = self.providers.get(provider)
+        if health is None:
+            with self.lock:
+                health = self.providers.setdefault(
+                    provider, ProviderHealth(self.failure_threshold, self.reset_timeout)
+                )
+        return health
+
+    def count(self, name: str):
+        with self.lock:
+            self.counts[name] += 1
+
+    def stats(self) -> Dict:
+        with self.lock:
+            counts = dict(self.counts)
+            providers = dict(self.providers)
+        counts['providers'] = {name: health.stats() for name, health in providers.items()}
+        return counts
+
+provider_health = ProviderHealthRegistry(
+    failure_threshold=Config.CIRCUIT_BREAKER_THRESHOLD,
+    reset_timeout=Config.CIRCUIT_BREAKER_RESET
+)
+
+hedge_executor = ThreadPoolExecutor(max_workers=Config.LLM_HEDGE_WORKERS, thread_name_prefix='llm-hedge')
+# One slot per hedge worker, so a hedge starts at once or is skipped; it never waits in the executor queue.
+hedge_slots = threading.BoundedSemaphore(Config.LLM_HEDGE_WORKERS)
+
+def _start_call(fn, *args) -> Future:
+    """Runs ``fn`` on a thread of its own, so a primary call never queues behind other requests' calls."""
+    future = Future()
+    context = contextvars.copy_context()
+
+    def run():
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(context.run(fn, *args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name='llm-call', daemon=True).start()
+    return future
+
+class ResilientLLM:
+    """Wraps a provider LLM with a fallback chain, circuit breaking and hedging.
+
+    Candidates are tried in order, skipping providers whose circuit is open.
+    Transient failures move on to the next candidate; client errors such as a
+    rejected key are raised as-is. With hedging on, a second identical request
+    is fired once the first has run past the provider's observed p95 latency
+    and whichever finishes first wins. Hedges run on a bounded pool and are
+    skipped while it is busy. Streams fall back only before the first chunk
+    and are never hedged.
+    """
+
+    def __init__(self, candidates: List[Tuple[str, object]], hedge: bool = False,
+                 hedge_min_samples: int = 20, hedge_min_delay: float = 0.5,
+                 health: ProviderHealthRegistry = provider_health):
+        self.candidates = candidates
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+        self.health = health
+        self.primary = candidates[0][1]
+        self.model_name = llm_model_name(self.primary)
+
+    def _family(self, provider: str) -> str:
+        try:
+            return provider_family(provider)
+        except ValueError:
+            return provider
+
+    def _available(self):
+        for index, (provider, llm) in enumerate(self.candidates):
+            health = self.health.get(self._family(provider))
+            trial = health.allow()
+            if trial is None:
+                continue
+            if index > 0:
+                self.health.count('fallbacks')
+            yield llm, health, trial
+
+    def _hedge_delay(self, health: ProviderHealth) -> Optional[float]:
+        if not self.hedge:
+            return None
+        p95 = health.percentile(0.95, self.hedge_min_samples)
+        return max(p95, self.hedge_min_delay) if p95 is not None else None
+
+    def _failed(self, health: ProviderHealth, trial: bool, error: Exception):
+        if error_status(error) == 429:
+            # Throttling is per key, not a sign the provider is down: fall back without tripping the breaker.
+            health.release(trial)
+            return
+        if is_transient(error):
+            health.record_failure(trial)
+            return
+        health.release(trial)
+        raise error
+
+    def _hedged_invoke(self, llm, messages, delay: float):
+        first = _start_call(llm.invoke, messages)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+        if not hedge_slots.acquire(blocking=False):
+            self.health.count('hedges_skipped')
+            return first.result()
+
+        self.health.count('hedges')
+        try:
+            second = hedge_executor.submit(contextvars.copy_context().run, llm.invoke, messages)
+        except BaseException:
+            hedge_slots.release()
+            raise
+        second.add_done_callback(lambda _: hedge_slots.release())
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        self.health.count('hedge_wins')
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def invoke(self, messages):
+        last_error = None
+        for llm, health, trial in self._available():
+            started = time.monotonic()
+            try:
+                delay = self._hedge_delay(health)
+                response = self._hedged_invoke(llm, messages, delay) if delay else llm.invoke(messages)
+            except Exception as e:
+                self._failed(health, trial, e)
+                last_error = e
+                continue
+            except BaseException:
+                # Cancelled or interrupted: no verdict on the provider, but a half-open trial slot must be freed.
+                health.release(trial)
+                raise
+            health.record_success(time.monotonic() - started)
+            return response
+        raise last_error or CircuitOpenError("All LLM providers are unavailable")
+
+    async def _ahedged_invoke(self, llm, messages, delay: float):
+        first = asyncio.ensure_future(llm.ainvoke(messages))
+        pending = {first}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return first.result()
+
+            self.health.count('hedges')
+            second = asyncio.ensure_future(llm.ainvoke(messages))
+            pending = {first, second}
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.health.count('hedge_wins')
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Also reached when the caller is cancelled: don't leave provider requests running.
+            for task in pending:
+                task.cancel()
+
+    async def ainvoke(self, messages):
+        last_error = None
+        for llm, health, trial in self._available():
+            started = time.monotonic()
+            try:
+                delay = self._hedge_delay(health)
+                response = await (self._ahedged_invoke(llm, messages, delay) if delay else llm.ainvoke(messages))
+            except Exception as e:
+                self._failed(health, trial, e)
+                last_error = e
+                continue
+            except BaseException:
+                # Cancelled or interrupted: no verdict on the provider, but a half-open trial slot must be freed.
+                health.release(trial)
+                raise
+            health.record_success(time.monotonic() - started)
+            return response
+        raise last_error or CircuitOpenError("All LLM providers are unavailable")
+
+    def stream(self, messages) -> Iterator:
+        last_error = None
+        for llm, health, trial in self._available():
+            emitted = False
+            try:
+                for chunk in llm.stream(messages):
+                    emitted = True
+                    yield chunk
+            except Exception as e:
+                if emitted:
+                    if is_transient(e):
+                        health.record_failure(trial)
+                    else:
+                        health.release(trial)
+                    raise
+                self._failed(health, trial, e)
+                last_error = e
+                continue
+            except BaseException:
+                # GeneratorExit when the consumer stops early (client gone, cancelled draft).
+                health.release(trial)
+                raise
+            health.record_success()
+            return
+        raise last_error or CircuitOpenError("All LLM providers are unavailable")
+
+    def __call__(self, messages):
+        return self.invoke(messages)
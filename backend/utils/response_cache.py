@@ -0,0 +1,124 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence
+
+from langchain.schema import BaseMessage
+
+from config import Config
+from .llm_factory import llm_model_name
+
+def normalize_message(text: str) -> str:
+    text = re.sub(r'\s+', ' ', text.lower()).strip()
+    return text.strip('.!?,;: ')
+
+class ResponseCache:
+    """Opt-in cache of agent replies for context-free turns.
+
+    Only turns whose conversation history is empty or at most
+    ``max_history_chars`` long are cached. The key covers the agent, the
+    normalized message, a hash of that short history and the model, so a reply
+    is never reused across models or into a different conversation.
+    """
+
+    def __init__(self, ttl: int = 3600, max_history_chars: int = 600):
+        self.ttl = ttl
+        self.max_history_chars = max_history_chars
+        self.counts_lock = threading.Lock()
+        self.counts = {'hits': 0, 'misses': 0, 'stores': 0, 'skipped': 0}
+
+    def _count(self, name: str):
+        with self.counts_lock:
+            self.counts[name] += 1
+
+    def make_key(self, agent_id: str, message: str, conversation_history: Sequence[BaseMessage], llm) -> Optional[str]:
+        history = "\n".join(f"{turn.type}: {turn.content}" for turn in conversation_history or ())
+        if len(history) > self.max_history_chars:
+            self._count('skipped')
+            return None
+        history_hash = hashlib.sha256(history.encode()).hexdigest()[:16]
+        raw = json.dumps([agent_id, normalize_message(message), history_hash, llm_model_name(llm)])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key: Optional[str]):
+        if key is None:
+            return None
+        value = self._get(key)
+        self._count('hits' if value is not None else 'misses')
+        return value
+
+    def set(self, key: Optional[str], value):
+        if key is None:
+            return
+        self._set(key, value)
+        self._count('stores')
+
+    def stats(self) -> Dict:
+        with self.counts_lock:
+            counts = dict(self.counts)
+        lookups = counts['hits'] + counts['misses']
+        counts['hit_rate'] = round(counts['hits'] / lookups, 4) if lookups else 0.0
+        return counts
+
+class MemoryResponseCache(ResponseCache):
+    def __init__(self, max_entries: int = 1000, **kwargs):
+        super().__init__(**kwargs)
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _get(self, key: str):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        stats.update(backend='memory', size=len(self.entries))
+        return stats
+
+class RedisResponseCache(ResponseCache):
+    def __init__(self, client, prefix: str = 'vrg_law:reply:', **kwargs):
+        super().__init__(**kwargs)
+        self.redis = client
+        self.prefix = prefix
+
+    def _get(self, key: str):
+        raw = self.redis.get(self.prefix + key)
+        return json.loads(raw) if raw else None
+
+    def _set(self, key: str, value):
+        self.redis.setex(self.prefix + key, self.ttl, json.dumps(value))
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        stats['backend'] = 'redis'
+        return stats
+
+def create_response_cache() -> Optional[ResponseCache]:
+    if not Config.RESPONSE_CACHE_ENABLED:
+        return None
+    options = {'ttl': Config.RESPONSE_CACHE_TTL, 'max_history_chars': Config.RESPONSE_CACHE_MAX_HISTORY_CHARS}
+    if Config.RESPONSE_CACHE_BACKEND == 'redis':
+        import redis
+        return RedisResponseCache(redis.Redis.from_url(Config.REDIS_URL, decode_responses=True), **options)
+    return MemoryResponseCache(max_entries=Config.RESPONSE_CACHE_MAX_ENTRIES, **options)
+
+response_cache = create_response_cache()
@@ -0,0 +1,213 @@
+import secrets
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import redis
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+from config import Config
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Session data held server-side; the cookie only carries the (signed) id."""
+
+    def __init__(self, data: Optional[Dict] = None, sid: str = '', new: bool = False, expires_at: float = 0.0):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(data, on_update)
+        self.sid = sid
+        self.new = new
+        self.expires_at = expires_at
+        self.modified = False
+
+class MemorySessionStore:
+    """In-process store: one dict, expired entries dropped in a periodic bulk sweep.
+
+    Only suitable for a single worker process (threads are fine).
+    """
+
+    def __init__(self, sweep_interval: float = 60):
+        self.sessions: Dict[str, Tuple[float, Dict]] = {}
+        self.lock = threading.Lock()
+        self.sweep_interval = sweep_interval
+        self.next_sweep = time.time() + sweep_interval
+        self.swept = 0
+
+    def get(self, sid: str) -> Optional[Tuple[Dict, float]]:
+        now = time.time()
+        self._maybe_sweep(now)
+        entry = self.sessions.get(sid)
+        if entry is None or entry[0] <= now:
+            return None
+        return dict(entry[1]), entry[0]
+
+    def set(self, sid: str, data: Dict, ttl: float):
+        with self.lock:
+            self.sessions[sid] = (time.time() + ttl, dict(data))
+
+    def touch(self, sid: str, ttl: float):
+        with self.lock:
+            entry = self.sessions.get(sid)
+            if entry is not None:
+                self.sessions[sid] = (time.time() + ttl, entry[1])
+
+    def delete(self, sid: str):
+        with self.lock:
+            self.sessions.pop(sid, None)
+
+    def _maybe_sweep(self, now: float):
+        if now >= self.next_sweep:
+            self.sweep(now)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        now = now if now is not None else time.time()
+        with self.lock:
+            self.next_sweep = now + self.sweep_interval
+            expired = [sid for sid, (expires_at, _) in self.sessions.items() if expires_at <= now]
+            for sid in expired:
+                del self.sessions[sid]
+            self.swept += len(expired)
+        return len(expired)
+
+    def stats(self) -> Dict:
+        return {'backend': 'memory', 'sessions': len(self.sessions), 'swept': self.swept}
+
+class RedisSessionStore:
+    """Sessions as Redis strings with a native TTL, so expiry needs no sweeping here."""
+
+    def __init__(self, client: redis.Redis, prefix: str = 'vrg_law_'):
+        self.redis = client
+        self.prefix = prefix
+        self.serializer = TaggedJSONSerializer()
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> 'RedisSessionStore':
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def _key(self, sid: str) -> str:
+        return f"{self.prefix}{sid}"
+
+    def get(self, sid: str) -> Optional[Tuple[Dict, float]]:
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.get(self._key(sid))
+        pipe.ttl(self._key(sid))
+        raw, ttl = pipe.execute()
+        if raw is None:
+            return None
+        try:
+            data = self.serializer.loads(raw.decode() if isinstance(raw, bytes) else raw)
+        except ValueError:
+            return None
+        return data, time.time() + max(ttl, 0)
+
+    def set(self, sid: str, data: Dict, ttl: float):
+        self.redis.set(self._key(sid), self.serializer.dumps(dict(data)), ex=max(1, int(ttl)))
+
+    def touch(self, sid: str, ttl: float):
+        self.redis.expire(self._key(sid), max(1, int(ttl)))
+
+    def delete(self, sid: str):
+        self.redis.delete(self._key(sid))
+
+    def stats(self) -> Dict:
+        return {'backend': 'redis'}
+
+class ServerSessionInterface(SessionInterface):
+    """Flask session interface over a MemorySessionStore or RedisSessionStore.
+
+    The store is written only when the session changed. An unchanged permanent
+    session is touched (TTL only) once less than half its lifetime remains,
+    so active users keep a sliding expiry without a write per request.
+    """
+
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store, use_signer: bool = True):
+        self.store = store
+        self.use_signer = use_signer
+        self.lock = threading.Lock()
+        self.counts = {'reads': 0, 'writes': 0, 'unchanged': 0, 'refreshes': 0, 'deletes': 0}
+
+    def _count(self, name: str):
+        with self.lock:
+            self.counts[name] += 1
+
+    def _signer(self, app) -> Optional[Signer]:
+        if not self.use_signer or not app.secret_key:
+            return None
+        return Signer(app.secret_key, salt='flask-session', key_derivation='hmac')
+
+    def _ttl(self, app) -> float:
+        return app.permanent_session_lifetime.total_seconds()
+
+    def open_session(self, app, request) -> ServerSession:
+        cookie = request.cookies.get(app.config['SESSION_COOKIE_NAME'])
+        sid = None
+        if cookie:
+            signer = self._signer(app)
+            try:
+                sid = signer.unsign(cookie).decode() if signer else cookie
+            except BadSignature:
+                sid = None
+        if sid:
+            self._count('reads')
+            stored = self.store.get(sid)
+            if stored is not None:
+                data, expires_at = stored
+                return ServerSession(data, sid=sid, expires_at=expires_at)
+        return ServerSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def _set_cookie(self, app, session: ServerSession, response):
+        signer = self._signer(app)
+        value = signer.sign(session.sid).decode() if signer else session.sid
+        response.set_cookie(
+            self.get_cookie_name(app),
+            value,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=self.get_cookie_domain(app),
+            path=self.get_cookie_path(app),
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+
+    def save_session(self, app, session: ServerSession, response):
+        if not session:
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                self._count('deletes')
+                response.delete_cookie(self.get_cookie_name(app), domain=self.get_cookie_domain(app),
+                                       path=self.get_cookie_path(app))
+            return
+
+        ttl = self._ttl(app)
+        if session.modified or session.new:
+            self.store.set(session.sid, dict(session), ttl)
+            self._count('writes')
+            self._set_cookie(app, session, response)
+            return
+
+        self._count('unchanged')
+        if (session.permanent and app.config.get('SESSION_REFRESH_EACH_REQUEST', True)
+                and session.expires_at - time.time() < ttl / 2):
+            self.store.touch(session.sid, ttl)
+            self._count('refreshes')
+            self._set_cookie(app, session, response)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return dict(self.store.stats(), **self.counts)
+
+def create_session_interface() -> Optional[ServerSessionInterface]:
+    """Server session interface for SESSION_BACKEND, or None to keep Flask-Session's filesystem store."""
+    if Config.SESSION_BACKEND == 'redis':
+        store = RedisSessionStore.from_url(Config.REDIS_URL, prefix=Config.SESSION_KEY_PREFIX)
+    elif Config.SESSION_BACKEND == 'memory':
+        store = MemorySessionStore(sweep_interval=Config.SESSION_SWEEP_INTERVAL)
+    else:
+        return None
+    return ServerSessionInterface(store, use_signer=Config.SESSION_USE_SIGNER)
@@ -0,0 +1,185 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {'.html', '.js', '.css', '.json', '.svg', '.txt', '.map', '.webmanifest'}
+STATIC_EXTENSIONS = COMPRESSIBLE_EXTENSIONS | {'.png', '.jpg', '.jpeg', '.gif', '.ico', '.webp', '.woff', '.woff2'}
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+# src="app-backend.js" / href="styles.css" references rewritten to carry the content hash.
+ASSET_REFERENCE = re.compile(r'''(\b(?:src|href)=["'])([^"'?#:]+)(["'])''')
+
+class StaticAsset(NamedTuple):
+    mimetype: str
+    version: str
+    variants: Dict[str, bytes]
+
+class AssetManifest:
+    """Frontend files loaded, hashed and precompressed once at startup.
+
+    Requests are answered from memory: no stat or read per hit, content-hashed
+    ETags with 304s, and gzip/brotli variants chosen from Accept-Encoding.
+    index.html references are rewritten to ``name?v=<hash>`` so those URLs can
+    be cached as immutable while index.html itself is always revalidated.
+    Only top-level files with a known web extension are served.
+    """
+
+    def __init__(self, root: str, index: str = 'index.html', min_compress_size: int = 512,
+                 reload_interval: float = 0):
+        self.root = root
+        self.index = index
+        self.min_compress_size = min_compress_size
+        self.reload_interval = reload_interval
+        self.lock = threading.Lock()
+        self.assets: Dict[str, StaticAsset] = {}
+        self.signature = None
+        self.next_check = 0.0
+        self.counts = {'hits': 0, 'not_modified': 0, 'fallbacks': 0, 'reloads': 0}
+        self.load()
+
+    def _files(self) -> Dict[str, str]:
+        if not os.path.isdir(self.root):
+            return {}
+        files = {}
+        for name in sorted(os.listdir(self.root)):
+            path = os.path.join(self.root, name)
+            if name.startswith('.') or os.path.splitext(name)[1].lower() not in STATIC_EXTENSIONS:
+                continue
+            if os.path.isfile(path):
+                files[name] = path
+        return files
+
+    def _signature(self, files: Dict[str, str]):
+        return tuple((name, os.stat(path).st_mtime_ns) for name, path in files.items())
+
+    def _build(self, name: str, body: bytes) -> StaticAsset:
+        extension = os.path.splitext(name)[1].lower()
+        mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        variants = {'identity': body}
+        if extension in COMPRESSIBLE_EXTENSIONS and len(body) >= self.min_compress_size:
+            variants['gzip'] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                variants['br'] = brotli.compress(body, quality=11)
+        return StaticAsset(mimetype, hashlib.sha256(body).hexdigest()[:16], variants)
+
+    def _rewrite_index(self, body: bytes, assets: Dict[str, StaticAsset]) -> bytes:
+        def versioned(match):
+            asset = assets.get(match.group(2))
+            if asset is None or match.group(2) == self.index:
+                return match.group(0)
+            return f"{match.group(1)}{match.group(2)}?v={asset.version}{match.group(3)}"
+
+        return ASSET_REFERENCE.sub(versioned, body.decode('utf-8')).encode('utf-8')
+
+    def load(self):
+        files = self._files()
+        signature = self._signature(files)
+        assets = {}
+        for name, path in files.items():
+            with open(path, 'rb') as f:
+                assets[name] = self._build(name, f.read())
+        if self.index in assets:
+            assets[self.index] = self._build(self.index, self._rewrite_index(assets[self.index].variants['identity'], assets))
+        with self.lock:
+            self.assets = assets
+            self.signature = signature
+
+    def _maybe_reload(self):
+        if self.reload_interval <= 0:
+            return
+        now = time.monotonic()
+        if now < self.next_check:
+            return
+        self.next_check = now + self.reload_interval
+        try:
+            if self._signature(self._files()) != self.signature:
+                self.load()
+                self._count('reloads')
+        except OSError as e:
+            print(f"Static asset reload failed: {str(e)}")
+
+    def refresh(self):
+        """Reloads now, regardless of ``reload_interval``; used when a served file is known to have changed."""
+        try:
+            self.load()
+            self._count('reloads')
+        except OSError as e:
+            print(f"Static asset reload failed: {str(e)}")
+
+    def path(self, name: str) -> str:
+        return os.path.abspath(os.path.join(self.root, name))
+
+    def _count(self, name: str):
+        with self.lock:
+            self.counts[name] += 1
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.assets
+
+    def response(self, name: str, request) -> Response:
+        """Serves ``name``; unknown names fall back to index.html for client-side routes."""
+        self._maybe_reload()
+        asset = self.assets.get(name)
+        if asset is None:
+            self._count('fallbacks')
+            name, asset = self.index, self.assets.get(self.index)
+            if asset is None:
+                return Response('Not Found', status=404, mimetype='text/plain')
+
+        encoding = 'identity'
+        for candidate in ('br', 'gzip'):
+            if candidate in asset.variants and request.accept_encodings[candidate] > 0:
+                encoding = candidate
+                break
+
+        etag = asset.version if encoding == 'identity' else f"{asset.version}-{encoding}"
+        immutable = name != self.index and request.args.get('v') == asset.version
+        headers = {
+            'Cache-Control': IMMUTABLE if immutable else REVALIDATE,
+            'Vary': 'Accept-Encoding'
+        }
+
+        if request.if_none_match.contains_weak(etag):
+            self._count('not_modified')
+            response = Response(status=304, headers=headers)
+            response.set_etag(etag)
+            return response
+
+        self._count('hits')
+        response = Response(asset.variants[encoding], mimetype=asset.mimetype, headers=headers)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        return response
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return dict(
+                self.counts,
+                files=len(self.assets),
+                bytes=sum(len(asset.variants['identity']) for asset in self.assets.values()),
+                compressed_bytes=sum(len(asset.variants.get('br', asset.variants.get('gzip', asset.variants['identity'])))
+                                     for asset in self.assets.values()),
+                brotli=brotli is not None
+            )
+
+def default_static_root(backend_root: str) -> str:
+    """``frontend/`` when it holds the app, otherwise the repository root next to backend/."""
+    frontend = os.path.abspath(os.path.join(backend_root, '..', 'frontend'))
+    if os.path.isfile(os.path.join(frontend, 'index.html')):
+        return frontend
+    return os.path.abspath(os.path.join(backend_root, '..'))
@@ -0,0 +1,49 @@
+import threading
+
+from config import Config
+
+CHARS_PER_TOKEN = 4
+ENCODING_NAME = 'cl100k_base'
+
+_encoding = None
+_encoding_loaded = threading.Event()
+_encoding_lock = threading.Lock()
+
+def _fetch_encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(ENCODING_NAME)
+    except Exception as e:
+        print(f"Tokenizer unavailable, estimating {CHARS_PER_TOKEN} chars per token: {str(e)}")
+        return None
+
+def load_encoding(timeout: float = None):
+    """Loads the tiktoken encoding once, giving up after ``timeout`` seconds.
+
+    tiktoken downloads the BPE file (with no timeout) unless it is already in
+    TIKTOKEN_CACHE_DIR. If loading fails or runs out of time, the chars-per-token
+    estimate is used for the rest of the process so counts stay consistent.
+    Called at startup; the first estimate_tokens() call loads it otherwise.
+    """
+    global _encoding
+    with _encoding_lock:
+        if not _encoding_loaded.is_set():
+            result = {}
+            loader = threading.Thread(target=lambda: result.update(encoding=_fetch_encoding()),
+                                      name='tokenizer-load', daemon=True)
+            loader.start()
+            loader.join(Config.TOKENIZER_LOAD_TIMEOUT if timeout is None else timeout)
+            if loader.is_alive():
+                print(f"Tokenizer load timed out, estimating {CHARS_PER_TOKEN} chars per token")
+            _encoding = result.get('encoding')
+            _encoding_loaded.set()
+    return _encoding
+
+def estimate_tokens(text: str) -> int:
+    """Local token estimate; uses tiktoken when it loaded, else ~4 chars per token."""
+    if not text:
+        return 0
+    encoding = _encoding if _encoding_loaded.is_set() else load_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // CHARS_PER_TOKEN)